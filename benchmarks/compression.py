@@ -0,0 +1,107 @@
+"""Measure the CPU cost and savings of compressing the API responses
+
+Renders a page of receita details (with their tags and ingredients) in
+JSON and MessagePack, then compresses it with every installed encoding
+of receita.utils.compression at several levels, and reports the size,
+the bytes saved and the compression time per response and per MB.
+
+    python benchmarks/compression.py --receitas 100 --repeat 50
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve(strict=True).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.test")
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+import django  # noqa E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa E402
+from django.test.utils import (  # noqa E402
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+)
+
+from receita.core.models import Ingredient, Receita, Tag  # noqa E402
+from receita.receita.serializers import ReceitaDetailSerializer  # noqa E402
+from receita.utils import messagepack  # noqa E402
+from receita.utils.compression import CODECS  # noqa E402
+
+LEVELS = {"gzip": [1, 6, 9], "br": [1, 4, 8, 11], "zstd": [1, 3, 9, 19]}
+
+
+def create_data(user, receitas):
+    tags = [Tag.objects.create(user=user, name=f"Tag {i}") for i in range(10)]
+    ingredients = [
+        Ingredient.objects.create(user=user, name=f"Ingredient {i}") for i in range(20)
+    ]
+    for i in range(receitas):
+        receita = Receita.objects.create(
+            user=user,
+            title=f"Receita {i}",
+            time_minutes=10 + i % 50,
+            price=f"{5 + i % 40}.{i % 100:02}",
+            link=f"https://receita.example.com/{i}",
+        )
+        receita.tags.set(tags[i % 10 :][:3])  # noqa E203
+        receita.ingredients.set(ingredients[i % 20 :][:5])  # noqa E203
+
+
+def timed(function, repeat):
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - started) * 1000)
+    return statistics.mean(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--receitas", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        user = get_user_model().objects.create_user("bench@receita.com", "bench")
+        create_data(user, args.receitas)
+        receitas = Receita.objects.prefetch_related("tags", "ingredients")
+        data = {"results": ReceitaDetailSerializer(receitas, many=True).data}
+        payloads = {
+            "json": json.dumps(data, separators=(",", ":")).encode(),
+            "msgpack": messagepack.packb(data),
+        }
+
+        print(
+            f"{'payload':8} {'encoding':9} {'level':>5} {'bytes':>8} "
+            f"{'saved':>7} {'ms':>7} {'ms/MB':>7}"
+        )
+        for name, payload in payloads.items():
+            megabytes = len(payload) / 1_000_000
+            print(f"{name:8} {'identity':9} {'':>5} {len(payload):8}")
+            for encoding, (compress, _) in CODECS.items():
+                for level in LEVELS[encoding]:
+                    size = len(compress(payload, level))
+                    ms = timed(lambda: compress(payload, level), args.repeat)
+                    print(
+                        f"{name:8} {encoding:9} {level:5} {size:8} "
+                        f"{1 - size / len(payload):7.1%} {ms:7.3f} "
+                        f"{ms / megabytes:7.1f}"
+                    )
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
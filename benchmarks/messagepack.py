@@ -0,0 +1,114 @@
+"""Compare the JSON and MessagePack renderings of receita detail lists
+
+Serializes pages of receitas (with their tags and ingredients) with
+ReceitaDetailSerializer, then reports for each format the payload size,
+raw and gzipped, the time to render it on the server and the time to
+parse it back (what the mobile clients pay).
+
+    python benchmarks/messagepack.py --receitas 500 --repeat 50
+"""
+import argparse
+import gzip
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve(strict=True).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.test")
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+import django  # noqa E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa E402
+from django.test.utils import (  # noqa E402
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+)
+from rest_framework.renderers import JSONRenderer  # noqa E402
+from rest_framework.request import Request  # noqa E402
+from rest_framework.test import APIRequestFactory  # noqa E402
+
+from receita.core.models import Ingredient, Receita, Tag  # noqa E402
+from receita.receita.serializers import ReceitaDetailSerializer  # noqa E402
+from receita.utils import messagepack  # noqa E402
+
+
+def create_data(user, receitas):
+    tags = [Tag.objects.create(user=user, name=f"Tag {i}") for i in range(10)]
+    ingredients = [
+        Ingredient.objects.create(user=user, name=f"Ingredient {i}") for i in range(20)
+    ]
+    for i in range(receitas):
+        receita = Receita.objects.create(
+            user=user,
+            title=f"Receita {i}",
+            time_minutes=10 + i % 50,
+            price=f"{5 + i % 40}.{i % 100:02}",
+            link=f"https://receita.example.com/{i}",
+        )
+        receita.tags.set(tags[i % 10 :][:3])  # noqa E203
+        receita.ingredients.set(ingredients[i % 20 :][:5])  # noqa E203
+
+
+def timed(function, repeat):
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - started) * 1000)
+    return statistics.mean(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--receitas", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        user = get_user_model().objects.create_user("bench@receita.com", "bench")
+        create_data(user, args.receitas)
+        receitas = list(Receita.objects.prefetch_related("tags", "ingredients"))
+        formats = {
+            "json": (JSONRenderer(), json.loads),
+            "msgpack": (messagepack.MessagePackRenderer(), messagepack.unpackb),
+        }
+
+        print(
+            f"{'format':8} {'bytes':>10} {'gzipped':>10} "
+            f"{'serialize ms':>13} {'render ms':>10} {'parse ms':>9}"
+        )
+        for name, (renderer, parse) in formats.items():
+            request = Request(APIRequestFactory().get("/"))
+            # The decimals depend on the renderer (see messagepack.DecimalField)
+            request.accepted_renderer = renderer
+
+            def serialize():
+                return ReceitaDetailSerializer(
+                    receitas, many=True, context={"request": request}
+                ).data
+
+            data = serialize()
+            payload = renderer.render(data)
+            serialize_ms = timed(serialize, args.repeat)
+            render_ms = timed(lambda: renderer.render(data), args.repeat)
+            parse_ms = timed(lambda: parse(payload), args.repeat)
+            print(
+                f"{name:8} {len(payload):10} {len(gzip.compress(payload)):10} "
+                f"{serialize_ms:13.2f} {render_ms:10.2f} {parse_ms:9.2f}"
+            )
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
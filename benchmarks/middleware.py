@@ -0,0 +1,79 @@
+"""Measure the per-request cost of the middleware
+
+Times a trivial view under /api/ and outside of it with the former flat
+MIDDLEWARE (every middleware on every path), with the path aware
+dispatcher and with no middleware at all, and reports the overhead of
+each stack over the bare view.
+
+    python benchmarks/middleware.py --repeat 2000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve(strict=True).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.test")
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+import django  # noqa E402
+
+django.setup()
+
+from django.conf import settings  # noqa E402
+from django.http import HttpResponse  # noqa E402
+from django.test import Client, override_settings  # noqa E402
+from django.test.utils import setup_test_environment  # noqa E402
+from django.urls import path  # noqa E402
+
+
+def ping(request):
+    return HttpResponse(b"{}", content_type="application/json")
+
+
+urlpatterns = [path("api/ping/", ping), path("ping/", ping)]
+
+HEAD = settings.MIDDLEWARE[
+    : settings.MIDDLEWARE.index("receita.utils.middleware.PathMiddlewareDispatcher")
+]
+STACKS = {
+    "none": [],
+    "flat": HEAD + settings.SITE_MIDDLEWARE,
+    "dispatcher": settings.MIDDLEWARE,
+}
+
+
+def timed(client, url, repeat):
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        client.get(url, HTTP_AUTHORIZATION="Token 0123456789")
+        durations.append((time.perf_counter() - started) * 1_000_000)
+    return statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    results = {}
+    for name, middleware in STACKS.items():
+        with override_settings(ROOT_URLCONF=__name__, MIDDLEWARE=middleware):
+            client = Client()
+            for url in ("/api/ping/", "/ping/"):
+                timed(client, url, 50)  # warm up
+                results[name, url] = timed(client, url, args.repeat)
+
+    print(f"{'stack':12} {'path':12} {'median us':>10} {'overhead us':>12}")
+    for (name, url), median in results.items():
+        overhead = median - results["none", url]
+        print(f"{name:12} {url:12} {median:10.1f} {overhead:12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Measure the startup and request cost of the OpenAPI schema
+
+Reports the time to set Django up and load the URLConf, to generate the
+schema by introspection (what every hit on / used to do), to load the
+file written by `manage.py generate_schema`, and the latency of the
+schema endpoint when generated per request, cached, and revalidated.
+
+    python benchmarks/schema.py --repeat 20
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve(strict=True).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.test")
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("RECEITA_SCHEMA_DIR", tempfile.mkdtemp())
+
+started = time.perf_counter()
+import django  # noqa E402
+
+django.setup()
+setup_ms = (time.perf_counter() - started) * 1000
+
+from django.core.management import call_command  # noqa E402
+from django.test import Client  # noqa E402
+from django.test.utils import setup_test_environment  # noqa E402
+from django.urls import get_resolver, reverse  # noqa E402
+
+from receita.utils import schema  # noqa E402
+
+
+def timed(function, repeat=1):
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - started) * 1000)
+    return statistics.mean(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    urlconf_ms = timed(lambda: get_resolver().url_patterns)
+    client = Client()
+    url = reverse("schema-json")
+
+    print("startup")
+    print(f"  {'django.setup()':32} {setup_ms:9.2f} ms")
+    print(f"  {'URLConf import':32} {urlconf_ms:9.2f} ms")
+    print(f"  {'code version hash':32} {timed(schema.code_version):9.2f} ms")
+    print(f"  {'schema generation':32} {timed(schema.generate_schema):9.2f} ms")
+    call_command("generate_schema", stdout=io.StringIO())
+    schema_file = schema.schema_path()
+    print(f"  {'schema file load':32} {timed(schema_file.read_bytes):9.2f} ms")
+
+    print("requests")
+    print(
+        f"  {'generated per request':32} "
+        f"{timed(schema.generate_schema, args.repeat):9.2f} ms"
+    )
+    etag = client.get(url)["ETag"]
+    print(f"  {'cached':32} {timed(lambda: client.get(url), args.repeat):9.2f} ms")
+    revalidate = lambda: client.get(url, HTTP_IF_NONE_MATCH=etag)  # noqa E731
+    print(f"  {'revalidated (304)':32} {timed(revalidate, args.repeat):9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
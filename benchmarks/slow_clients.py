@@ -0,0 +1,123 @@
+"""Compare WSGI and ASGI deployments under slow-client load
+
+Opens ``--slow`` connections that trickle their request and read the
+response slowly (mobile clients, uploads) while ``--fast`` clients issue
+normal requests, then reports how many slow connections the server held
+and the throughput left for fast clients. Run it against each deployment:
+
+    DJANGO_SERVER_MODE=wsgi /start   # or asgi
+    python benchmarks/slow_clients.py --url http://localhost:5000/api/receita/receitas/ \\
+        --token <token> --slow 200 --fast 20 --duration 30
+"""
+import argparse
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+
+def build_request(url, token):
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    headers = [
+        f"GET {path} HTTP/1.1",
+        f"Host: {parts.netloc}",
+        "Accept: application/json",
+        "Connection: close",
+    ]
+    if token:
+        headers.append(f"Authorization: Token {token}")
+    return ("\r\n".join(headers) + "\r\n\r\n").encode()
+
+
+async def slow_client(host, port, request, delay, stats):
+    """Send the request byte by byte and read the response slowly"""
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        stats["refused"] += 1
+        return
+    stats["held"] += 1
+    stats["max_held"] = max(stats["max_held"], stats["held"])
+    try:
+        for byte in request:
+            writer.write(bytes([byte]))
+            await writer.drain()
+            await asyncio.sleep(delay)
+        while await reader.read(64):
+            await asyncio.sleep(delay)
+        stats["slow_done"] += 1
+    except (ConnectionError, OSError):
+        stats["errors"] += 1
+    finally:
+        stats["held"] -= 1
+        writer.close()
+
+
+async def fast_client(host, port, request, deadline, stats):
+    """Issue requests back to back until the deadline"""
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(request)
+            await writer.drain()
+            status_line = await reader.readline()
+            await reader.read()
+            writer.close()
+        except (ConnectionError, OSError):
+            stats["errors"] += 1
+            continue
+        if b" 200 " in status_line:
+            stats["fast_done"] += 1
+            stats["latencies"].append(time.monotonic() - started)
+
+
+async def run(args):
+    parts = urlsplit(args.url)
+    host, port = parts.hostname, parts.port or 80
+    request = build_request(args.url, args.token)
+    stats = {
+        "held": 0,
+        "max_held": 0,
+        "refused": 0,
+        "errors": 0,
+        "slow_done": 0,
+        "fast_done": 0,
+        "latencies": [],
+    }
+    deadline = time.monotonic() + args.duration
+    slow = [
+        asyncio.create_task(slow_client(host, port, request, args.delay, stats))
+        for _ in range(args.slow)
+    ]
+    await asyncio.gather(
+        *(fast_client(host, port, request, deadline, stats) for _ in range(args.fast))
+    )
+    for task in slow:
+        task.cancel()
+    await asyncio.gather(*slow, return_exceptions=True)
+
+    latencies = sorted(stats["latencies"]) or [0]
+    print(f"slow connections held (max):  {stats['max_held']}/{args.slow}")
+    print(f"slow connections refused:     {stats['refused']}")
+    print(f"fast requests/second:         {stats['fast_done'] / args.duration:.1f}")
+    print(f"fast p50 latency (ms):        {latencies[len(latencies) // 2] * 1000:.1f}")
+    print(
+        f"fast p99 latency (ms):        {latencies[int(len(latencies) * 0.99)] * 1000:.1f}"
+    )
+    print(f"errors:                       {stats['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", required=True)
+    parser.add_argument("--token", help="API token sent as Authorization header")
+    parser.add_argument("--slow", type=int, default=100, help="slow clients")
+    parser.add_argument("--fast", type=int, default=10, help="fast clients")
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds per byte")
+    parser.add_argument("--duration", type=float, default=20, help="seconds")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
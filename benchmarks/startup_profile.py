@@ -0,0 +1,92 @@
+"""Profile the imports of a worker boot
+
+Boots Django like a gunicorn worker (settings, apps, URLConf and the
+request handler) under `python -X importtime` and reports the total boot
+time, the slowest modules and the import time per top-level package.
+
+    python benchmarks/startup_profile.py --settings config.settings.production
+    python benchmarks/startup_profile.py --settings config.settings.api --top 30
+"""
+import argparse
+import collections
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve(strict=True).parent.parent
+
+BOOT = """
+import time
+started = time.perf_counter()
+import django
+django.setup()
+from django.core.handlers.wsgi import WSGIHandler
+from django.urls import get_resolver
+WSGIHandler()
+get_resolver().url_patterns
+print(f"BOOT {(time.perf_counter() - started) * 1000:.1f}")
+"""
+
+# Enough environment for the production settings to load
+PRODUCTION_ENV = {
+    "DJANGO_SECRET_KEY": "startup-profile",
+    "DJANGO_ADMIN_URL": "admin/",
+    "DATABASE_URL": "sqlite:///:memory:",
+    "REDIS_URL": "redis://localhost:6379/0",
+}
+
+
+def parse_importtime(stderr):
+    """Return (module, self us, cumulative us, depth) of each import line"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        # import time:  <self> | <cumulative> | <indented name>
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return modules
+
+
+def profile(settings):
+    env = {**PRODUCTION_ENV, **os.environ, "DJANGO_SETTINGS_MODULE": settings}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", BOOT],
+        cwd=ROOT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        sys.exit(result.stderr)
+    boot_ms = float(result.stdout.split("BOOT ")[-1])
+    return boot_ms, parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--settings", default="config.settings.production")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    boot_ms, modules = profile(args.settings)
+    packages = collections.Counter()
+    for name, self_us, _, _ in modules:
+        packages[name.split(".")[0]] += self_us
+
+    print(f"{args.settings}: {len(modules)} modules, boot {boot_ms:.1f} ms")
+    print(f"\n{'slowest modules (cumulative)':50} {'self ms':>9} {'cumul ms':>9}")
+    top_level = [module for module in modules if module[3] == 0]
+    for name, self_us, cumulative_us, _ in sorted(
+        top_level, key=lambda module: -module[2]
+    )[: args.top]:
+        print(f"{name:50} {self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}")
+    print(f"\n{'packages (self time)':50} {'ms':>9}")
+    for name, self_us in packages.most_common(args.top):
+        print(f"{name:50} {self_us / 1000:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Compare ATOMIC_REQUESTS with the per-view transaction policy
+
+Runs receita list, retrieve and create requests against a throwaway test
+database with ATOMIC_REQUESTS on (the old behaviour) and off (writes
+wrapped in their own transactions), and reports database round trips
+(queries plus BEGIN/COMMIT) and the time spent inside transactions.
+
+    python benchmarks/transactions.py --receitas 200 --repeat 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve(strict=True).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.test")
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+import django  # noqa E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa E402
+from django.db import connection  # noqa E402
+from django.test.utils import (  # noqa E402
+    CaptureQueriesContext,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+)
+from django.urls import reverse  # noqa E402
+from rest_framework.test import APIClient  # noqa E402
+
+from receita.core.models import Ingredient, Receita, Tag  # noqa E402
+
+
+class TransactionRecorder:
+    """Time the transactions opened on the connection"""
+
+    def __init__(self):
+        self.durations = []
+
+    def __enter__(self):
+        self._set_autocommit = connection.set_autocommit
+        connection.set_autocommit = self.set_autocommit
+        return self
+
+    def __exit__(self, *exc_info):
+        connection.set_autocommit = self._set_autocommit
+
+    def set_autocommit(self, autocommit, *args, **kwargs):
+        if not autocommit:
+            self.started = time.perf_counter()
+        else:
+            self.durations.append(time.perf_counter() - self.started)
+        return self._set_autocommit(autocommit, *args, **kwargs)
+
+
+def create_data(user, receitas):
+    tags = [Tag.objects.create(user=user, name=f"Tag {i}") for i in range(10)]
+    ingredients = [
+        Ingredient.objects.create(user=user, name=f"Ingredient {i}") for i in range(20)
+    ]
+    for i in range(receitas):
+        receita = Receita.objects.create(
+            user=user, title=f"Receita {i}", time_minutes=10 + i % 50, price=5
+        )
+        first_tag, first_ingredient = i % 10, i % 20
+        receita.tags.set(tags[first_tag:][:3])
+        receita.ingredients.set(ingredients[first_ingredient:][:5])
+    return tags, ingredients
+
+
+def measure(client, request, repeat):
+    round_trips, durations, elapsed = [], [], []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries, TransactionRecorder() as tx:
+            started = time.perf_counter()
+            request(client)
+            elapsed.append(time.perf_counter() - started)
+        round_trips.append(len(queries) + 2 * len(tx.durations))
+        durations.append(sum(tx.durations))
+    return (
+        statistics.mean(round_trips),
+        statistics.mean(durations) * 1000,
+        statistics.mean(elapsed) * 1000,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--receitas", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        user = get_user_model().objects.create_user("bench@receita.com", "bench")
+        tags, ingredients = create_data(user, args.receitas)
+        receita = Receita.objects.first()
+        client = APIClient()
+        client.force_authenticate(user)
+        list_url = reverse("receita:receita-list")
+        detail_url = reverse("receita:receita-detail", args=[receita.id])
+        payload = {
+            "title": "Benchmark",
+            "time_minutes": 10,
+            "price": 5,
+            "tags": [tag.id for tag in tags[:3]],
+            "ingredients": [ingredient.id for ingredient in ingredients[:5]],
+        }
+        requests = {
+            "list": lambda c: c.get(list_url, {"limit": 50}),
+            "retrieve": lambda c: c.get(detail_url),
+            "create": lambda c: c.post(list_url, payload),
+        }
+
+        print(
+            f"{'request':10} {'policy':16} {'round trips':>12} {'tx ms':>8} {'total ms':>9}"
+        )
+        for name, request in requests.items():
+            for policy, atomic_requests in (
+                ("ATOMIC_REQUESTS", True),
+                ("per-view", False),
+            ):
+                connection.settings_dict["ATOMIC_REQUESTS"] = atomic_requests
+                trips, tx_ms, total_ms = measure(client, request, args.repeat)
+                print(
+                    f"{name:10} {policy:16} {trips:12.1f} {tx_ms:8.2f} {total_ms:9.2f}"
+                )
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,3 +3,12 @@
 
 BACKUP_DIR_PATH='/backups'
 BACKUP_FILE_PREFIX='backup'
+# Parallel pg_dump/pg_restore jobs (one table per job)
+BACKUP_JOBS="${BACKUP_JOBS:-$(nproc)}"
+# gzip level of the table files, compressed by each job in parallel
+BACKUP_COMPRESSION_LEVEL="${BACKUP_COMPRESSION_LEVEL:-6}"
+# Backups older than this are deleted, except the BACKUP_RETENTION_COUNT newest
+BACKUP_RETENTION_DAYS="${BACKUP_RETENTION_DAYS:-14}"
+BACKUP_RETENTION_COUNT="${BACKUP_RETENTION_COUNT:-7}"
+BACKUP_CHECKSUMS_FILE='checksums.sha256'
+BACKUP_TABLES_FILE='tables.txt'
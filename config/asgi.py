@@ -0,0 +1,50 @@
+"""
+ASGI config for Receita project.
+
+This module contains the ASGI application used by ASGI servers such as
+uvicorn (``gunicorn -k uvicorn.workers.UvicornWorker config.asgi``). It
+should expose a module-level variable named ``application``.
+
+Slow clients and uploads only hold a connection on the event loop instead
+of a whole worker, and the read-heavy endpoints are served by the async
+views in ``receita.receita.async_views`` when ``RECEITA_ASYNC_VIEWS`` is
+enabled (``compose/production/django/start`` does it in ASGI mode).
+
+"""
+
+import os
+import sys
+from pathlib import Path
+
+from django.core.asgi import get_asgi_application
+
+# This allows easy placement of apps within the interior
+# receita directory.
+ROOT_DIR = Path(__file__).resolve(strict=True).parent.parent
+sys.path.append(str(ROOT_DIR / "receita"))
+# We defer to a DJANGO_SETTINGS_MODULE already in the environment.
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
+
+# This application object is used by any ASGI server configured to use this
+# file.
+django_application = get_asgi_application()
+
+# Imported once Django is set up by get_asgi_application()
+from django.urls import reverse  # noqa E402
+
+from receita.receita.async_views import event_stream_app  # noqa E402
+
+EVENTS_PATH = reverse("receita:events")
+
+
+async def application(scope, receive, send):
+    # The event streams stay open for minutes: they are served on the event
+    # loop instead of through Django (see receita.receita.async_views)
+    if (
+        scope["type"] == "http"
+        and scope["method"] == "GET"
+        and scope["path"] == EVENTS_PATH
+    ):
+        await event_stream_app(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -0,0 +1,28 @@
+"""Gunicorn configuration
+
+    gunicorn -c config/gunicorn.py config.wsgi
+
+With preload_app the application (Django, every app and their heavy
+imports like numpy and scipy) is loaded once by the master and shared
+copy-on-write with the forked workers instead of loaded by each one.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+chdir = os.environ.get("GUNICORN_CHDIR", "/app")
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
+preload_app = os.environ.get("GUNICORN_PRELOAD_APP", "true").lower() == "true"
+# Recycle workers now and then, cheap when the app is preloaded
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 200))
+
+
+def post_fork(server, worker):
+    """Don't share the master database connections with the workers"""
+    if preload_app:
+        from django.db import connections
+
+        for connection in connections.all():
+            connection.close()
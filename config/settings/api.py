@@ -0,0 +1,62 @@
+"""
+API-only workers: token authenticated JSON, no admin, sessions or templates.
+
+Run them behind the same domain as the full production workers, routing
+/api/ here (DJANGO_SETTINGS_MODULE=config.settings.api) and the rest
+(admin, schema UI, static files) to config.settings.production.
+"""
+
+from .production import *  # noqa
+from .production import INSTALLED_APPS, REST_FRAMEWORK, SITE_MIDDLEWARE, TEMPLATES
+
+# APPS
+# ------------------------------------------------------------------------------
+API_UNUSED_APPS = [
+    "django.contrib.admin",
+    "django.contrib.messages",
+    "django.contrib.sessions",
+    "crispy_forms",
+    "drf_yasg",
+    "anymail",
+]
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in API_UNUSED_APPS]
+
+# AUTHENTICATION
+# ------------------------------------------------------------------------------
+# Token logins only need the model backend (allauth is never loaded)
+AUTHENTICATION_BACKENDS = ["django.contrib.auth.backends.ModelBackend"]
+
+# MIDDLEWARE
+# ------------------------------------------------------------------------------
+# /api/ already runs API_MIDDLEWARE; the other paths (served by the full
+# production workers) don't need session, CSRF, messages or static files here
+API_UNUSED_MIDDLEWARE = [
+    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.common.BrokenLinkEmailsMiddleware",
+]
+SITE_MIDDLEWARE = [
+    name for name in SITE_MIDDLEWARE if name not in API_UNUSED_MIDDLEWARE
+]
+
+# TEMPLATES
+# ------------------------------------------------------------------------------
+TEMPLATES[-1]["OPTIONS"]["context_processors"] = [  # type: ignore[index]
+    processor
+    for processor in TEMPLATES[-1]["OPTIONS"]["context_processors"]  # type: ignore
+    if processor != "django.contrib.messages.context_processors.messages"
+]
+
+# django-rest-framework
+# ------------------------------------------------------------------------------
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    # The browsable API needs sessions and templates
+    "DEFAULT_RENDERER_CLASSES": [
+        "rest_framework.renderers.JSONRenderer",
+        "receita.utils.messagepack.MessagePackRenderer",
+    ],
+}
@@ -41,7 +41,19 @@ LOCALE_PATHS = [str(ROOT_DIR / "locale")]
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#databases
 DATABASES = {"default": env.db("DATABASE_URL")}
-DATABASES["default"]["ATOMIC_REQUESTS"] = True
+# Views open transactions only around their writes (see perform_create and
+# ReceitaSerializer), so reads never hold a transaction during rendering.
+DATABASES["default"]["ATOMIC_REQUESTS"] = False
+# Read replicas, used for the safe requests of the receita viewsets
+DATABASE_REPLICAS = []
+for index, url in enumerate(env.list("DATABASE_REPLICA_URLS", default=[]), 1):
+    DATABASE_REPLICAS.append(f"replica{index}")
+    DATABASES[f"replica{index}"] = env.db_url_config(url)
+    DATABASES[f"replica{index}"]["TEST"] = {"MIRROR": "default"}
+# Seconds a user keeps reading from the primary after a write
+DATABASE_REPLICA_PIN_SECONDS = env.int("DATABASE_REPLICA_PIN_SECONDS", default=10)
+# https://docs.djangoproject.com/en/dev/ref/settings/#database-routers
+DATABASE_ROUTERS = ["receita.core.db.routers.ReplicaRouter"]
 
 # URLS
 # ------------------------------------------------------------------------------
@@ -49,6 +61,9 @@ DATABASES["default"]["ATOMIC_REQUESTS"] = True
 ROOT_URLCONF = "config.urls"
 # https://docs.djangoproject.com/en/dev/ref/settings/#wsgi-application
 WSGI_APPLICATION = "config.wsgi.application"
+# Serve the read-heavy endpoints with async views (ASGI deployments, see
+# config/asgi.py)
+RECEITA_ASYNC_VIEWS = env.bool("RECEITA_ASYNC_VIEWS", default=False)
 
 # APPS
 # ------------------------------------------------------------------------------
@@ -130,6 +145,18 @@ AUTH_PASSWORD_VALIDATORS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
+    # Runs API_MIDDLEWARE or SITE_MIDDLEWARE depending on the path
+    "receita.utils.middleware.PathMiddlewareDispatcher",
+]
+# Token authenticated API calls and the probes need no session, CSRF,
+# messages or locale
+API_MIDDLEWARE_PATHS = ["/api/", "/healthz", "/readyz"]
+API_MIDDLEWARE = [
+    "receita.utils.compression.CompressionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+]
+# The admin and every other page
+SITE_MIDDLEWARE = [
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
@@ -140,6 +167,9 @@ MIDDLEWARE = [
     "django.middleware.common.BrokenLinkEmailsMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
+# The admin checks only look for its middleware in MIDDLEWARE, while it is
+# in SITE_MIDDLEWARE (the admin is served by the site chain)
+SILENCED_SYSTEM_CHECKS = ["admin.E408", "admin.E409", "admin.E410"]
 
 # STATIC
 # ------------------------------------------------------------------------------
@@ -161,6 +191,11 @@ STATICFILES_FINDERS = [
 MEDIA_ROOT = str(APPS_DIR / "media")
 # https://docs.djangoproject.com/en/dev/ref/settings/#media-url
 MEDIA_URL = "/media/"
+# https://docs.djangoproject.com/en/dev/ref/settings/#default-file-storage
+DEFAULT_FILE_STORAGE = env(
+    "DJANGO_DEFAULT_FILE_STORAGE",
+    default="receita.core.storage.ShardedFileSystemStorage",
+)
 
 # TEMPLATES
 # ------------------------------------------------------------------------------
@@ -266,15 +301,99 @@ LOGGING = {
 REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 10,
+    # Accept: application/msgpack for smaller, faster to parse responses
+    "DEFAULT_RENDERER_CLASSES": [
+        "rest_framework.renderers.JSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+        "receita.utils.messagepack.MessagePackRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "rest_framework.parsers.JSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+        "receita.utils.messagepack.MessagePackParser",
+    ],
 }
 
 # django-cors-headers - https://github.com/adamchainz/django-cors-headers#setup
 CORS_URLS_REGEX = r"^/api/.*$"
 # Your stuff...
 # ------------------------------------------------------------------------------
+# Server-sent events change feed (/api/receita/events/)
+RECEITA_EVENTS_BACKLOG = env.int("RECEITA_EVENTS_BACKLOG", default=100)
+RECEITA_EVENTS_HEARTBEAT_SECONDS = env.int(
+    "RECEITA_EVENTS_HEARTBEAT_SECONDS", default=15
+)
+RECEITA_EVENTS_RETRY_MILLISECONDS = 3000
+# Events are shared by the workers through the cache, where streams poll them
+RECEITA_EVENTS_POLL_SECONDS = 1
+RECEITA_EVENTS_TTL_SECONDS = 60 * 60
+RECEITA_EVENTS_MAX_STREAM_SECONDS = env.int(
+    "RECEITA_EVENTS_MAX_STREAM_SECONDS", default=300
+)
+# Similar receitas (/api/receita/receitas/{id}/similar/)
+RECEITA_SIMILARITY_WEIGHTS = {"ingredients": 1.0, "tags": 0.5}
+# Users whose similarity index is kept in memory by each worker
+RECEITA_SIMILARITY_CACHE_USERS = env.int("RECEITA_SIMILARITY_CACHE_USERS", default=100)
+# Meal plans (/api/receita/receitas/meal-plan/)
+RECEITA_MEAL_PLAN_MAX_MEALS = 21
+# Price resolution of the planner: budgets over this many cents are
+# solved with coarser (rounded up) prices
+RECEITA_MEAL_PLAN_PRICE_BUCKETS = 5000
+RECEITA_MEAL_PLAN_CACHE_SECONDS = 600
+# Histogram bucket widths of /api/receita/stats/ (reais and minutes)
+RECEITA_STATS_PRICE_BUCKET = 10
+RECEITA_STATS_TIME_BUCKET = 15
+# Tag and ingredient autocomplete (/api/receita/tags/autocomplete/)
+RECEITA_AUTOCOMPLETE_MAX_RESULTS = 20
+RECEITA_AUTOCOMPLETE_CACHE_USERS = env.int(
+    "RECEITA_AUTOCOMPLETE_CACHE_USERS", default=200
+)
+# Users with more names are served by database prefix queries
+RECEITA_AUTOCOMPLETE_TRIE_MAX_NAMES = 5000
+# /readyz runs its checks at most once per worker in this many seconds
+RECEITA_READINESS_CACHE_SECONDS = env.int("RECEITA_READINESS_CACHE_SECONDS", default=5)
+# Admin changelists estimate the size of unfiltered tables over this many
+# rows; admin actions export and delete in chunks of RECEITA_ADMIN_CHUNK_SIZE
+RECEITA_ADMIN_EXACT_COUNT_LIMIT = 10000
+RECEITA_ADMIN_CHUNK_SIZE = 1000
+# Purge of the deleted users and receitas (`manage.py process_deletions`)
+RECEITA_DELETION_BATCH_SIZE = env.int("RECEITA_DELETION_BATCH_SIZE", default=200)
+RECEITA_DELETION_MAX_ATTEMPTS = 5
+# Failed jobs are retried after 1, 2, 4... times this delay
+RECEITA_DELETION_RETRY_SECONDS = 60
+# A running job whose worker didn't report progress for this long is retried
+RECEITA_DELETION_LEASE_SECONDS = 300
+# Images in an S3 compatible bucket (MinIO locally), with
+# DJANGO_DEFAULT_FILE_STORAGE=receita.core.storage.S3Storage
+RECEITA_S3_BUCKET = env("RECEITA_S3_BUCKET", default="")
+RECEITA_S3_ENDPOINT_URL = env("RECEITA_S3_ENDPOINT_URL", default=None)
+RECEITA_S3_ACCESS_KEY_ID = env("RECEITA_S3_ACCESS_KEY_ID", default=None)
+RECEITA_S3_SECRET_ACCESS_KEY = env("RECEITA_S3_SECRET_ACCESS_KEY", default=None)
+# Base URL of the public bucket, presigned URLs are served when not set
+RECEITA_S3_PUBLIC_URL = env("RECEITA_S3_PUBLIC_URL", default=None)
+# Resumable image uploads (/api/receita/receitas/{id}/uploads/)
+RECEITA_UPLOAD_MAX_SIZE = env.int("RECEITA_UPLOAD_MAX_SIZE", default=20 * 1024 * 1024)
+# Uploads not resumed for this long are purged by `manage.py purge_uploads`
+RECEITA_UPLOAD_EXPIRY_SECONDS = 24 * 60 * 60
+# Compression of the API responses, in this order of preference (brotli
+# and zstd when installed); levels are overridden per view
+RECEITA_COMPRESSION_ENCODINGS = ["br", "zstd", "gzip"]
+RECEITA_COMPRESSION_LEVELS = {"br": 4, "zstd": 3, "gzip": 6}
+RECEITA_COMPRESSION_MIN_SIZE = 1024
+# Most IDs of a ?ids=1,2,3 multi-get on the tag, ingredient and receita lists
+# and of a shopping list
+RECEITA_MULTI_GET_MAX_IDS = env.int("RECEITA_MULTI_GET_MAX_IDS", default=100)
+# Sub-requests allowed in one /api/batch/ request
+RECEITA_BATCH_MAX_REQUESTS = env.int("RECEITA_BATCH_MAX_REQUESTS", default=20)
+# OpenAPI schema written by `manage.py generate_schema` (/openapi.json)
+RECEITA_SCHEMA_DIR = env("RECEITA_SCHEMA_DIR", default=str(ROOT_DIR / "schema"))
+# Keys the schema cache; hashed from the sources when not set
+RECEITA_CODE_VERSION = env("RECEITA_CODE_VERSION", default=None)
 
 SWAGGER_SETTINGS = {
     "VALIDATOR_URL": None,
+    "SPEC_URL": "schema-json",
     "USE_SESSION_AUTH": False,
     "SECURITY_DEFINITIONS": {
         "api_key": {
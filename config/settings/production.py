@@ -11,8 +11,19 @@ ALLOWED_HOSTS = env.list("DJANGO_ALLOWED_HOSTS", default=["receita.com"])
 # DATABASES
 # ------------------------------------------------------------------------------
 DATABASES["default"] = env.db("DATABASE_URL")  # noqa F405
-DATABASES["default"]["ATOMIC_REQUESTS"] = True  # noqa F405
+DATABASES["default"]["ATOMIC_REQUESTS"] = False  # noqa F405
 DATABASES["default"]["CONN_MAX_AGE"] = env.int("CONN_MAX_AGE", default=60)  # noqa F405
+if env.bool("DATABASE_POOL", default=False):
+    # Connections are returned to an in-process pool at the end of each
+    # request instead of being kept per thread (CONN_MAX_AGE).
+    for alias in ["default"] + DATABASE_REPLICAS:  # noqa F405
+        DATABASES[alias]["ENGINE"] = "receita.core.db.backends.postgresql"  # noqa F405
+        DATABASES[alias]["CONN_MAX_AGE"] = 0  # noqa F405
+        DATABASES[alias]["POOL"] = {  # noqa F405
+            "max_size": env.int("DATABASE_POOL_MAX_SIZE", default=10),
+            "timeout": env.int("DATABASE_POOL_TIMEOUT", default=10),
+            "check_interval": env.int("DATABASE_POOL_CHECK_INTERVAL", default=30),
+        }
 
 # CACHES
 # ------------------------------------------------------------------------------
@@ -35,6 +46,9 @@ CACHES = {
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 # https://docs.djangoproject.com/en/dev/ref/settings/#secure-ssl-redirect
 SECURE_SSL_REDIRECT = env.bool("DJANGO_SECURE_SSL_REDIRECT", default=True)
+# https://docs.djangoproject.com/en/dev/ref/settings/#secure-redirect-exempt
+# Probes talk plain HTTP to the container
+SECURE_REDIRECT_EXEMPT = [r"^healthz$", r"^readyz$"]
 # https://docs.djangoproject.com/en/dev/ref/settings/#session-cookie-secure
 SESSION_COOKIE_SECURE = True
 # https://docs.djangoproject.com/en/dev/ref/settings/#csrf-cookie-secure
@@ -111,6 +125,8 @@ ANYMAIL = {}
 # A sample logging configuration. The only tangible logging
 # performed by this configuration is to send an email to
 # the site admins on every HTTP 500 error when DEBUG=False.
+# The emails are sent from a background thread, and the repeats of an
+# error within DJANGO_ERROR_EMAIL_WINDOW seconds are sent as a digest.
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -125,7 +141,8 @@ LOGGING = {
         "mail_admins": {
             "level": "ERROR",
             "filters": ["require_debug_false"],
-            "class": "django.utils.log.AdminEmailHandler",
+            "class": "receita.utils.log.QueuedAdminEmailHandler",
+            "window": env.int("DJANGO_ERROR_EMAIL_WINDOW", default=300),
         },
         "console": {
             "level": "DEBUG",
@@ -1,41 +1,40 @@
 from django.conf import settings
 from django.conf.urls.static import static
-from django.contrib import admin
 from django.urls import include, path
 from django.views import defaults as default_views
-from drf_yasg import openapi
-from drf_yasg.views import get_schema_view
-from rest_framework import permissions
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Receita",
-        default_version="v1",
-        description="Receita is a tool to create good recipes",
-        license=openapi.License(name="MIT License"),
-        contact=openapi.Contact(email="italocarvalhoti@hotmail.com"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+from receita.core import views as core_views
+from receita.utils import schema
+
+urlpatterns = static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+# Liveness and readiness probes
+urlpatterns += [
+    path("healthz", core_views.healthz, name="healthz"),
+    path("readyz", core_views.readyz, name="readyz"),
+]
 
+# The API-only profile (config.settings.api) has no admin and no schema
+if "django.contrib.admin" in settings.INSTALLED_APPS:
+    from django.contrib import admin
 
-urlpatterns = [path("admin/", admin.site.urls)] + static(
-    settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-)
+    urlpatterns += [path("admin/", admin.site.urls)]
+
+if schema.schema_enabled():
+    urlpatterns += [
+        # The UI fetches the cached schema from SWAGGER_SETTINGS["SPEC_URL"]
+        path("", schema.ui_view(), name="schema-swagger-ui"),
+        path("openapi.json", schema.schema_json, name="schema-json"),
+    ]
 
 # API URLS
 urlpatterns += [
-    path(
-        "",
-        schema_view.with_ui("swagger", cache_timeout=0),
-        name="schema-swagger-ui",
-    ),
     path(
         "api/user/",
         include("receita.user.urls"),
     ),
     path("api/receita/", include("receita.receita.urls")),
+    path("api/batch/", core_views.BatchView.as_view(), name="batch"),
 ]
 
 if settings.DEBUG:
@@ -62,6 +61,4 @@ if settings.DEBUG:
     if "debug_toolbar" in settings.INSTALLED_APPS:
         import debug_toolbar
 
-        urlpatterns = [
-            path("__debug__/", include(debug_toolbar.urls))
-        ] + urlpatterns
+        urlpatterns = [path("__debug__/", include(debug_toolbar.urls))] + urlpatterns
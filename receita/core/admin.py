@@ -1,13 +1,222 @@
-from django.contrib import admin
+import csv
+
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.widgets import AutocompleteSelectMultiple
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.http import StreamingHttpResponse
+from django.template.response import TemplateResponse
+from django.utils.functional import cached_property
+from django.utils.text import capfirst
 from django.utils.translation import gettext as _
+from django.utils.translation import gettext_lazy
+
+from receita.core import deletion, models
+from receita.core.normalization import normalize_name
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator estimating the size of unfiltered tables
+
+    COUNT(*) scans the whole table, so on PostgreSQL the planner statistics
+    are used for the unfiltered pages of tables larger than
+    RECEITA_ADMIN_EXACT_COUNT_LIMIT rows. Filtered pages are counted.
+    Unfiltered means no filter but the one of the default manager: the
+    receitas waiting to be purged are hidden by LiveManager, yet counted by
+    the estimate until they are gone.
+    """
+
+    def _where(self, queryset):
+        compiler = queryset.query.get_compiler(queryset.db)
+        try:
+            return queryset.query.where.as_sql(compiler, compiler.connection)
+        except EmptyResultSet:
+            return None
+
+    def is_unfiltered(self):
+        queryset = self.object_list
+        where = self._where(queryset)
+        return where is not None and where == self._where(
+            queryset.model._default_manager.all()
+        )
+
+    def estimate(self):
+        """Return the row count of the table in the planner statistics"""
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    @cached_property
+    def count(self):
+        if self.is_unfiltered():
+            estimate = self.estimate()
+            # -1 until the table is first analyzed
+            if estimate is not None and (
+                estimate >= settings.RECEITA_ADMIN_EXACT_COUNT_LIMIT
+            ):
+                return estimate
+        return super().count
+
+
+class Echo:
+    """File-like object handing back what is written to it"""
+
+    def write(self, value):
+        return value
+
+
+def chunks(queryset, size):
+    """Yield the objects of queryset in lists of size, in primary key order
+
+    Each list is a separate keyset query, so the queryset is never loaded
+    (or held by a server side cursor) as a whole.
+    """
+    queryset = queryset.order_by("pk")
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(pk__gt=last)
+        objs = list(page[:size])
+        if not objs:
+            return
+        yield objs
+        last = objs[-1].pk
+
+
+class ChunkedActionsMixin:
+    """Admin actions streaming or deleting the selection in chunks
+
+    export_fields are the CSV columns, export_row returns the values of
+    an object. The default delete action is replaced: it loads every
+    selected object, and its related ones, to list them.
+    """
+
+    actions = ["export_csv", "delete_in_chunks"]
+    list_per_page = 50
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    export_fields = ("id",)
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop("delete_selected", None)
+        return actions
+
+    def export_queryset(self, queryset):
+        return queryset
+
+    def export_row(self, obj):
+        return [getattr(obj, field) for field in self.export_fields]
+
+    def export_csv(self, request, queryset):
+        size = settings.RECEITA_ADMIN_CHUNK_SIZE
+        writer = csv.writer(Echo())
+
+        def rows():
+            yield writer.writerow(self.export_fields)
+            for objs in chunks(self.export_queryset(queryset), size):
+                for obj in objs:
+                    yield writer.writerow(self.export_row(obj))
+
+        response = StreamingHttpResponse(rows(), content_type="text/csv")
+        filename = f"{self.model._meta.model_name}.csv"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    export_csv.short_description = gettext_lazy(
+        "Export selected %(verbose_name_plural)s as CSV"
+    )
+
+    def delete_in_chunks(self, request, queryset):
+        opts = self.model._meta
+        if not self.has_delete_permission(request):
+            self.message_user(
+                request, _("You can't delete %s.") % opts.verbose_name_plural
+            )
+            return None
+        size = settings.RECEITA_ADMIN_CHUNK_SIZE
+        if not request.POST.get("post"):
+            context = {
+                **self.admin_site.each_context(request),
+                "title": _("Are you sure?"),
+                "opts": opts,
+                "media": self.media,
+                "count": queryset.count(),
+                "chunk_size": size,
+                "objects_name": opts.verbose_name_plural,
+                "selected": request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+                "select_across": request.POST.get("select_across", "0"),
+                "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+            }
+            return TemplateResponse(
+                request, "admin/core/delete_in_chunks_confirmation.html", context
+            )
+
+        deleted = 0
+        pk_chunk = queryset.order_by("pk").values_list("pk", flat=True)[:size]
+        # Always a fresh first chunk: the previous ones are gone
+        while pks := list(pk_chunk.all()):
+            with transaction.atomic():
+                self.delete_queryset(request, self.model.objects.filter(pk__in=pks))
+            deleted += len(pks)
+        self.message_user(
+            request,
+            _("Deleted %(count)d %(items)s.")
+            % {"count": deleted, "items": opts.verbose_name_plural},
+            messages.SUCCESS,
+        )
+        return None
+
+    delete_in_chunks.short_description = gettext_lazy(
+        "Delete selected %(verbose_name_plural)s"
+    )
+    delete_in_chunks.allowed_permissions = ("delete",)
+
+
+class DeletionPipelineMixin:
+    """Admin deletes going through receita.core.deletion
+
+    The object is soft deleted and a DeletionJob purges it, its related
+    rows and files in the background, instead of a cascade run by the
+    admin request. delete_object is the deletion function of the model.
+    """
 
-from receita.core import models
+    def delete_model(self, request, obj):
+        self.delete_object(obj)
 
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.delete_object(obj)
 
-class UserAdmin(BaseUserAdmin):
+    def get_deleted_objects(self, objs, request):
+        """List the objects only: the related ones are purged later"""
+        opts = self.model._meta
+        to_delete = [f"{capfirst(opts.verbose_name)}: {obj}" for obj in objs]
+        model_count = {opts.verbose_name_plural: len(to_delete)}
+        perms_needed = set()
+        if not self.has_delete_permission(request):
+            perms_needed.add(opts.verbose_name)
+        return to_delete, model_count, perms_needed, []
+
+
+class UserAdmin(DeletionPipelineMixin, BaseUserAdmin):
     ordering = ["id"]
     list_display = ["email", "name"]
+    search_fields = ["email", "name"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     fieldsets = (
         (None, {"fields": ("email", "password")}),
         (_("Personal Info"), {"fields": ("name",)}),
@@ -27,8 +236,169 @@ class UserAdmin(BaseUserAdmin):
         ),
     )
 
+    def delete_object(self, user):
+        deletion.delete_user(user)
+
+
+class OwnedNameAdmin(ChunkedActionsMixin, admin.ModelAdmin):
+    """Tags and ingredients, searched by the prefix of their normalized name
+
+    The autocomplete widgets of ReceitaAdmin pass ?owner= to only suggest
+    the objects of the receita owner (served by the user/name index).
+    """
+
+    list_display = ["name", "user", "receita_count"]
+    list_select_related = ["user"]
+    raw_id_fields = ["user"]
+    search_fields = ["normalized_name"]
+    ordering = ["-id"]
+    export_fields = ("id", "user_id", "name", "receita_count")
+
+    def autocomplete_view(self, request):
+        owner = request.GET.get("owner", "")
+        request.receita_owner_id = int(owner) if owner.isdigit() else None
+        return super().autocomplete_view(request)
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        owner_id = getattr(request, "receita_owner_id", None)
+        if owner_id is not None:
+            queryset = queryset.filter(user_id=owner_id)
+        return queryset
+
+    def get_search_results(self, request, queryset, search_term):
+        term = normalize_name(search_term)
+        if term:
+            queryset = queryset.filter(normalized_name__startswith=term)
+        return queryset, False
+
+
+class OwnerAutocompleteSelectMultiple(AutocompleteSelectMultiple):
+    """Autocomplete only suggesting the objects of one user"""
+
+    def __init__(self, *args, owner_id=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.owner_id = owner_id
+
+    def get_url(self):
+        url = super().get_url()
+        return url if self.owner_id is None else f"{url}?owner={self.owner_id}"
+
+
+class ReceitaAdminForm(forms.ModelForm):
+    """Reject the tags and ingredients of other users"""
+
+    def clean(self):
+        cleaned_data = super().clean()
+        user = cleaned_data.get("user")
+        for field in ("tags", "ingredients"):
+            others = [obj for obj in cleaned_data.get(field, []) if obj.user != user]
+            if user is not None and others:
+                self.add_error(
+                    field,
+                    ValidationError(
+                        _("%(names)s belong to another user.")
+                        % {"names": ", ".join(map(str, others))}
+                    ),
+                )
+        return cleaned_data
+
+
+class ReceitaAdmin(DeletionPipelineMixin, ChunkedActionsMixin, admin.ModelAdmin):
+    """Receitas, searched by id or owner email
+
+    Tags and ingredients are picked with autocompletes scoped to the
+    owner instead of multi-selects holding every row of every user.
+    """
+
+    form = ReceitaAdminForm
+    list_display = ["title", "user", "time_minutes", "price"]
+    list_select_related = ["user"]
+    raw_id_fields = ["user"]
+    autocomplete_fields = ["tags", "ingredients"]
+    search_fields = ["=id", "=user__email"]
+    ordering = ["-id"]
+    export_fields = (
+        "id",
+        "user",
+        "title",
+        "time_minutes",
+        "price",
+        "link",
+        "tags",
+        "ingredients",
+    )
+
+    def delete_object(self, receita):
+        deletion.delete_receita(receita)
+
+    def get_form(self, request, obj=None, **kwargs):
+        request.receita_owner_id = obj.user_id if obj is not None else None
+        return super().get_form(request, obj, **kwargs)
+
+    def formfield_for_manytomany(self, db_field, request, **kwargs):
+        owner_id = getattr(request, "receita_owner_id", None)
+        if owner_id is not None:
+            kwargs["queryset"] = db_field.related_model.objects.filter(user_id=owner_id)
+            kwargs["widget"] = OwnerAutocompleteSelectMultiple(
+                db_field.remote_field,
+                self.admin_site,
+                using=kwargs.get("using"),
+                owner_id=owner_id,
+            )
+        return super().formfield_for_manytomany(db_field, request, **kwargs)
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if term.isdigit():
+            return queryset.filter(pk=term), False
+        if term:
+            return queryset.filter(user__email=term), False
+        return queryset, False
+
+    def export_queryset(self, queryset):
+        return queryset.select_related("user").prefetch_related("tags", "ingredients")
+
+    def export_row(self, obj):
+        return [
+            obj.pk,
+            obj.user.email,
+            obj.title,
+            obj.time_minutes,
+            obj.price,
+            obj.link,
+            "|".join(tag.name for tag in obj.tags.all()),
+            "|".join(ingredient.name for ingredient in obj.ingredients.all()),
+        ]
+
+
+class DeletionJobAdmin(admin.ModelAdmin):
+    """Progress of the background purges, read only"""
+
+    list_display = [
+        "kind",
+        "object_id",
+        "status",
+        "deleted_objects",
+        "deleted_files",
+        "attempts",
+        "created_at",
+        "finished_at",
+    ]
+    list_filter = ["status", "kind"]
+    ordering = ["-id"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Tag)
-admin.site.register(models.Ingredient)
-admin.site.register(models.Receita)
+admin.site.register(models.Tag, OwnedNameAdmin)
+admin.site.register(models.Ingredient, OwnedNameAdmin)
+admin.site.register(models.Receita, ReceitaAdmin)
+admin.site.register(models.DeletionJob, DeletionJobAdmin)
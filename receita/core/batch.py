@@ -0,0 +1,208 @@
+"""Many API calls in one round trip (/api/batch/)
+
+The edit screen creates its tags and ingredients, then the receita using
+them: each call pays the authentication, the middleware and a transaction.
+A batch runs an ordered list of sub-requests against the receita and user
+views instead, in one transaction:
+
+    {"requests": [
+        {"name": "doce", "method": "POST", "path": "/api/receita/tags/",
+         "body": {"name": "Doce"}},
+        {"method": "POST", "path": "/api/receita/receitas/",
+         "body": {"title": "Pudim", "tags": ["$doce.id"], ...}}
+    ]}
+
+The sub-requests are authenticated with the user of the batch, and their
+JSON bodies and paths may reference a field of an earlier named response
+("$doce.id"). The first sub-request answering with an error stops the
+batch and rolls everything back. The sub-requests always read the
+primary: the replicas can't see the uncommitted writes of the batch.
+
+Views setting batchable = False (the token and sign up views) can't be
+called in a batch, and a batch calling a view with compress_response =
+False isn't compressed either: its response holds theirs (BREACH).
+"""
+import asyncio
+import io
+import json
+import re
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.urls import Resolver404, resolve
+from rest_framework import serializers, status
+from rest_framework.utils.encoders import JSONEncoder
+
+# The apps whose views can be called in a batch
+NAMESPACES = ("receita", "user")
+METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE")
+REFERENCE = re.compile(r"\$(\w+)\.(\w+)")
+# Headers of the batch request the sub-requests must not inherit
+_SKIPPED_META = (
+    "CONTENT_LENGTH",
+    "CONTENT_TYPE",
+    "HTTP_ACCEPT",
+    "HTTP_ACCEPT_ENCODING",
+    "HTTP_AUTHORIZATION",
+    "QUERY_STRING",
+)
+
+
+class SubRequestSerializer(serializers.Serializer):
+    name = serializers.RegexField(r"^\w+$", required=False)
+    method = serializers.ChoiceField(METHODS)
+    path = serializers.CharField()
+    body = serializers.JSONField(required=False)
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = SubRequestSerializer(many=True)
+
+    def validate_requests(self, value):
+        if not value:
+            raise serializers.ValidationError("At least one request is required.")
+        if len(value) > settings.RECEITA_BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                f"At most {settings.RECEITA_BATCH_MAX_REQUESTS} requests are allowed."
+            )
+        names = [item["name"] for item in value if "name" in item]
+        if len(names) != len(set(names)):
+            raise serializers.ValidationError("The request names must be unique.")
+        return value
+
+
+class SubResponseSerializer(serializers.Serializer):
+    name = serializers.CharField(allow_null=True)
+    status = serializers.IntegerField()
+    body = serializers.JSONField(allow_null=True)
+
+
+class BatchResponseSerializer(serializers.Serializer):
+    detail = serializers.CharField(required=False)
+    responses = SubResponseSerializer(many=True)
+
+
+class BatchError(Exception):
+    """A sub-request that can't be run, answered with status"""
+
+    def __init__(self, detail, status=status.HTTP_400_BAD_REQUEST):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
+
+
+def _reference(match, results):
+    name, field = match.groups()
+    try:
+        return results[name][field]
+    except (KeyError, TypeError):
+        raise BatchError(f"Unknown reference {match.group(0)}.")
+
+
+def resolve_references(value, results):
+    """Replace the $name.field references of value by the response fields
+
+    A string that is a reference takes the type of the field (the ids
+    stay integers), references inside a longer string are formatted.
+    """
+    if isinstance(value, dict):
+        return {key: resolve_references(item, results) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_references(item, results) for item in value]
+    if isinstance(value, str):
+        match = REFERENCE.fullmatch(value)
+        if match:
+            return _reference(match, results)
+        return REFERENCE.sub(lambda match: str(_reference(match, results)), value)
+    return value
+
+
+def _sub_request(request, method, path, body):
+    url = urlsplit(path)
+    content = b"" if body is None else json.dumps(body, cls=JSONEncoder).encode()
+    environ = {
+        key: value for key, value in request.META.items() if key not in _SKIPPED_META
+    }
+    environ.update(
+        {
+            "REQUEST_METHOD": method,
+            "PATH_INFO": url.path,
+            "QUERY_STRING": url.query,
+            "HTTP_ACCEPT": "application/json",
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(content)),
+            "wsgi.input": io.BytesIO(content),
+        }
+    )
+    sub_request = WSGIRequest(environ)
+    # Authenticated once: DRF uses these instead of the authentication classes
+    sub_request._force_auth_user = request.user
+    sub_request._force_auth_token = request.auth
+    # See ReplicaReadMixin
+    sub_request.read_primary = True
+    return sub_request
+
+
+def view_option(view, name, default=True):
+    """Return an option of view, set on its class, function or initkwargs"""
+    # As read by receita.utils.compression.CompressionMiddleware
+    initkwargs = getattr(view, "initkwargs", None) or {}
+    return initkwargs.get(name, getattr(getattr(view, "cls", view), name, default))
+
+
+def _view(path):
+    try:
+        match = resolve(urlsplit(path).path)
+    except Resolver404:
+        raise BatchError("Not found.", status.HTTP_404_NOT_FOUND)
+    if match.namespace not in NAMESPACES:
+        raise BatchError("This path can't be called in a batch.")
+    # ASGI mode: the async views keep the sync view they delegate to
+    view = getattr(match.func, "sync_view", match.func)
+    if asyncio.iscoroutinefunction(view) or not view_option(view, "batchable"):
+        raise BatchError("This path can't be called in a batch.")
+    return view, match.args, match.kwargs
+
+
+def _call(request, item, results):
+    path = resolve_references(item["path"], results)
+    body = resolve_references(item.get("body"), results)
+    view, args, kwargs = _view(path)
+    if not view_option(view, "compress_response"):
+        # The batch response holds this one
+        request._request.compress_response = False
+    response = view(_sub_request(request, item["method"], path, body), *args, **kwargs)
+    if response.streaming:
+        response.close()
+        raise BatchError("Streaming responses can't be batched.")
+    if hasattr(response, "data"):
+        # Not rendered: the batch response renders the data
+        return response.status_code, response.data
+    return response.status_code, json.loads(response.content or "null")
+
+
+def execute(request, items):
+    """Run the sub-requests in order and return (failed, responses)
+
+    Everything is rolled back when a sub-request fails; the responses then
+    stop at the failed one.
+    """
+    results = {}
+    responses = []
+    with transaction.atomic():
+        for item in items:
+            try:
+                status_code, data = _call(request, item, results)
+            except BatchError as exc:
+                status_code, data = exc.status, {"detail": exc.detail}
+            responses.append(
+                {"name": item.get("name"), "status": status_code, "body": data}
+            )
+            if status_code >= 400:
+                transaction.set_rollback(True)
+                return True, responses
+            if "name" in item:
+                results[item["name"]] = data
+    return False, responses
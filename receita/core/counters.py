@@ -0,0 +1,79 @@
+"""Denormalized receita counters of users, tags and ingredients
+
+User.receita_count, Tag.receita_count and Ingredient.receita_count are
+kept up to date by the receita signal handlers with atomic F() updates;
+rebuild() recomputes them from the database when they drift (raw SQL,
+bulk operations bypassing signals...).
+"""
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from receita.core.models import Ingredient, Receita, Tag
+
+# Attribute model -> (through model, attribute column of the through model)
+RELATIONS = {
+    Tag: (Receita.tags.through, "tag_id"),
+    Ingredient: (Receita.ingredients.through, "ingredient_id"),
+}
+
+
+def adjust(model, ids, delta):
+    """Add delta to the receita_count of the given objects"""
+    if ids and delta:
+        model.objects.filter(pk__in=ids).update(
+            receita_count=F("receita_count") + delta
+        )
+
+
+def remove_receita_relations(receita_ids):
+    """Decrement the counters of the tags and ingredients of receitas
+
+    Called before the receita <-> attribute rows are deleted.
+    """
+    for model, (through, column) in RELATIONS.items():
+        counts = (
+            through.objects.filter(receita_id__in=receita_ids)
+            .values(column)
+            .annotate(count=Count("receita_id"))
+            .values_list(column, "count")
+        )
+        by_delta = {}
+        for pk, count in counts:
+            by_delta.setdefault(count, []).append(pk)
+        for count, ids in by_delta.items():
+            adjust(model, ids, -count)
+
+
+def _count(queryset, column):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{column: OuterRef("pk")})
+            .order_by()
+            .values(column)
+            .annotate(count=Count("*"))
+            .values("count"),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def rebuild(user_ids=None, apps=global_apps):
+    """Recompute every counter, or only those of the given users
+
+    apps is the app registry, so migrations can pass their historical one.
+    """
+    receita = apps.get_model("core", "Receita")
+    users = apps.get_model(settings.AUTH_USER_MODEL).objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    users.update(receita_count=_count(receita.objects.all(), "user_id"))
+    for name, field in (("Tag", "tags"), ("Ingredient", "ingredients")):
+        through = receita._meta.get_field(field).remote_field.through
+        objects = apps.get_model("core", name).objects.all()
+        if user_ids is not None:
+            objects = objects.filter(user_id__in=user_ids)
+        column = f"{name.lower()}_id"
+        objects.update(receita_count=_count(through.objects.all(), column))
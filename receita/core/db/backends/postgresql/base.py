@@ -0,0 +1,49 @@
+"""PostgreSQL backend borrowing connections from a process-wide pool
+
+Enable it with ``ENGINE = "receita.core.db.backends.postgresql"`` and
+configure the pool with the ``POOL`` key of the database settings. Django
+closes the connection at the end of each request (``CONN_MAX_AGE = 0``),
+which returns it to the pool instead of closing the socket.
+"""
+from django.db.backends.postgresql import base
+
+from receita.core.db import pool
+
+
+def check_connection(connection):
+    """Run a trivial query to make sure the server is still there"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+
+def reset_connection(connection):
+    """Roll back whatever the previous user left open"""
+    if connection.closed:
+        raise base.Database.InterfaceError("connection already closed")
+    connection.rollback()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_pool(self, conn_params):
+        return pool.get_pool(
+            self.alias,
+            connect=lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params
+            ),
+            check=check_connection,
+            reset=reset_connection,
+            **self.settings_dict.get("POOL", {}),
+        )
+
+    def get_new_connection(self, conn_params):
+        connection = self.get_pool(conn_params).acquire()
+        self.isolation_level = self.settings_dict["OPTIONS"].get(
+            "isolation_level", connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                # Broken connections fail reset_connection and are dropped
+                pool.release(self.alias, self.connection)
@@ -0,0 +1,40 @@
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+from receita.core.db import routing
+
+
+class ReplicaReadMixin:
+    """Serve the safe requests of a DRF view from the read replicas
+
+    Users are pinned to the primary for a while after an unsafe request,
+    so they always read their own writes. Requests marked read_primary
+    (the batch sub-requests, reading the uncommitted writes of the batch)
+    never read the replicas.
+    """
+
+    _replica_reads_token = None
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            # Reset even when an unhandled exception skips finalize_response
+            if self._replica_reads_token is not None:
+                routing.reset_replica_reads(self._replica_reads_token)
+                self._replica_reads_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not settings.DATABASE_REPLICAS:
+            # Everything is read from the primary, don't ask the cache
+            return
+        if request.method in SAFE_METHODS:
+            primary = getattr(request, "read_primary", False)
+            enabled = not primary and not routing.is_pinned(request.user)
+            self._replica_reads_token = routing.set_replica_reads(enabled)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            routing.pin_primary(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
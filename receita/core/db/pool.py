@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    """No connection was released to the pool in time"""
+
+
+class PooledConnection:
+    """A DB-API connection with the bookkeeping used by the pool"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = self.used_at = time.monotonic()
+
+
+class ConnectionPool:
+    """Thread-safe pool of DB-API connections with health checks
+
+    Idle connections are checked with ``check`` before being handed out
+    again when they were idle longer than ``check_interval`` seconds, and
+    are replaced once they are older than ``max_lifetime`` seconds.
+    """
+
+    def __init__(
+        self,
+        connect,
+        check=None,
+        reset=None,
+        max_size=10,
+        timeout=10,
+        check_interval=30,
+        max_lifetime=3600,
+    ):
+        self.connect = connect
+        self.check = check
+        self.reset = reset
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self.max_lifetime = max_lifetime
+        self._idle = []
+        self._in_use = {}
+        self._condition = threading.Condition()
+
+    @property
+    def size(self):
+        """Return the number of open connections, idle or in use"""
+        with self._condition:
+            return len(self._idle) + len(self._in_use)
+
+    def _close(self, pooled):
+        try:
+            pooled.connection.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, pooled):
+        now = time.monotonic()
+        if now - pooled.created_at > self.max_lifetime:
+            return False
+        if self.check is None or now - pooled.used_at < self.check_interval:
+            return True
+        try:
+            self.check(pooled.connection)
+        except Exception:
+            return False
+        return True
+
+    def acquire(self):
+        """Return a healthy connection, opening one if the pool has room"""
+        deadline = time.monotonic() + self.timeout
+        with self._condition:
+            while True:
+                while self._idle:
+                    pooled = self._idle.pop()
+                    if self._is_healthy(pooled):
+                        self._in_use[id(pooled.connection)] = pooled
+                        return pooled.connection
+                    self._close(pooled)
+                if len(self._in_use) < self.max_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._condition.wait(remaining):
+                    raise PoolTimeout(
+                        f"No connection available after {self.timeout} seconds"
+                    )
+            # Reserve the slot while connecting outside of the lock
+            placeholder = object()
+            self._in_use[id(placeholder)] = placeholder
+        try:
+            connection = self.connect()
+        except Exception:
+            with self._condition:
+                del self._in_use[id(placeholder)]
+                self._condition.notify()
+            raise
+        with self._condition:
+            del self._in_use[id(placeholder)]
+            self._in_use[id(connection)] = PooledConnection(connection)
+        return connection
+
+    def release(self, connection, discard=False):
+        """Give a connection back to the pool, closing it if it is broken"""
+        with self._condition:
+            pooled = self._in_use.pop(id(connection), None)
+            self._condition.notify()
+        if pooled is None:
+            connection.close()
+            return
+        if not discard and self.reset is not None:
+            try:
+                self.reset(connection)
+            except Exception:
+                discard = True
+        if discard:
+            self._close(pooled)
+            return
+        pooled.used_at = time.monotonic()
+        with self._condition:
+            self._idle.append(pooled)
+            self._condition.notify()
+
+    def close_all(self):
+        """Close the idle connections, e.g. on shutdown"""
+        with self._condition:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._close(pooled)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, **kwargs):
+    """Return the process-wide pool of a database alias, creating it"""
+    with _pools_lock:
+        if alias not in _pools:
+            _pools[alias] = ConnectionPool(**kwargs)
+        return _pools[alias]
+
+
+def release(alias, connection):
+    """Give a connection back to the pool of a database alias
+
+    The pools are cleared in a forked child: a connection opened before
+    the fork belongs to no pool of this process and is closed instead of
+    being handed out to this worker.
+    """
+    with _pools_lock:
+        pool = _pools.get(alias)
+    if pool is None:
+        connection.close()
+    else:
+        # Closed by the pool as well when it didn't open the connection
+        pool.release(connection)
+
+
+if hasattr(os, "register_at_fork"):
+    # Connections must never be shared between forked workers
+    os.register_at_fork(after_in_child=_pools.clear)
@@ -0,0 +1,32 @@
+import random
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from receita.core.db.routing import replica_reads_enabled
+
+
+class ReplicaRouter:
+    """Route reads to the replicas when the request allows it
+
+    Only views using ``ReplicaReadMixin`` enable replica reads, for safe
+    requests of users that didn't write recently. Writes, migrations and
+    every other read go to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if replicas and replica_reads_enabled():
+            return random.choice(replicas)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Objects read from a replica must still be saved on the primary
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
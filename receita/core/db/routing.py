@@ -0,0 +1,51 @@
+"""Request-scoped state deciding when reads may go to the replicas"""
+import contextlib
+import contextvars
+
+from django.conf import settings
+from django.core.cache import cache
+
+_replica_reads = contextvars.ContextVar("replica_reads", default=False)
+
+
+def replica_reads_enabled():
+    """Return True if the current request may read from the replicas"""
+    return _replica_reads.get()
+
+
+def set_replica_reads(enabled):
+    """Allow or forbid replica reads, returning a token to reset it"""
+    return _replica_reads.set(enabled)
+
+
+def reset_replica_reads(token):
+    _replica_reads.reset(token)
+
+
+@contextlib.contextmanager
+def replica_reads(enabled=True):
+    """Allow (or forbid) reading from the replicas inside the block"""
+    token = set_replica_reads(enabled)
+    try:
+        yield
+    finally:
+        reset_replica_reads(token)
+
+
+def _pin_key(user):
+    return f"db:pin-primary:{user.pk}"
+
+
+def pin_primary(user):
+    """Send the user reads to the primary for a while after a write
+
+    Replicas lag behind the primary, so a client reading right after its
+    own write would not see it (read-your-writes).
+    """
+    if settings.DATABASE_REPLICAS and user.is_authenticated:
+        cache.set(_pin_key(user), True, settings.DATABASE_REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user):
+    """Return True if the user wrote recently and must read the primary"""
+    return user.is_authenticated and bool(cache.get(_pin_key(user)))
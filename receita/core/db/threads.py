@@ -0,0 +1,27 @@
+"""Database work of the async views, run in the thread pool"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+def in_thread(func):
+    """sync_to_async for the read-only ORM work of an async view
+
+    Django 3.1 has no ThreadSensitiveContext: thread sensitive calls of
+    every request of the worker share one thread, so the reads would run
+    one at a time. They run in the thread pool instead, each thread with
+    its own connection; the thread pool is outside of the request
+    started/finished signals, so the expired or broken connections are
+    closed here.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(wrapper, thread_sensitive=False)
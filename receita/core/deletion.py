@@ -0,0 +1,157 @@
+"""Soft deletion of users and receitas, purged in the background
+
+Deleting a big account cascades through its receitas, tags, ingredients
+and their join tables, which is too slow for a request. So the request
+only soft deletes: a receita gets deleted_at (LiveManager hides it and
+the signal handlers update the counters), a user is deactivated and
+loses its token. A DeletionJob is created in the same transaction and
+`manage.py process_deletions` purges the rows and image files in batches
+of RECEITA_DELETION_BATCH_SIZE, retrying failed jobs with backoff.
+"""
+import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from receita.core import counters, uploads
+from receita.core.models import DeletionJob, Ingredient, Receita, Tag, UploadSession
+
+
+def delete_receita(receita):
+    """Soft delete a receita and schedule its purge"""
+    with transaction.atomic():
+        receita.deleted_at = timezone.now()
+        # The signal handlers update the counters and publish the deletion
+        receita.save(update_fields=["deleted_at"])
+        return DeletionJob.objects.create(
+            kind=DeletionJob.Kind.RECEITA, object_id=receita.pk
+        )
+
+
+def delete_user(user):
+    """Deactivate a user and schedule the purge of the account"""
+    with transaction.atomic():
+        user.is_active = False
+        user.deleted_at = timezone.now()
+        user.save(update_fields=["is_active", "deleted_at"])
+        Token.objects.filter(user=user).delete()
+        return DeletionJob.objects.create(kind=DeletionJob.Kind.USER, object_id=user.pk)
+
+
+def _save_progress(job):
+    """Save the progress of the job and extend the lease of the worker"""
+    job.next_attempt_at = timezone.now() + datetime.timedelta(
+        seconds=settings.RECEITA_DELETION_LEASE_SECONDS
+    )
+    job.save(update_fields=["deleted_objects", "deleted_files", "next_attempt_at"])
+
+
+def _purge_receitas(job, receitas, batch_size):
+    """Delete receitas and their image files, a batch at a time"""
+    storage = Receita._meta.get_field("image").storage
+    receitas = receitas.order_by("pk").values_list("pk", "image")
+    while rows := list(receitas[:batch_size]):
+        pks = [pk for pk, _ in rows]
+        # Files first: a retry finds the rows whose files are left
+        for _, name in rows:
+            if name:
+                storage.delete(name)
+                job.deleted_files += 1
+        for session in UploadSession.objects.filter(receita_id__in=pks):
+            uploads.discard(session)
+        with transaction.atomic():
+            # Counters and events are skipped for the soft deleted receitas
+            Receita.all_objects.filter(pk__in=pks, deleted_at=None).update(
+                deleted_at=timezone.now()
+            )
+            for through, _ in counters.RELATIONS.values():
+                through.objects.filter(receita_id__in=pks).delete()
+            Receita.all_objects.filter(pk__in=pks).delete()
+        job.deleted_objects += len(pks)
+        _save_progress(job)
+
+
+def _purge_user(job, batch_size):
+    _purge_receitas(job, Receita.all_objects.filter(user_id=job.object_id), batch_size)
+    for model in (Tag, Ingredient):
+        pks = model.objects.filter(user_id=job.object_id).order_by("pk")
+        pks = pks.values_list("pk", flat=True)
+        while batch := list(pks[:batch_size]):
+            with transaction.atomic():
+                model.objects.filter(pk__in=batch).delete()
+            job.deleted_objects += len(batch)
+            _save_progress(job)
+    for session in UploadSession.objects.filter(user_id=job.object_id):
+        uploads.discard(session)
+    # Nothing big is left to cascade
+    get_user_model().objects.filter(pk=job.object_id).delete()
+
+
+def process(job, batch_size=None):
+    """Purge the object of a claimed job"""
+    batch_size = batch_size or settings.RECEITA_DELETION_BATCH_SIZE
+    if job.kind == DeletionJob.Kind.RECEITA:
+        receitas = Receita.all_objects.filter(pk=job.object_id)
+        _purge_receitas(job, receitas, batch_size)
+    else:
+        _purge_user(job, batch_size)
+
+
+def claim():
+    """Claim the next due job for this worker, None when there is none
+
+    A running job whose worker died is claimed again when its lease
+    (next_attempt_at) expires.
+    """
+    now = timezone.now()
+    due = DeletionJob.objects.filter(
+        status__in=[DeletionJob.Status.PENDING, DeletionJob.Status.RUNNING],
+        next_attempt_at__lte=now,
+    ).order_by("next_attempt_at")
+    lease = now + datetime.timedelta(seconds=settings.RECEITA_DELETION_LEASE_SECONDS)
+    for job in due[:10]:
+        # Only one worker updates the row it read
+        claimed = DeletionJob.objects.filter(
+            pk=job.pk, status=job.status, next_attempt_at=job.next_attempt_at
+        ).update(
+            status=DeletionJob.Status.RUNNING,
+            next_attempt_at=lease,
+            attempts=F("attempts") + 1,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def run(job, batch_size=None):
+    """Process a claimed job, recording its failure for a later retry"""
+    try:
+        process(job, batch_size)
+    except Exception as exc:
+        job.last_error = f"{type(exc).__name__}: {exc}"
+        if job.attempts >= settings.RECEITA_DELETION_MAX_ATTEMPTS:
+            job.status = DeletionJob.Status.FAILED
+        else:
+            job.status = DeletionJob.Status.PENDING
+            delay = settings.RECEITA_DELETION_RETRY_SECONDS * 2 ** (job.attempts - 1)
+            job.next_attempt_at = timezone.now() + datetime.timedelta(seconds=delay)
+    else:
+        job.status = DeletionJob.Status.DONE
+        job.finished_at = timezone.now()
+        job.last_error = ""
+    job.save()
+    return job
+
+
+def run_pending(batch_size=None):
+    """Process the due jobs, return how many were processed"""
+    processed = 0
+    while (job := claim()) is not None:
+        run(job, batch_size)
+        processed += 1
+    return processed
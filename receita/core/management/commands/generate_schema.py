@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from receita.utils.schema import generate_schema, schema_path
+
+
+class Command(BaseCommand):
+    """Django command to write the OpenAPI schema of this code version"""
+
+    help = "Generate the OpenAPI schema served by /openapi.json"
+
+    def handle(self, *args, **options):
+        path = schema_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so workers never read a partial file
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(generate_schema())
+        tmp_path.replace(path)
+        self.stdout.write(self.style.SUCCESS(f"Schema written to {path}"))
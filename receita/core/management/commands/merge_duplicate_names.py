@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from receita.core.normalization import merge_duplicates
+
+
+class Command(BaseCommand):
+    """Django command to merge tags and ingredients with the same name"""
+
+    help = "Merge the tags and ingredients whose normalized names are equal"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user", type=int, action="append", dest="users", help="User ID"
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            merged = merge_duplicates(options["users"])
+        self.stdout.write(self.style.SUCCESS(f"{merged} duplicates merged!"))
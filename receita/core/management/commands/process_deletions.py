@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from receita.core import deletion
+
+
+class Command(BaseCommand):
+    """Django command purging the deleted users and receitas"""
+
+    help = "Purge the soft deleted users and receitas in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the due jobs and exit instead of polling",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Seconds between two polls when idle (default 5)",
+        )
+        parser.add_argument("--batch-size", type=int, help="Rows per transaction")
+
+    def handle(self, *args, **options):
+        while True:
+            processed = deletion.run_pending(options["batch_size"])
+            if processed:
+                self.stdout.write(f"Processed {processed} deletion jobs")
+            if options["once"]:
+                break
+            if not processed:
+                time.sleep(options["interval"])
+        self.stdout.write(self.style.SUCCESS("Deletions processed!"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from receita.core import uploads
+
+
+class Command(BaseCommand):
+    """Django command discarding the abandoned resumable uploads"""
+
+    help = "Delete the upload sessions and partial files not updated for a while"
+
+    def handle(self, *args, **options):
+        purged = uploads.purge_expired()
+        self.stdout.write(self.style.SUCCESS(f"{purged} uploads purged!"))
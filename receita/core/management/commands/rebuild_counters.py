@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from receita.core import counters
+
+
+class Command(BaseCommand):
+    """Django command to recompute the denormalized receita counters"""
+
+    help = "Recompute the receita counters of users, tags and ingredients"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user", type=int, action="append", dest="users", help="User ID"
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            counters.rebuild(options["users"])
+        self.stdout.write(self.style.SUCCESS("Receita counters rebuilt!"))
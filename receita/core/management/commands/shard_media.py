@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from receita.core.models import Receita
+
+
+class Command(BaseCommand):
+    """Django command moving the receita images into sharded directories"""
+
+    help = "Move the receita images saved before the sharding, in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Images per transaction (default 500)",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only count the images to move"
+        )
+
+    def handle(self, *args, **options):
+        storage = Receita._meta.get_field("image").storage
+        if not hasattr(storage, "shard"):
+            raise CommandError(f"{type(storage).__name__} is not a sharded storage.")
+
+        rows = (
+            Receita.all_objects.exclude(image="")
+            .exclude(image=None)
+            .order_by("pk")
+            .values_list("pk", "image")
+        )
+        moved = missing = 0
+        last = 0
+        while batch := list(rows.filter(pk__gt=last)[: options["batch_size"]]):
+            last = batch[-1][0]
+            moves = [
+                (pk, name, storage.shard(name))
+                for pk, name in batch
+                if not storage.is_sharded(name)
+            ]
+            if options["dry_run"]:
+                moved += len(moves)
+                continue
+
+            copied = []
+            for pk, name, new_name in moves:
+                if storage.exists(name):
+                    storage.copy(name, new_name)
+                    copied.append((pk, name, new_name))
+                else:
+                    missing += 1
+                    self.stderr.write(f"Receita {pk}: {name} does not exist")
+
+            # The old file is kept until the row points to the new one
+            updated = []
+            with transaction.atomic():
+                for pk, name, new_name in copied:
+                    if Receita.all_objects.filter(pk=pk, image=name).update(
+                        image=new_name
+                    ):
+                        updated.append((name, new_name))
+                    else:
+                        # Changed meanwhile
+                        storage.delete(new_name)
+            for name, _ in updated:
+                storage.delete(name)
+            moved += len(updated)
+            self.stdout.write(f"Moved {moved} images")
+
+        verb = "to move" if options["dry_run"] else "moved"
+        self.stdout.write(
+            self.style.SUCCESS(f"{moved} images {verb}, {missing} missing!")
+        )
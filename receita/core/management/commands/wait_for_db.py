@@ -1,21 +1,64 @@
 import time
 
-from django.core.management.base import BaseCommand
-from django.db import connections
-from django.db.utils import OperationalError
+from django.core.management.base import BaseCommand, CommandError
+
+from receita.core import readiness
 
 
 class Command(BaseCommand):
-    """Django command to pouse execution until db is available"""
+    """Django command to pause execution until the dependencies are ready
+
+    Retries with exponential backoff until the database answers a query
+    (and, when asked, every migration is applied and the cache answers),
+    failing once --timeout seconds have passed.
+    """
+
+    help = "Wait until the database (and optionally migrations and cache) is ready"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=60,
+            help="Seconds to wait before giving up (default 60)",
+        )
+        parser.add_argument(
+            "--max-delay",
+            type=float,
+            default=5,
+            help="Longest pause between two attempts (default 5)",
+        )
+        parser.add_argument(
+            "--migrations",
+            action="store_true",
+            help="Also wait until every migration is applied",
+        )
+        parser.add_argument(
+            "--cache",
+            action="store_true",
+            help="Also wait until the cache answers",
+        )
 
     def handle(self, *args, **options):
-        self.stdout.write("Waiting for database...")
-        db_conn = None
-
-        while not db_conn:
-            try:
-                db_conn = connections["default"]
-            except OperationalError:
-                self.stdout.write("Database unavailable, waiting 1 second...")
-                time.sleep(1)
-        self.stdout.write(self.style.SUCCESS("Database available!"))
+        checks = ["database"]
+        if options["migrations"]:
+            checks.append("migrations")
+        if options["cache"]:
+            checks.append("cache")
+
+        self.stdout.write(f"Waiting for {', '.join(checks)}...")
+        deadline = time.monotonic() + options["timeout"]
+        delay = 0.1
+        while True:
+            errors = readiness.run_checks(checks)
+            failed = [error for error in errors.values() if error]
+            if not failed:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise CommandError(f"Not ready after {options['timeout']}s: {failed}")
+            pause = min(delay, remaining)
+            self.stdout.write(f"{'; '.join(failed)}, waiting {pause:.1f} seconds...")
+            time.sleep(pause)
+            delay = min(delay * 2, options["max_delay"])
+        self.stdout.write(self.style.SUCCESS("Ready!"))
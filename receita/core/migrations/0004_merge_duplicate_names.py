@@ -0,0 +1,18 @@
+from django.db import migrations
+
+from receita.core.normalization import merge_duplicates
+
+
+def merge_duplicate_names(apps, schema_editor):
+    merge_duplicates(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_normalized_names'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.1.13 on 2021-11-08 19:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_unique_normalized_names'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', 'normalized_name'], name='ingredient_name_prefix_idx', opclasses=['int4_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'normalized_name'], name='tag_name_prefix_idx', opclasses=['int4_ops', 'varchar_pattern_ops']),
+        ),
+    ]
@@ -8,6 +8,9 @@ from django.contrib.auth.models import (
     PermissionsMixin,
 )
 from django.db import models
+from django.utils import timezone
+
+from receita.core.normalization import normalize_name
 
 
 def receita_image_file_path(instace, filename):
@@ -43,6 +46,10 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Denormalized, maintained by receita.receita.signals
+    receita_count = models.PositiveIntegerField(default=0, editable=False)
+    # Set (with is_active=False) until receita.core.deletion purges the account
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     objects = UserManager()
 
@@ -56,6 +63,29 @@ class Tag(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="tags"
     )
+    # Unique per user: names differing only by case, accents or spaces
+    normalized_name = models.CharField(max_length=255, editable=False)
+    receita_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "normalized_name"],
+                name="unique_tag_normalized_name",
+            )
+        ]
+        indexes = [
+            # LIKE 'prefix%' lookups (autocomplete) with any database collation
+            models.Index(
+                fields=["user", "normalized_name"],
+                name="tag_name_prefix_idx",
+                opclasses=["int4_ops", "varchar_pattern_ops"],
+            )
+        ]
+
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_name(self.name)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -70,11 +100,41 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE,
         related_name="ingredients",
     )
+    # Unique per user: names differing only by case, accents or spaces
+    normalized_name = models.CharField(max_length=255, editable=False)
+    receita_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "normalized_name"],
+                name="unique_ingredient_normalized_name",
+            )
+        ]
+        indexes = [
+            # LIKE 'prefix%' lookups (autocomplete) with any database collation
+            models.Index(
+                fields=["user", "normalized_name"],
+                name="ingredient_name_prefix_idx",
+                opclasses=["int4_ops", "varchar_pattern_ops"],
+            )
+        ]
+
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_name(self.name)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
 
 
+class LiveManager(models.Manager):
+    """Hide the objects waiting to be purged by receita.core.deletion"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at=None)
+
+
 class Receita(models.Model):
     """Receita object"""
 
@@ -90,6 +150,70 @@ class Receita(models.Model):
     ingredients = models.ManyToManyField("Ingredient")
     tags = models.ManyToManyField("Tag")
     image = models.ImageField(null=True, upload_to=receita_image_file_path)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = LiveManager()
+    # Including the deleted receitas not purged yet
+    all_objects = models.Manager()
 
     def __str__(self):
         return self.title
+
+
+class DeletionJob(models.Model):
+    """Background purge of a deleted user or receita
+
+    Created when the object is soft deleted and processed in batches by
+    `manage.py process_deletions`, retried with backoff when it fails.
+    """
+
+    class Kind(models.TextChoices):
+        USER = "user"
+        RECEITA = "receita"
+
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        RUNNING = "running"
+        DONE = "done"
+        FAILED = "failed"
+
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+    object_id = models.PositiveIntegerField()
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.PENDING
+    )
+    # Progress: purged rows (receitas, tags, ingredients) and image files
+    deleted_objects = models.PositiveIntegerField(default=0)
+    deleted_files = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Retry backoff, or lease of the worker running the job
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} ({self.status})"
+
+
+class UploadSession(models.Model):
+    """Resumable upload of a receita image (see receita.core.uploads)
+
+    The bytes received so far are in a partial file named after the id;
+    offset is how many of them were acknowledged to the client.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    receita = models.ForeignKey(Receita, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
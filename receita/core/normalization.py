@@ -0,0 +1,78 @@
+"""Normalized tag and ingredient names
+
+"Batata", "batata " and "BATATA" are the same ingredient: names are
+compared by their normalized form, stored in Tag/Ingredient.normalized_name
+and unique per user.
+"""
+import collections
+import unicodedata
+
+from django.apps import apps as global_apps
+
+
+def normalize_name(name):
+    """Casefold, strip accents and collapse whitespace of a name"""
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+def _merge_relations(through, column, keep, duplicates):
+    """Point the receitas of the duplicates to the kept object"""
+    receita_ids = set(
+        through.objects.filter(**{f"{column}__in": [keep, *duplicates]}).values_list(
+            "receita_id", flat=True
+        )
+    )
+    linked = set(
+        through.objects.filter(**{column: keep}).values_list("receita_id", flat=True)
+    )
+    through.objects.filter(**{f"{column}__in": duplicates}).delete()
+    through.objects.bulk_create(
+        [through(receita_id=pk, **{column: keep}) for pk in receita_ids - linked]
+    )
+
+
+def merge_duplicates(user_ids=None, apps=global_apps):
+    """Merge the tags and ingredients whose names normalize the same
+
+    The oldest object of each group is kept, the receitas of the others
+    are moved to it and the receita counters of the users are rebuilt.
+    apps is the app registry, so migrations can pass their historical one.
+    Return the number of merged (deleted) objects.
+    """
+    # receita.core.models imports this module
+    from receita.core import counters
+
+    receita = apps.get_model("core", "Receita")
+    merged, users = 0, set()
+    for name, field in (("Tag", "tags"), ("Ingredient", "ingredients")):
+        model = apps.get_model("core", name)
+        through = receita._meta.get_field(field).remote_field.through
+        column = f"{name.lower()}_id"
+        objects = model.objects.order_by("id")
+        if user_ids is not None:
+            objects = objects.filter(user_id__in=user_ids)
+
+        groups = collections.defaultdict(list)
+        rows = objects.values_list("id", "user_id", "name", "normalized_name")
+        for pk, user_id, value, normalized in rows.iterator():
+            groups[user_id, normalize_name(value)].append((pk, normalized))
+
+        renamed = []
+        for (user_id, normalized), group in groups.items():
+            keep = group[0][0]
+            duplicates = [pk for pk, _ in group[1:]]
+            if duplicates:
+                _merge_relations(through, column, keep, duplicates)
+                model.objects.filter(pk__in=duplicates).delete()
+                merged += len(duplicates)
+                users.add(user_id)
+            if group[0][1] != normalized:
+                renamed.append(model(pk=keep, normalized_name=normalized))
+        # Duplicates are gone, so the new names can't collide anymore
+        model.objects.bulk_update(renamed, ["normalized_name"], batch_size=500)
+
+    if users:
+        counters.rebuild(users, apps=apps)
+    return merged
@@ -0,0 +1,117 @@
+"""Readiness of the dependencies of a worker
+
+A worker is ready when the database answers a query, every migration is
+applied and the cache can be written and read back. `manage.py
+wait_for_db` waits for it before the server starts, /readyz reports it
+to the load balancer (cached for RECEITA_READINESS_CACHE_SECONDS so the
+probes don't hit the database every time) and /healthz only reports that
+the process answers.
+"""
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.migrations.executor import MigrationExecutor
+
+
+class NotReady(Exception):
+    """A dependency of the worker is not ready"""
+
+
+def check_database(alias=DEFAULT_DB_ALIAS):
+    """Run a query on the database"""
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+    except DatabaseError as exc:
+        raise NotReady(f"database unavailable: {exc}") from exc
+
+
+_migrated = set()
+
+
+def check_migrations(alias=DEFAULT_DB_ALIAS):
+    """Check that every migration is applied to the database
+
+    Applied migrations are never unapplied by a deploy, so a database
+    found migrated isn't checked again by this process.
+    """
+    if alias in _migrated:
+        return
+    try:
+        executor = MigrationExecutor(connections[alias])
+        targets = executor.loader.graph.leaf_nodes()
+        pending = executor.migration_plan(targets)
+    except DatabaseError as exc:
+        raise NotReady(f"database unavailable: {exc}") from exc
+    if pending:
+        names = ", ".join(f"{m.app_label}.{m.name}" for m, _ in pending)
+        raise NotReady(f"{len(pending)} pending migrations: {names}")
+    _migrated.add(alias)
+
+
+def check_cache():
+    """Write a key to the cache and read it back
+
+    The production cache ignores connection errors, so a failed round trip
+    shows up as a missing key instead of an exception.
+    """
+    key, value = "readiness:check", uuid.uuid4().hex
+    try:
+        cache.set(key, value, timeout=60)
+        found = cache.get(key)
+    except Exception as exc:
+        raise NotReady(f"cache unavailable: {exc}") from exc
+    if found != value:
+        raise NotReady("cache unavailable: value not read back")
+
+
+CHECKS = {
+    "database": check_database,
+    "migrations": check_migrations,
+    "cache": check_cache,
+}
+
+
+def run_checks(names=CHECKS):
+    """Return the error of each check by name, None for the passing ones"""
+    errors = {}
+    for name in names:
+        try:
+            CHECKS[name]()
+        except NotReady as exc:
+            errors[name] = str(exc)
+        else:
+            errors[name] = None
+    return errors
+
+
+_status = None
+_lock = threading.Lock()
+
+
+def readiness():
+    """Return (ready, errors by check) as last computed by this process"""
+    global _status
+    status = _status
+    if status is None or time.monotonic() >= status[0]:
+        with _lock:
+            if _status is None or time.monotonic() >= _status[0]:
+                errors = run_checks()
+                ready = not any(errors.values())
+                expires = time.monotonic() + settings.RECEITA_READINESS_CACHE_SECONDS
+                _status = (expires, ready, errors)
+            status = _status
+    return status[1], status[2]
+
+
+def clear():
+    """Forget the cached readiness and the migrated databases"""
+    global _status
+    with _lock:
+        _status = None
+        _migrated.clear()
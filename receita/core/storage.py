@@ -0,0 +1,204 @@
+"""Storage of the uploaded images, sharded in nested directories
+
+`uploads/receita/` held every image in one flat directory, which gets
+slow to list, back up and look up once it holds millions of files. The
+storages below put each file two levels deeper, in directories named
+after the hash of its name (uploads/receita/3f/a2/<uuid>.jpg), so no
+directory holds more than a few hundred files.
+
+ShardedFileSystemStorage writes a file under a temporary name and
+renames it, so a file is never seen half written. S3Storage keeps the
+files in an S3 compatible bucket (MinIO locally), it needs boto3.
+`manage.py shard_media` moves the files saved before the sharding.
+"""
+import hashlib
+import mimetypes
+import os
+import shutil
+import tempfile
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import File
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage, Storage
+from django.utils.deconstruct import deconstructible
+
+
+class ShardedStorageMixin:
+    """Add the hash prefix directories to the generated file names"""
+
+    shard_depth = 2
+    shard_width = 2
+
+    def _shards(self, basename):
+        digest = hashlib.md5(basename.encode()).hexdigest()
+        width = self.shard_width
+        starts = range(0, width * self.shard_depth, width)
+        return [digest[start:][:width] for start in starts]
+
+    def shard(self, name):
+        """Return the sharded name of a file saved as name"""
+        dirname, basename = os.path.split(name)
+        return "/".join([dirname, *self._shards(basename), basename]).lstrip("/")
+
+    def is_sharded(self, name):
+        basename = name.rpartition("/")[2]
+        return name.endswith("/".join(["", *self._shards(basename), basename]))
+
+    def generate_filename(self, filename):
+        return self.shard(super().generate_filename(filename).replace("\\", "/"))
+
+
+@deconstructible
+class ShardedFileSystemStorage(ShardedStorageMixin, FileSystemStorage):
+    """FileSystemStorage with sharded directories and atomic writes"""
+
+    def _makedirs(self, directory):
+        if self.directory_permissions_mode is None:
+            os.makedirs(directory, exist_ok=True)
+            return
+        # os.makedirs() doesn't apply the mode to intermediate directories
+        old_umask = os.umask(0o777 & ~self.directory_permissions_mode)
+        try:
+            os.makedirs(directory, self.directory_permissions_mode, exist_ok=True)
+        finally:
+            os.umask(old_umask)
+
+    def _temporary_path(self, full_path):
+        directory, basename = os.path.split(full_path)
+        return os.path.join(directory, f".{basename}.{uuid.uuid4().hex}.part")
+
+    def _save(self, name, content):
+        full_path = self.path(name)
+        self._makedirs(os.path.dirname(full_path))
+        temporary_path = self._temporary_path(full_path)
+        try:
+            if hasattr(content, "temporary_file_path"):
+                file_move_safe(content.temporary_file_path(), temporary_path)
+            else:
+                # Created with the umask applied, unlike tempfile.mkstemp()
+                fd = os.open(temporary_path, self.OS_OPEN_FLAGS, 0o666)
+                with os.fdopen(fd, "wb") as f:
+                    for chunk in content.chunks():
+                        f.write(chunk if isinstance(chunk, bytes) else chunk.encode())
+                    f.flush()
+                    os.fsync(f.fileno())
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary_path, self.file_permissions_mode)
+            # get_available_name() was called by save(), names are uuids
+            os.replace(temporary_path, full_path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+        return name
+
+    def copy(self, name, new_name):
+        """Make new_name a copy of the file name, a hard link when possible"""
+        path = self.path(name)
+        new_path = self.path(new_name)
+        self._makedirs(os.path.dirname(new_path))
+        temporary_path = self._temporary_path(new_path)
+        try:
+            try:
+                os.link(path, temporary_path)
+            except OSError:
+                shutil.copy2(path, temporary_path)
+            os.replace(temporary_path, new_path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+
+
+@deconstructible
+class S3Storage(ShardedStorageMixin, Storage):
+    """Sharded storage in an S3 compatible bucket
+
+    Configured by the RECEITA_S3_* settings; RECEITA_S3_ENDPOINT_URL points
+    to a local stand-in such as MinIO. Uploads are atomic on S3: an object
+    is only visible once completely written.
+    """
+
+    def __init__(self, bucket=None, endpoint_url=None, public_url=None):
+        try:
+            import boto3
+            from botocore.exceptions import ClientError
+        except ImportError as exc:
+            raise ImproperlyConfigured("S3Storage requires boto3.") from exc
+        self.bucket = bucket or settings.RECEITA_S3_BUCKET
+        if not self.bucket:
+            raise ImproperlyConfigured("RECEITA_S3_BUCKET is not set.")
+        self.public_url = public_url or settings.RECEITA_S3_PUBLIC_URL
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or settings.RECEITA_S3_ENDPOINT_URL,
+            aws_access_key_id=settings.RECEITA_S3_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.RECEITA_S3_SECRET_ACCESS_KEY,
+        )
+        self.client_error = ClientError
+
+    def _open(self, name, mode="rb"):
+        body = self.client.get_object(Bucket=self.bucket, Key=name)["Body"]
+        f = tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+        shutil.copyfileobj(body, f)
+        f.seek(0)
+        return File(f, name=name)
+
+    def _save(self, name, content):
+        if hasattr(content, "seek"):
+            content.seek(0)
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        self.client.upload_fileobj(
+            content, self.bucket, name, ExtraArgs={"ContentType": content_type}
+        )
+        return name
+
+    def copy(self, name, new_name):
+        self.client.copy_object(
+            Bucket=self.bucket,
+            Key=new_name,
+            CopySource={"Bucket": self.bucket, "Key": name},
+        )
+
+    def delete(self, name):
+        self.client.delete_object(Bucket=self.bucket, Key=name)
+
+    def _head(self, name):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=name)
+        except self.client_error as exc:
+            if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return None
+            raise
+
+    def exists(self, name):
+        return self._head(name) is not None
+
+    def size(self, name):
+        return self._head(name)["ContentLength"]
+
+    def get_modified_time(self, name):
+        return self._head(name)["LastModified"]
+
+    def listdir(self, path):
+        prefix = f"{path.rstrip('/')}/" if path else ""
+        directories, files = [], []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(
+            Bucket=self.bucket, Prefix=prefix, Delimiter="/"
+        ):
+            for common in page.get("CommonPrefixes", []):
+                directories.append(common["Prefix"].rstrip("/").rpartition("/")[2])
+            for obj in page.get("Contents", []):
+                files.append(obj["Key"].rpartition("/")[2])
+        return directories, files
+
+    def url(self, name):
+        if self.public_url:
+            return f"{self.public_url.rstrip('/')}/{name}"
+        return self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": name}
+        )
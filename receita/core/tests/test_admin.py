@@ -1,7 +1,16 @@
+import csv
+from unittest.mock import patch
+
+from django.contrib.admin import helpers
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from receita.core.admin import EstimatedCountPaginator
+from receita.core.models import DeletionJob, Receita, Tag
+
 
 class AdminSiteTests(TestCase):
     def setUp(self):
@@ -37,3 +46,161 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+    def test_delete_user(self):
+        """Test that deleting a user deactivates it for the background purge"""
+        url = reverse("admin:core_user_changelist")
+        data = {
+            "action": "delete_selected",
+            helpers.ACTION_CHECKBOX_NAME: [self.user.id],
+        }
+        res = self.client.post(url, data)
+        self.assertContains(res, self.user.email)
+
+        self.client.post(url, {**data, "post": "yes"})
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        job = DeletionJob.objects.get()
+        self.assertEqual(job.object_id, self.user.pk)
+
+
+@override_settings(RECEITA_ADMIN_CHUNK_SIZE=2)
+class ReceitaAdminTests(TestCase):
+    def setUp(self):
+        self.admin_user = get_user_model().objects.create_superuser(
+            email="test@italocarv.com", password="pass2512"
+        )
+        self.client.force_login(self.admin_user)
+        self.user = get_user_model().objects.create_user(
+            email="test2@italocarv2.com", password="test1452"
+        )
+        self.other = get_user_model().objects.create_user(
+            email="other@italocarv2.com", password="test1452"
+        )
+        self.tag = Tag.objects.create(user=self.user, name="Vegano")
+        self.other_tag = Tag.objects.create(user=self.other, name="Vegetariano")
+        self.receitas = [
+            Receita.objects.create(
+                user=self.user, title=f"Receita {index}", time_minutes=5, price=1
+            )
+            for index in range(5)
+        ]
+        self.receitas[0].tags.add(self.tag)
+
+    def test_changelist_queries(self):
+        """Test that the changelist doesn't query per row"""
+        url = reverse("admin:core_receita_changelist")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        Receita.objects.create(user=self.other, title="Bolo", time_minutes=5, price=1)
+
+        with self.assertNumQueries(len(queries)):
+            res = self.client.get(url)
+        self.assertContains(res, "other@italocarv2.com")
+
+    @override_settings(RECEITA_ADMIN_EXACT_COUNT_LIMIT=1000)
+    def test_changelist_estimated_count(self):
+        """Test that only the unfiltered changelist count is estimated"""
+        url = reverse("admin:core_receita_changelist")
+        with patch.object(EstimatedCountPaginator, "estimate", return_value=5000):
+            res = self.client.get(url)
+            self.assertEqual(res.context["cl"].result_count, 5000)
+
+            res = self.client.get(url, {"q": "test2@italocarv2.com"})
+            self.assertEqual(res.context["cl"].result_count, 5)
+
+            res = self.client.get(url, {"user__id__exact": self.other.id})
+            self.assertEqual(res.context["cl"].result_count, 0)
+
+    def test_search_by_email(self):
+        """Test searching receitas by owner email"""
+        url = reverse("admin:core_receita_changelist")
+        res = self.client.get(url, {"q": "other@italocarv2.com"})
+
+        self.assertNotContains(res, "Receita 1")
+
+    def test_change_form_scoped_to_owner(self):
+        """Test that tags are picked among the owner ones"""
+        url = reverse("admin:core_receita_change", args=[self.receitas[0].id])
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, 200)
+        field = res.context["adminform"].form.fields["tags"]
+        self.assertEqual(list(field.queryset), [self.tag])
+        self.assertIn(f"?owner={self.user.id}", field.widget.widget.get_url())
+
+        autocomplete_url = reverse("admin:core_tag_autocomplete")
+        res = self.client.get(autocomplete_url, {"owner": self.user.id, "term": "veg"})
+        self.assertEqual([r["text"] for r in res.json()["results"]], ["Vegano"])
+
+    def test_other_user_tag_rejected(self):
+        """Test that the tags of another user are rejected"""
+        url = reverse("admin:core_receita_add")
+        res = self.client.post(
+            url,
+            {
+                "user": self.user.id,
+                "title": "Bolo",
+                "time_minutes": 5,
+                "price": 1,
+                "tags": [self.other_tag.id],
+            },
+        )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn("tags", res.context["adminform"].form.errors)
+
+    def test_tag_search_normalized_prefix(self):
+        """Test that tags are searched by their normalized name"""
+        url = reverse("admin:core_tag_changelist")
+        res = self.client.get(url, {"q": "  VEGAN"})
+
+        self.assertContains(res, "Vegano")
+        self.assertNotContains(res, "Vegetariano")
+
+    def test_export_csv(self):
+        """Test exporting the selected receitas in chunks"""
+        url = reverse("admin:core_receita_changelist")
+        res = self.client.post(
+            url,
+            {
+                "action": "export_csv",
+                helpers.ACTION_CHECKBOX_NAME: [r.id for r in self.receitas],
+            },
+        )
+
+        rows = list(csv.reader(b"".join(res.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0][:3], ["id", "user", "title"])
+        self.assertEqual(
+            [row[0] for row in rows[1:]], [str(r.id) for r in self.receitas]
+        )
+        self.assertEqual(rows[1][6], "Vegano")
+
+    def test_delete_in_chunks(self):
+        """Test deleting the selection in chunks after confirmation"""
+        url = reverse("admin:core_receita_changelist")
+        data = {
+            "action": "delete_in_chunks",
+            helpers.ACTION_CHECKBOX_NAME: [r.id for r in self.receitas[:3]],
+        }
+        res = self.client.post(url, data)
+        self.assertContains(res, "delete 3 receitas")
+        self.assertEqual(Receita.objects.count(), 5)
+
+        self.client.post(url, {**data, "post": "yes"})
+        self.assertEqual(Receita.objects.count(), 2)
+        self.assertEqual(Receita.all_objects.count(), 5)
+        self.assertEqual(DeletionJob.objects.count(), 3)
+        self.tag.refresh_from_db()
+        self.assertEqual(self.tag.receita_count, 0)
+
+    def test_delete_view(self):
+        """Test that the delete page soft deletes the receita"""
+        url = reverse("admin:core_receita_delete", args=[self.receitas[0].id])
+        res = self.client.get(url)
+        self.assertContains(res, "Receita 0")
+
+        self.client.post(url, {"post": "yes"})
+        self.assertFalse(Receita.objects.filter(pk=self.receitas[0].pk).exists())
+        job = DeletionJob.objects.get()
+        self.assertEqual(job.object_id, self.receitas[0].pk)
@@ -1,24 +1,102 @@
+from io import StringIO
+from types import SimpleNamespace
 from unittest.mock import patch
 
-from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from receita.core.models import Receita, Tag
+
 
 class CommandTest(TestCase):
     def test_wait_for_db_ready(self):
         """Test waiting for db is available"""
-        with patch("django.db.utils.ConnectionHandler.__getitem__") as gi:
-            # Returm succeful connection
-            gi.return_value = True
-            call_command("wait_for_db")
-            self.assertEqual(gi.call_count, 1)
+        with patch(
+            "django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection"
+        ) as ec:
+            call_command("wait_for_db", stdout=StringIO())
+            self.assertEqual(ec.call_count, 1)
 
     @patch("time.sleep", return_value=True)
     def test_wait_for_db(self, ts):
         """Test waiting for db"""
-        with patch("django.db.utils.ConnectionHandler.__getitem__") as gi:
+        with patch(
+            "django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection"
+        ) as ec:
             # Return error in db connection for 5 times
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command("wait_for_db")
-            self.assertEqual(gi.call_count, 6)
+            ec.side_effect = [OperationalError] * 5 + [None]
+            call_command("wait_for_db", stdout=StringIO())
+            self.assertEqual(ec.call_count, 6)
+        # Exponential backoff
+        self.assertEqual(
+            [call.args[0] for call in ts.call_args_list], [0.1, 0.2, 0.4, 0.8, 1.6]
+        )
+
+    def test_wait_for_db_timeout(self):
+        """Test giving up once the timeout has passed"""
+        with patch(
+            "django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection",
+            side_effect=OperationalError,
+        ):
+            with self.assertRaises(CommandError):
+                call_command("wait_for_db", timeout=0, stdout=StringIO())
+
+    @patch("time.sleep", return_value=True)
+    def test_wait_for_db_migrations(self, ts):
+        """Test waiting until the pending migrations are applied"""
+        plans = [[("core", "0099_pending")], []]
+        with patch(
+            "django.db.migrations.executor.MigrationExecutor.migration_plan",
+            side_effect=lambda targets: [
+                (SimpleNamespace(app_label=app, name=name), False)
+                for app, name in plans.pop(0)
+            ],
+        ):
+            out = StringIO()
+            call_command("wait_for_db", migrations=True, cache=True, stdout=out)
+        self.assertIn("core.0099_pending", out.getvalue())
+        self.assertEqual(ts.call_count, 1)
+
+    def test_rebuild_counters(self):
+        """Test recomputing the receita counters"""
+        user = get_user_model().objects.create_user("test@italocarv.com", "pass")
+        tag = Tag.objects.create(user=user, name="Vegano")
+        Receita.objects.create(
+            user=user, title="Sample receita", time_minutes=10, price=5
+        ).tags.add(tag)
+        Tag.objects.update(receita_count=0)
+        get_user_model().objects.update(receita_count=0)
+
+        call_command("rebuild_counters", stdout=StringIO())
+
+        user.refresh_from_db()
+        tag.refresh_from_db()
+        self.assertEqual((user.receita_count, tag.receita_count), (1, 1))
+
+    def test_merge_duplicate_names(self):
+        """Test merging tags whose names normalize the same"""
+        user = get_user_model().objects.create_user("test@italocarv.com", "pass")
+        tag = Tag.objects.create(user=user, name="Vegano")
+        duplicate = Tag.objects.create(user=user, name="legacy")
+        # Rows saved before names were normalized
+        Tag.objects.filter(pk=duplicate.pk).update(
+            name="VEGANO ", normalized_name="VEGANO "
+        )
+        receita1, receita2 = [
+            Receita.objects.create(user=user, title=title, time_minutes=10, price=5)
+            for title in ("Salada", "Tofu")
+        ]
+        receita1.tags.add(tag, duplicate)
+        receita2.tags.add(duplicate)
+
+        call_command("merge_duplicate_names", stdout=StringIO())
+
+        tag.refresh_from_db()
+        self.assertEqual(list(Tag.objects.filter(user=user)), [tag])
+        self.assertEqual(
+            set(tag.receita_set.values_list("id", flat=True)),
+            {receita1.id, receita2.id},
+        )
+        self.assertEqual(tag.receita_count, 2)
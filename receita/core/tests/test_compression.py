@@ -0,0 +1,140 @@
+import gzip
+import json
+import zlib
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from receita.core.models import Tag
+from receita.utils import compression
+from receita.utils.compression import CompressionMiddleware, compress
+
+TAGS_URL = reverse("receita:tag-list")
+
+
+class CompressionMiddlewareTests(TestCase):
+    """Test the compression of the API responses"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@italocarv.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        for index in range(100):
+            Tag.objects.create(user=self.user, name=f"Tag {index}")
+        self.factory = RequestFactory()
+
+    def get_tags(self, accept_encoding):
+        return self.client.get(
+            TAGS_URL, {"limit": 100}, HTTP_ACCEPT_ENCODING=accept_encoding
+        )
+
+    def test_gzip(self):
+        """Test that the API responses are compressed when accepted"""
+        res = self.get_tags("gzip")
+
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", res["Vary"])
+        self.assertEqual(int(res["Content-Length"]), len(res.content))
+        data = json.loads(gzip.decompress(res.content))
+        self.assertEqual(len(data["results"]), 100)
+
+    @skipUnless(compression.brotli, "brotli is not installed")
+    def test_brotli_preferred(self):
+        """Test that brotli is preferred over gzip by default"""
+        res = self.get_tags("gzip, deflate, br")
+
+        self.assertEqual(res["Content-Encoding"], "br")
+        data = json.loads(compression.brotli.decompress(res.content))
+        self.assertEqual(len(data["results"]), 100)
+
+    @skipUnless(compression.zstandard, "zstandard is not installed")
+    def test_zstd(self):
+        """Test the zstd compression"""
+        res = self.get_tags("zstd")
+
+        self.assertEqual(res["Content-Encoding"], "zstd")
+        decompressor = compression.zstandard.ZstdDecompressor()
+        data = json.loads(decompressor.decompressobj().decompress(res.content))
+        self.assertEqual(len(data["results"]), 100)
+
+    def test_quality_values(self):
+        """Test that the client preferences are followed"""
+        self.assertEqual(self.get_tags("br;q=0.5, gzip")["Content-Encoding"], "gzip")
+        self.assertNotIn("Content-Encoding", self.get_tags("gzip;q=0"))
+        self.assertNotIn("Content-Encoding", self.get_tags(""))
+
+    def test_small_response_not_compressed(self):
+        """Test that responses under the minimum size are sent as is"""
+        Tag.objects.exclude(name="Tag 1").delete()
+
+        res = self.get_tags("gzip")
+
+        self.assertNotIn("Content-Encoding", res)
+
+    @override_settings(RECEITA_COMPRESSION_MIN_SIZE=1)
+    def test_site_not_compressed(self):
+        """Test that only the API responses are compressed"""
+        res = self.client.get(reverse("admin:login"), HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertNotIn("Content-Encoding", res)
+
+    def middleware(self, response, view=None, accept_encoding="gzip"):
+        request = self.factory.get("/api/", HTTP_ACCEPT_ENCODING=accept_encoding)
+        middleware = CompressionMiddleware(lambda request: response)
+        if view is not None:
+            middleware.process_view(request, view, (), {})
+        return middleware(request)
+
+    def test_streaming(self):
+        """Test that streaming responses are compressed chunk by chunk"""
+        chunks = [b"receita,price\n"] + [b"bolo,12.50\n"] * 200
+        response = self.middleware(StreamingHttpResponse(iter(chunks)))
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        decompressor = zlib.decompressobj(31)
+        # Every chunk can be decompressed as soon as it is received
+        received = [decompressor.decompress(c) for c in response.streaming_content]
+        self.assertEqual(received[0], chunks[0])
+        self.assertEqual(b"".join(received), b"".join(chunks))
+
+    def test_event_stream_not_compressed(self):
+        """Test that the event streams are left alone"""
+        response = self.middleware(
+            StreamingHttpResponse(iter([b"data: {}\n\n"]), "text/event-stream")
+        )
+
+        self.assertNotIn("Content-Encoding", response)
+
+    def test_view_compression_options(self):
+        """Test the per view levels and opt-out"""
+
+        @compress(gzip=1)
+        def fast(request):
+            pass
+
+        @compress(enabled=False)
+        def secret(request):
+            pass
+
+        content = json.dumps([{"name": f"Tag {i}"} for i in range(200)]).encode()
+        fast_response = self.middleware(HttpResponse(content), fast)
+        default_response = self.middleware(HttpResponse(content))
+
+        self.assertEqual(fast_response.content, gzip.compress(content, 1, mtime=0))
+        self.assertEqual(default_response.content, gzip.compress(content, 6, mtime=0))
+        self.assertNotIn(
+            "Content-Encoding", self.middleware(HttpResponse(content), secret)
+        )
+
+    def test_etag_weakened(self):
+        """Test that the ETag of a compressed response is weak"""
+        response = HttpResponse(b"x" * 2000)
+        response["ETag"] = '"abc"'
+
+        self.assertEqual(self.middleware(response)["ETag"], 'W/"abc"')
@@ -0,0 +1,201 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from receita.core.db import pool as db_pool
+from receita.core.db import routing
+from receita.core.db.pool import ConnectionPool, PoolTimeout
+from receita.core.db.routers import ReplicaRouter
+from receita.core.db.threads import in_thread
+from receita.core.models import Tag
+
+TAGS_URL = reverse("receita:tag-list")
+
+
+def check_connection(connection):
+    connection.execute("SELECT 1")
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test the in-process connection pool"""
+
+    def pool(self, **kwargs):
+        return ConnectionPool(
+            lambda: sqlite3.connect(":memory:", check_same_thread=False),
+            check=check_connection,
+            **kwargs,
+        )
+
+    def test_connection_reused(self):
+        """Test that released connections are handed out again"""
+        pool = self.pool()
+        connection = pool.acquire()
+        pool.release(connection)
+
+        self.assertIs(pool.acquire(), connection)
+        self.assertEqual(pool.size, 1)
+
+    def test_pool_limit(self):
+        """Test that acquiring over max_size times out"""
+        pool = self.pool(max_size=1, timeout=0.01)
+        pool.acquire()
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+
+    def test_broken_connection_replaced(self):
+        """Test that connections failing the health check are replaced"""
+        pool = self.pool(check_interval=0)
+        connection = pool.acquire()
+        pool.release(connection)
+        connection.close()
+
+        new_connection = pool.acquire()
+        self.assertIsNot(new_connection, connection)
+        check_connection(new_connection)
+
+    def test_failed_reset_discards_connection(self):
+        """Test that connections failing the reset are not pooled"""
+        pool = ConnectionPool(
+            lambda: sqlite3.connect(":memory:"),
+            reset=lambda connection: connection.execute("invalid sql"),
+        )
+        connection = pool.acquire()
+        pool.release(connection)
+
+        self.assertEqual(pool.size, 0)
+
+
+class ForkedPoolTests(SimpleTestCase):
+    """Test releasing the connections opened before a fork"""
+
+    def setUp(self):
+        self.addCleanup(db_pool._pools.pop, "forked", None)
+        self.pool = db_pool.get_pool(
+            "forked", connect=lambda: sqlite3.connect(":memory:")
+        )
+        self.connection = self.pool.acquire()
+        # What os.register_at_fork does in the child
+        db_pool._pools.clear()
+
+    def assertClosed(self, connection):
+        with self.assertRaises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1")
+
+    def test_no_pool_in_child(self):
+        """Test that the connection is closed without creating a pool"""
+        db_pool.release("forked", self.connection)
+
+        self.assertClosed(self.connection)
+        self.assertNotIn("forked", db_pool._pools)
+
+    def test_not_pooled_in_child(self):
+        """Test that the pool of the child doesn't take the connection"""
+        child_pool = db_pool.get_pool(
+            "forked", connect=lambda: sqlite3.connect(":memory:")
+        )
+
+        db_pool.release("forked", self.connection)
+
+        self.assertClosed(self.connection)
+        self.assertEqual(child_pool.size, 0)
+
+
+class InThreadTests(SimpleTestCase):
+    """Test running the ORM work of the async views in the thread pool"""
+
+    def test_concurrent(self):
+        """Test that the calls of concurrent requests don't wait for each other"""
+        threads = set()
+
+        @in_thread
+        def read():
+            threads.add(threading.get_ident())
+            time.sleep(0.2)
+
+        async def requests():
+            await asyncio.gather(read(), read(), read())
+
+        started = time.monotonic()
+        async_to_sync(requests)()
+
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(len(threads), 3)
+
+
+@override_settings(DATABASE_REPLICAS=["replica1", "replica2"])
+class ReplicaRouterTests(SimpleTestCase):
+    """Test routing queries to the read replicas"""
+
+    def test_reads_default_to_primary(self):
+        """Test that reads go to the primary unless enabled"""
+        self.assertEqual(ReplicaRouter().db_for_read(Tag), "default")
+
+    def test_replica_reads(self):
+        """Test that enabled reads go to one of the replicas"""
+        with routing.replica_reads():
+            self.assertIn(ReplicaRouter().db_for_read(Tag), ["replica1", "replica2"])
+
+    def test_writes_go_to_primary(self):
+        """Test that writes always go to the primary"""
+        with routing.replica_reads():
+            self.assertEqual(ReplicaRouter().db_for_write(Tag), "default")
+
+    def test_no_migrations_on_replicas(self):
+        """Test that replicas are not migrated"""
+        self.assertFalse(ReplicaRouter().allow_migrate("replica1", "core"))
+        self.assertTrue(ReplicaRouter().allow_migrate("default", "core"))
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"])
+class ReplicaReadViewTests(TestCase):
+    """Test that viewsets read from the replicas with stickiness"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            "test@italocarv.com", "testpass"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.reads = []
+
+    def get_tags(self):
+        def db_for_read(router, model, **hints):
+            self.reads.append(routing.replica_reads_enabled())
+            return "default"
+
+        with patch.object(ReplicaRouter, "db_for_read", db_for_read):
+            return self.client.get(TAGS_URL)
+
+    def test_safe_requests_read_replicas(self):
+        """Test that listing reads from the replicas"""
+        self.get_tags()
+        self.assertTrue(self.reads)
+        self.assertTrue(all(self.reads))
+
+    def test_read_your_writes(self):
+        """Test that reads after a write go to the primary"""
+        self.client.post(TAGS_URL, {"name": "Vegano"})
+        self.get_tags()
+
+        self.assertTrue(routing.is_pinned(self.user))
+        self.assertFalse(any(self.reads))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        """Test that the pin isn't looked up without replicas"""
+        with patch.object(routing, "is_pinned") as is_pinned:
+            self.get_tags()
+
+        is_pinned.assert_not_called()
+        self.assertFalse(any(self.reads))
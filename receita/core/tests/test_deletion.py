@@ -0,0 +1,131 @@
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from receita.core import deletion, uploads
+from receita.core.models import DeletionJob, Ingredient, Receita, Tag, UploadSession
+
+
+@override_settings(RECEITA_DELETION_BATCH_SIZE=2)
+class DeletionTests(TestCase):
+    """Test the soft deletion and background purge"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = get_user_model().objects.create_user(
+            "test@italocarv.com", "testpass"
+        )
+        self.other = get_user_model().objects.create_user(
+            "other@italocarv.com", "testpass"
+        )
+        self.tag = Tag.objects.create(user=self.user, name="Vegano")
+        Ingredient.objects.create(user=self.user, name="Batata")
+        self.receitas = [
+            Receita.objects.create(
+                user=self.user, title=f"Receita {index}", time_minutes=5, price=1
+            )
+            for index in range(5)
+        ]
+        self.receitas[0].tags.add(self.tag)
+        self.receitas[0].image.save("image.jpg", ContentFile(b"image"))
+        self.image = self.receitas[0].image.path
+        self.kept = Receita.objects.create(
+            user=self.other, title="Bolo", time_minutes=5, price=1
+        )
+
+    def test_purge_receita(self):
+        """Test that a deleted receita is purged with its image"""
+        job = deletion.delete_receita(self.receitas[0])
+        self.assertFalse(Receita.objects.filter(pk=self.receitas[0].pk).exists())
+        self.tag.refresh_from_db()
+        self.assertEqual(self.tag.receita_count, 0)
+
+        call_command("process_deletions", once=True, stdout=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, DeletionJob.Status.DONE)
+        self.assertEqual((job.deleted_objects, job.deleted_files), (1, 1))
+        self.assertFalse(Receita.all_objects.filter(pk=self.receitas[0].pk).exists())
+        self.assertFalse(self.receitas[0].image.storage.exists(self.image))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.receita_count, 4)
+
+    def test_purge_user(self):
+        """Test that a deleted account is purged in batches"""
+        Token.objects.create(user=self.user)
+        job = deletion.delete_user(self.user)
+        self.assertFalse(Token.objects.filter(user=self.user).exists())
+
+        self.assertEqual(deletion.run_pending(), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, DeletionJob.Status.DONE)
+        self.assertEqual(job.deleted_objects, 7)
+        self.assertFalse(get_user_model().objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(Tag.objects.filter(user_id=self.user.pk).exists())
+        self.assertEqual(list(Receita.all_objects.all()), [self.kept])
+
+    def test_purge_uploads(self):
+        """Test that the partial files of the purged uploads are removed"""
+        sessions = [
+            uploads.create(self.user, self.receitas[1], "image.jpg", 10),
+            uploads.create(self.user, self.receitas[2], "image.jpg", 10),
+        ]
+        paths = [uploads.partial_path(session) for session in sessions]
+        deletion.delete_user(self.user)
+
+        deletion.run_pending()
+
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+
+    def test_retry_failed_job(self):
+        """Test that a failed purge is retried later from where it stopped"""
+        job = deletion.delete_user(self.user)
+
+        with patch(
+            "django.core.files.storage.FileSystemStorage.delete",
+            side_effect=OSError("disk unavailable"),
+        ):
+            deletion.run_pending()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, DeletionJob.Status.PENDING)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn("disk unavailable", job.last_error)
+        self.assertGreater(job.next_attempt_at, timezone.now())
+        self.assertIsNone(deletion.claim())
+
+        DeletionJob.objects.update(next_attempt_at=timezone.now())
+        deletion.run_pending()
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (DeletionJob.Status.DONE, 2))
+        self.assertFalse(get_user_model().objects.filter(pk=self.user.pk).exists())
+
+    @override_settings(RECEITA_DELETION_MAX_ATTEMPTS=1)
+    def test_give_up_after_max_attempts(self):
+        """Test that a job failing too many times is marked as failed"""
+        job = deletion.delete_receita(self.receitas[0])
+
+        with patch(
+            "django.core.files.storage.FileSystemStorage.delete",
+            side_effect=OSError("disk unavailable"),
+        ):
+            deletion.run_pending()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, DeletionJob.Status.FAILED)
@@ -0,0 +1,83 @@
+import logging
+import sys
+import threading
+from unittest.mock import patch
+
+from django.core import mail
+from django.test import TestCase
+
+from receita.utils.log import QueuedAdminEmailHandler
+
+
+def error_record(message="Internal Server Error: /api/receita/"):
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        exc_info = sys.exc_info()
+    return logging.LogRecord(
+        "django.request", logging.ERROR, __file__, 1, message, (), exc_info
+    )
+
+
+class QueuedAdminEmailHandlerTests(TestCase):
+    """Test the background, deduplicated error emails"""
+
+    def setUp(self):
+        self.handler = QueuedAdminEmailHandler(window=60)
+        self.addCleanup(self.handler.close)
+
+    def test_email_sent_in_background(self):
+        """Test that the error email is sent by the worker thread"""
+        threads = []
+        mail_admins = mail.mail_admins
+
+        def send(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return mail_admins(*args, **kwargs)
+
+        with patch("django.core.mail.mail_admins", side_effect=send):
+            self.handler.handle(error_record())
+            self.handler.flush()
+
+        self.assertEqual(threads, ["admin-email"])
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("Internal Server Error", mail.outbox[0].subject)
+        self.assertIn("ValueError", mail.outbox[0].body)
+
+    def test_repeats_sent_as_digest(self):
+        """Test that the same error is mailed once, then in a digest"""
+        for _ in range(3):
+            self.handler.handle(error_record())
+        self.handler.handle(
+            logging.LogRecord(
+                "django.request", logging.ERROR, __file__, 1, "Other error", (), None
+            )
+        )
+
+        self.handler.flush()
+        self.assertEqual(len(mail.outbox), 2)
+
+        with patch("receita.utils.log.time.monotonic", return_value=10**9):
+            self.handler.flush()
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertIn("2 repeated errors", mail.outbox[2].subject)
+        self.assertIn("2 x Internal Server Error", mail.outbox[2].body)
+
+        # A new window starts
+        self.handler.handle(error_record())
+        self.handler.flush()
+        self.assertEqual(len(mail.outbox), 4)
+
+    def test_connection_reused(self):
+        """Test that queued emails share one connection"""
+        # Distinct errors
+        self.handler.dedup_key = lambda record: record.msg
+        with patch.object(self.handler, "connection", wraps=self.handler.connection):
+            self.handler.handle(error_record("Error 1"))
+            self.handler.flush()
+            for index in range(3):
+                self.handler.handle(error_record(f"Error {index + 2}"))
+            self.handler.flush()
+
+            self.assertEqual(self.handler.connection.call_count, 1)
+        self.assertEqual(len(mail.outbox), 4)
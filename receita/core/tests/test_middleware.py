@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from receita.utils.middleware import PathMiddlewareDispatcher
+
+TAGS_URL = reverse("receita:tag-list")
+
+
+class PathMiddlewareDispatcherTests(TestCase):
+    """Test the API and site middleware chains"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser(
+            "admin@londonappdev.com", "password123"
+        )
+
+    def test_api_runs_api_middleware(self):
+        """Test that API calls skip the session, CSRF and frame middleware"""
+        self.client.force_login(self.user)
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, 401)
+        self.assertNotIn("X-Frame-Options", res)
+        self.assertFalse(hasattr(res.wsgi_request, "session"))
+
+    def test_api_common_middleware(self):
+        """Test that API calls still get the slash appended"""
+        res = self.client.get(TAGS_URL.rstrip("/"))
+
+        self.assertEqual(res.status_code, 301)
+
+    def test_site_runs_site_middleware(self):
+        """Test that the admin keeps the full middleware"""
+        self.client.force_login(self.user)
+        res = self.client.get(reverse("admin:core_user_changelist"))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["X-Frame-Options"], "DENY")
+        self.assertEqual(res.wsgi_request.user, self.user)
+
+    @override_settings(
+        SITE_MIDDLEWARE=["django.middleware.csrf.CsrfViewMiddleware"],
+    )
+    def test_process_view_of_chain(self):
+        """Test that the process_view hooks of the chain are run"""
+        dispatcher = PathMiddlewareDispatcher(lambda request: HttpResponse())
+        factory = RequestFactory()
+        view = lambda request: HttpResponse()  # noqa E731
+
+        res = dispatcher.process_view(factory.post("/admin/"), view, (), {})
+        self.assertEqual(res.status_code, 403)
+
+        res = dispatcher.process_view(factory.post("/api/receita/"), view, (), {})
+        self.assertIsNone(res)
+
+    async def test_async_api_middleware(self):
+        """Test that the dispatcher runs the API chain in ASGI mode"""
+        res = await AsyncClient().get(TAGS_URL)
+
+        self.assertEqual(res.status_code, 401)
+        self.assertNotIn("X-Frame-Options", res)
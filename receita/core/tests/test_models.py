@@ -4,6 +4,7 @@ from django.contrib.auth import get_user_model
 from django.test import TestCase
 
 from receita.core import models
+from receita.core.normalization import normalize_name
 
 
 def sample_user(email="test@italocarv.com", password="testpass"):
@@ -67,3 +68,13 @@ class ModelTests(TestCase):
         file_path = models.receita_image_file_path(None, "myimage.jpg")
         exp_path = f"uploads/receita/{uuid}.jpg"
         self.assertEqual(file_path, exp_path)
+
+    def test_normalize_name(self):
+        """Test that names differing by case, accents or spaces normalize equal"""
+        self.assertEqual(normalize_name("  Feijão   TROPEIRO "), "feijao tropeiro")
+        self.assertEqual(normalize_name("Straße"), normalize_name("strasse"))
+
+    def test_tag_normalized_name(self):
+        """Test that saving a tag stores its normalized name"""
+        tag = models.Tag.objects.create(user=sample_user(), name="Café da Manhã")
+        self.assertEqual(tag.normalized_name, "cafe da manha")
@@ -0,0 +1,61 @@
+from unittest.mock import patch
+
+from django.db.utils import OperationalError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from receita.core import readiness
+
+HEALTHZ_URL = reverse("healthz")
+READYZ_URL = reverse("readyz")
+
+
+@override_settings(RECEITA_READINESS_CACHE_SECONDS=60)
+class ProbeTests(TestCase):
+    """Test the liveness and readiness probes"""
+
+    def setUp(self):
+        readiness.clear()
+        self.addCleanup(readiness.clear)
+
+    def test_healthz(self):
+        """Test that the liveness probe doesn't touch the database"""
+        with self.assertNumQueries(0):
+            res = self.client.get(HEALTHZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {"status": "ok"})
+
+    def test_readyz(self):
+        """Test that readiness is checked once and then cached"""
+        res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            res.json(),
+            {
+                "status": "ready",
+                "checks": {"database": "ok", "migrations": "ok", "cache": "ok"},
+            },
+        )
+        with self.assertNumQueries(0):
+            self.client.get(READYZ_URL)
+
+    def test_readyz_database_unavailable(self):
+        """Test that an unavailable database makes the worker unready"""
+        with patch(
+            "django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection",
+            side_effect=OperationalError("connection refused"),
+        ):
+            res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()["status"], "unavailable")
+        self.assertIn("connection refused", res.json()["checks"]["database"])
+
+    def test_cache_unavailable(self):
+        """Test that a cache that doesn't keep values is reported"""
+        with patch("django.core.cache.cache.get", return_value=None):
+            errors = readiness.run_checks(["cache"])
+
+        self.assertIn("cache unavailable", errors["cache"])
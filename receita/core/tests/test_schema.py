@@ -0,0 +1,55 @@
+import json
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from receita.utils import schema
+
+SCHEMA_URL = reverse("schema-json")
+
+
+class SchemaTests(TestCase):
+    """Test the cached OpenAPI schema"""
+
+    def setUp(self):
+        self.schema_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.schema_dir.cleanup)
+        settings = override_settings(
+            RECEITA_SCHEMA_DIR=self.schema_dir.name, RECEITA_CODE_VERSION="test"
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        schema._schemas.clear()
+        schema.code_version.cache_clear()
+        self.addCleanup(schema.code_version.cache_clear)
+
+    def test_schema_served_with_etag(self):
+        """Test that the schema is served and revalidated with its ETag"""
+        res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn("/receita/receitas/", json.loads(res.content)["paths"])
+
+        res = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=res["ETag"])
+        self.assertEqual(res.status_code, 304)
+
+    def test_generate_schema(self):
+        """Test that the generated file is served without introspection"""
+        call_command("generate_schema", stdout=StringIO())
+        path = schema.schema_path()
+        path.write_bytes(b'{"swagger": "2.0", "paths": {}}')
+
+        res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(path.name, "openapi-test.json")
+        self.assertEqual(json.loads(res.content), {"swagger": "2.0", "paths": {}})
+
+    def test_swagger_ui(self):
+        """Test that the UI loads the schema from the cached URL"""
+        res = self.client.get(reverse("schema-swagger-ui"))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertContains(res, SCHEMA_URL)
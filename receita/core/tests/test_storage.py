@@ -0,0 +1,114 @@
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from receita.core.models import Receita
+from receita.core.storage import S3Storage, ShardedFileSystemStorage
+
+
+class ShardedStorageTests(TestCase):
+    """Test the sharded storage of the receita images"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.storage = ShardedFileSystemStorage()
+        self.user = get_user_model().objects.create_user(
+            "test@italocarv.com", "testpass"
+        )
+
+    def test_generate_filename_sharded(self):
+        """Test that file names get two hash prefix directories"""
+        name = self.storage.generate_filename("uploads/receita/image.jpg")
+
+        directory, _, basename = name.rpartition("/")
+        self.assertEqual(basename, "image.jpg")
+        self.assertRegex(directory, r"^uploads/receita/[0-9a-f]{2}/[0-9a-f]{2}$")
+        self.assertEqual(
+            name, self.storage.generate_filename("uploads/receita/image.jpg")
+        )
+        self.assertTrue(self.storage.is_sharded(name))
+        self.assertFalse(self.storage.is_sharded("uploads/receita/image.jpg"))
+
+    def test_save_atomic(self):
+        """Test that a file is written under a temporary name then renamed"""
+        name = self.storage.generate_filename("uploads/receita/image.jpg")
+        with patch("receita.core.storage.os.replace", wraps=os.replace) as replace:
+            saved = self.storage.save(name, ContentFile(b"image"))
+
+        self.assertEqual(saved, name)
+        temporary_path, path = replace.call_args[0]
+        self.assertEqual(path, self.storage.path(name))
+        self.assertFalse(os.path.exists(temporary_path))
+        with self.storage.open(name) as f:
+            self.assertEqual(f.read(), b"image")
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["image.jpg"])
+
+    def test_failed_save_leaves_no_file(self):
+        """Test that an interrupted write leaves no partial file"""
+        name = self.storage.generate_filename("uploads/receita/image.jpg")
+        with patch("receita.core.storage.os.replace", side_effect=OSError):
+            with self.assertRaises(OSError):
+                self.storage.save(name, ContentFile(b"image"))
+
+        self.assertEqual(os.listdir(os.path.dirname(self.storage.path(name))), [])
+
+    def test_receita_image_sharded(self):
+        """Test that the receita images are saved in sharded directories"""
+        receita = Receita.objects.create(
+            user=self.user, title="Bolo", time_minutes=5, price=1
+        )
+        receita.image.save("bolo.jpg", ContentFile(b"image"))
+
+        self.assertTrue(receita.image.storage.is_sharded(receita.image.name))
+        self.assertTrue(os.path.exists(receita.image.path))
+
+    def test_shard_media(self):
+        """Test that the command moves the flat images and updates the rows"""
+        # Saved before the sharding
+        receitas = []
+        for index in range(3):
+            name = f"uploads/receita/{index}.jpg"
+            FileSystemStorage().save(name, ContentFile(b"image"))
+            receitas.append(
+                Receita.objects.create(
+                    user=self.user, title="Bolo", time_minutes=5, price=1, image=name
+                )
+            )
+        receitas[0].image.save("sharded.jpg", ContentFile(b"image"))
+        sharded = receitas[0].image.name
+        Receita.objects.create(
+            user=self.user,
+            title="Sem arquivo",
+            time_minutes=5,
+            price=1,
+            image="uploads/receita/missing.jpg",
+        )
+
+        out = StringIO()
+        call_command("shard_media", batch_size=2, stdout=out, stderr=StringIO())
+
+        self.assertIn("2 images moved, 1 missing", out.getvalue())
+        for receita in receitas:
+            receita.refresh_from_db()
+            self.assertTrue(self.storage.is_sharded(receita.image.name))
+            self.assertTrue(os.path.exists(receita.image.path))
+        self.assertEqual(receitas[0].image.name, sharded)
+        self.assertFalse(self.storage.exists("uploads/receita/1.jpg"))
+
+    def test_s3_requires_boto3(self):
+        """Test that the S3 storage is not configured without boto3"""
+        with patch.dict("sys.modules", {"boto3": None}):
+            with self.assertRaises(ImproperlyConfigured):
+                S3Storage(bucket="receita")
@@ -0,0 +1,187 @@
+"""Resumable uploads of the receita images
+
+A multipart upload failing on a flaky mobile connection is sent again
+from scratch, and the worker buffers it whole. Instead the client
+creates an UploadSession (filename and size), then PATCHes the bytes in
+chunks, each one starting at the Upload-Offset acknowledged so far. The
+chunks are streamed into a partial file under MEDIA_ROOT/uploads/partial;
+an Upload-Checksum header ("sha256 <base64 digest>") is verified before a
+chunk is acknowledged. After a failure, the client asks for the offset
+(HEAD) and resumes from there.
+
+Finalizing moves (renames) the complete file into the image storage and
+sets Receita.image, the file is never read again but for its header.
+Sessions not updated for RECEITA_UPLOAD_EXPIRY_SECONDS are purged by
+`manage.py purge_uploads`.
+"""
+import base64
+import binascii
+import datetime
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files import File, locks
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from receita.core.models import UploadSession
+
+CHUNK_SIZE = 64 * 1024
+
+
+class OffsetConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The upload is not at this offset."
+    default_code = "offset_conflict"
+
+    def __init__(self, offset, detail=None):
+        super().__init__(detail)
+        self.offset = offset
+
+
+class PartialFile(File):
+    """The partial file, moved into the storage instead of copied"""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def partial_dir():
+    return os.path.join(settings.MEDIA_ROOT, "uploads", "partial")
+
+
+def partial_path(session):
+    return os.path.join(partial_dir(), f"{session.pk}.part")
+
+
+def create(user, receita, filename, size):
+    """Start the upload of a new image of receita"""
+    session = UploadSession.objects.create(
+        user=user, receita=receita, filename=filename, size=size
+    )
+    os.makedirs(partial_dir(), exist_ok=True)
+    open(partial_path(session), "xb").close()
+    return session
+
+
+def parse_checksum(header):
+    """Return the sha256 digest of an Upload-Checksum header"""
+    algorithm, _, value = header.partition(" ")
+    if algorithm.lower() != "sha256":
+        raise ValidationError({"Upload-Checksum": "Only sha256 is supported."})
+    try:
+        return base64.b64decode(value, validate=True)
+    except binascii.Error:
+        raise ValidationError({"Upload-Checksum": "The digest is not base64."})
+
+
+def append(session, offset, stream, length, checksum=None):
+    """Write length bytes of stream at offset, return the new offset
+
+    Without a checksum, the bytes received before the client disconnected
+    are kept (and acknowledged). With one, the chunk is only kept whole.
+    """
+    if offset + length > session.size:
+        raise ValidationError("The chunk ends after the declared size.")
+    with open(partial_path(session), "r+b") as f:
+        try:
+            # The return value differs between the platforms
+            locks.lock(f, locks.LOCK_EX | locks.LOCK_NB)
+        except BlockingIOError:
+            raise OffsetConflict(
+                session.offset, "Another chunk of this upload is being received."
+            )
+        try:
+            # The offset may have moved while waiting for the lock
+            session.refresh_from_db(fields=["offset"])
+            if offset != session.offset:
+                raise OffsetConflict(session.offset)
+            f.seek(offset)
+            # Drop the bytes of an interrupted chunk never acknowledged
+            f.truncate()
+            digest = hashlib.sha256()
+            received = 0
+            try:
+                while received < length:
+                    chunk = stream.read(min(CHUNK_SIZE, length - received))
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    digest.update(chunk)
+                    received += len(chunk)
+            finally:
+                if checksum is not None and (
+                    received < length or digest.digest() != checksum
+                ):
+                    f.truncate(offset)
+                    received = 0
+                f.flush()
+                os.fsync(f.fileno())
+                if received:
+                    session.offset = offset + received
+                    session.save(update_fields=["offset", "updated_at"])
+        finally:
+            locks.unlock(f)
+    if checksum is not None and received < length:
+        raise ValidationError({"Upload-Checksum": "The chunk checksum mismatches."})
+    return session.offset
+
+
+def finalize(session):
+    """Attach the complete upload to its receita, return the receita"""
+    if session.offset != session.size:
+        raise OffsetConflict(session.offset, "The upload is not complete.")
+    path = partial_path(session)
+    try:
+        # Only reads the header
+        with Image.open(path):
+            pass
+    except (OSError, Image.DecompressionBombError):
+        discard(session)
+        raise ValidationError({"image": "Upload a valid image."})
+
+    receita = session.receita
+    field = receita.image.field
+    name = field.generate_filename(receita, session.filename)
+    with open(path, "rb") as f:
+        name = field.storage.save(name, PartialFile(f), max_length=field.max_length)
+    try:
+        with transaction.atomic():
+            receita.image = name
+            receita.save(update_fields=["image"])
+            session.delete()
+    except BaseException:
+        field.storage.delete(name)
+        raise
+    # Left by the storages copying the file
+    if os.path.exists(path):
+        os.remove(path)
+    return receita
+
+
+def discard(session):
+    """Abort an upload"""
+    path = partial_path(session)
+    session.delete()
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def purge_expired():
+    """Discard the abandoned uploads, return how many were"""
+    cutoff = timezone.now() - datetime.timedelta(
+        seconds=settings.RECEITA_UPLOAD_EXPIRY_SECONDS
+    )
+    expired = list(UploadSession.objects.filter(updated_at__lt=cutoff))
+    for session in expired:
+        discard(session)
+    # The files of the sessions deleted with their receita
+    if os.path.isdir(partial_dir()):
+        for entry in os.scandir(partial_dir()):
+            if entry.stat().st_mtime < cutoff.timestamp():
+                os.remove(entry.path)
+    return len(expired)
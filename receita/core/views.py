@@ -0,0 +1,59 @@
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
+from rest_framework import status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from receita.core import batch, readiness
+from receita.utils.schema import swagger_auto_schema
+
+
+@never_cache
+def healthz(request):
+    """Liveness probe: the process answers, nothing else is checked"""
+    return JsonResponse({"status": "ok"})
+
+
+@never_cache
+def readyz(request):
+    """Readiness probe: database, migrations and cache, cached per process"""
+    ready, errors = readiness.readiness()
+    checks = {name: error or "ok" for name, error in errors.items()}
+    return JsonResponse(
+        {"status": "ready" if ready else "unavailable", "checks": checks},
+        status=200 if ready else 503,
+    )
+
+
+class BatchView(APIView):
+    """Run many receita and user API calls in one request and transaction"""
+
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    @swagger_auto_schema(
+        request_body=batch.BatchSerializer,
+        responses={
+            200: batch.BatchResponseSerializer,
+            400: batch.BatchResponseSerializer,
+        },
+    )
+    def post(self, request):
+        """Run the sub-requests in order, rolling back if one fails"""
+        serializer = batch.BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        failed, responses = batch.execute(
+            request, serializer.validated_data["requests"]
+        )
+        if failed:
+            return Response(
+                {
+                    "detail": f"Request {len(responses)} failed, "
+                    "the batch was rolled back.",
+                    "responses": responses,
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response({"responses": responses})
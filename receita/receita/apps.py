@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ReceitaConfig(AppConfig):
     name = "receita.receita"
+
+    def ready(self):
+        from receita.receita import signals  # noqa F401
@@ -0,0 +1,166 @@
+"""Async versions of the read-heavy receita endpoints, served in ASGI mode
+
+GET requests authenticate and run the ORM work in the thread pool
+(``in_thread``), so the event loop only holds the connection while the
+client is slow. They are negotiated and rendered as the sync view does
+(``view_response``): MessagePack, 406 for an unknown Accept. Every other
+method is delegated to the regular sync view.
+
+The event stream is a plain ASGI application (config/asgi.py routes it):
+Django 3.1 iterates streaming responses synchronously on the event loop,
+so the sync view would block it for as long as the stream is open. Its
+response head still goes through the security and CORS middleware.
+"""
+import asyncio
+import io
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.request import Request
+
+from receita.core.db.threads import in_thread
+from receita.receita.events import last_event_id, stream_events_async
+from receita.receita.views import ReceitaViewSet
+from receita.utils.auth import token_user, unauthorized_response, view_response
+from receita.utils.middleware import MiddlewareChain
+
+DISPATCHER = "receita.utils.middleware.PathMiddlewareDispatcher"
+
+receita_list_view = ReceitaViewSet.as_view({"get": "list", "post": "create"})
+receita_detail_view = ReceitaViewSet.as_view(
+    {
+        "get": "retrieve",
+        "put": "update",
+        "patch": "partial_update",
+        "delete": "destroy",
+    }
+)
+
+
+def _viewset(request, action, **kwargs):
+    """Return a ReceitaViewSet bound to the request, as the router does"""
+    viewset = ReceitaViewSet(
+        request=Request(request),
+        action=action,
+        args=(),
+        kwargs=kwargs,
+        format_kwarg=None,
+    )
+    viewset.headers = {}
+    return viewset
+
+
+@in_thread
+def _list_receitas(request):
+    viewset = _viewset(request, "list")
+    return view_response(viewset, lambda: viewset.list(viewset.request))
+
+
+@in_thread
+def _retrieve_receita(request, pk):
+    viewset = _viewset(request, "retrieve", pk=pk)
+    return view_response(viewset, lambda: viewset.retrieve(viewset.request, pk=pk))
+
+
+async def receita_list(request):
+    """List the receitas of the authenticated user"""
+    if request.method == "GET":
+        return await _list_receitas(request)
+    return await sync_to_async(receita_list_view)(request)
+
+
+async def receita_detail(request, pk):
+    """Retrieve a receita of the authenticated user"""
+    if request.method == "GET":
+        return await _retrieve_receita(request, pk)
+    return await sync_to_async(receita_detail_view)(request, pk=pk)
+
+
+# The sync views are csrf exempt as well (token authentication only)
+for view in (receita_list, receita_detail):
+    view.csrf_exempt = True
+
+
+def _headers(response):
+    return [
+        (name.lower().encode("latin1"), value.encode("latin1"))
+        for name, value in response.items()
+    ]
+
+
+async def _send_response(send, response):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": _headers(response),
+        }
+    )
+    await send({"type": "http.response.body", "body": response.content})
+
+
+def _stream_head(request):
+    """Authenticate and return the head of the stream response
+
+    The app bypasses Django's handler, so the head goes through the outer
+    middleware of settings.MIDDLEWARE for the headers the WSGI view gets
+    (CORS, security); any other response (401, SSL redirect) replaces it.
+    """
+
+    def get_response(request):
+        if request.stream_user is None:
+            return unauthorized_response()
+        response = HttpResponse(content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        # Disable proxy buffering so events are flushed immediately
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    request.stream_user = token_user(request)
+    middleware = [path for path in settings.MIDDLEWARE if path != DISPATCHER]
+    return MiddlewareChain(middleware, get_response).handler(request)
+
+
+async def event_stream_app(scope, receive, send):
+    """Serve the event stream (ReceitaEventStreamView) on the event loop"""
+    request = ASGIRequest(scope, io.BytesIO())
+    head = await in_thread(_stream_head)(request)
+    user = request.stream_user
+    if user is None or head.status_code != status.HTTP_200_OK:
+        await _send_response(send, head)
+        return
+
+    async def disconnected():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    watcher = asyncio.ensure_future(disconnected())
+    try:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": head.status_code,
+                "headers": _headers(head),
+            }
+        )
+        async for chunk in stream_events_async(user.id, last_event_id(request)):
+            if watcher.done():
+                return
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": chunk.encode(),
+                    "more_body": True,
+                }
+            )
+        await send({"type": "http.response.body"})
+    finally:
+        watcher.cancel()
+
+
+# The batch endpoint (receita.core.batch) calls the sync views
+receita_list.sync_view = receita_list_view
+receita_detail.sync_view = receita_detail_view
@@ -0,0 +1,130 @@
+"""Typeahead autocomplete of tag and ingredient names
+
+Each worker keeps a prefix trie of the tag and ingredient names of the
+most active users (LRU), rebuilt when the user data version changes.
+Every trie node holds its best matches ranked by receita_count, so a
+lookup only walks the query. Names match from their start or from the
+start of any word; queries matching nothing fall back to fuzzy matching.
+
+Users with more names than RECEITA_AUTOCOMPLETE_TRIE_MAX_NAMES are
+served by prefix queries on the normalized_name index instead.
+"""
+import collections
+import difflib
+import threading
+
+from django.conf import settings
+
+from receita.core.normalization import normalize_name
+from receita.receita import versions
+
+FIELDS = ("id", "name", "receita_count")
+
+
+class Node:
+    __slots__ = ("children", "matches")
+
+    def __init__(self):
+        self.children = {}
+        self.matches = []
+
+
+class NameTrie:
+    """Prefix trie of the names of one user"""
+
+    def __init__(self, entries, normalized_names, limit):
+        self.entries = entries
+        self.normalized_names = normalized_names
+        self.positions = {name: index for index, name in enumerate(normalized_names)}
+        self.root = Node()
+        # Entries come ranked, so the first `limit` ones of a node are its best
+        for index, normalized in enumerate(normalized_names):
+            words = normalized.split(" ")
+            for start in range(len(words)):
+                self._insert(" ".join(words[start:]), index, limit)
+
+    def _insert(self, key, index, limit):
+        node = self.root
+        for char in key:
+            node = node.children.setdefault(char, Node())
+            if len(node.matches) < limit and index not in node.matches:
+                node.matches.append(index)
+
+    def complete(self, query, limit):
+        """Return the best entries starting with query, or close to it"""
+        node = self.root
+        for char in query:
+            node = node.children.get(char)
+            if node is None:
+                return self.fuzzy(query, limit)
+        return [self.entries[index] for index in node.matches[:limit]]
+
+    def fuzzy(self, query, limit):
+        """Return the entries whose names are most similar to query"""
+        close = difflib.get_close_matches(
+            query, self.normalized_names, n=limit, cutoff=0.6
+        )
+        return [self.entries[self.positions[name]] for name in close]
+
+
+def _ranked(queryset):
+    return queryset.order_by("-receita_count", "name")
+
+
+def _build(queryset, limit):
+    """Return the trie of the names of queryset, None if there are too many"""
+    max_names = settings.RECEITA_AUTOCOMPLETE_TRIE_MAX_NAMES
+    rows = list(
+        _ranked(queryset).values_list(*FIELDS, "normalized_name")[: max_names + 1]
+    )
+    if len(rows) > max_names:
+        return None
+    entries = [dict(zip(FIELDS, row)) for row in rows]
+    return NameTrie(entries, [row[-1] for row in rows], limit)
+
+
+_tries = collections.OrderedDict()
+_lock = threading.Lock()
+
+
+def _get_trie(user_id, queryset):
+    """Return the up to date trie of the user names, None if too large"""
+    key = (user_id, queryset.model._meta.label)
+    version = versions.get_version(user_id)
+    with _lock:
+        cached = _tries.get(key)
+        if cached is not None:
+            _tries.move_to_end(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    trie = _build(queryset, settings.RECEITA_AUTOCOMPLETE_MAX_RESULTS)
+    with _lock:
+        _tries[key] = (version, trie)
+        while len(_tries) > settings.RECEITA_AUTOCOMPLETE_CACHE_USERS:
+            _tries.popitem(last=False)
+    return trie
+
+
+def clear():
+    """Drop every cached trie"""
+    with _lock:
+        _tries.clear()
+
+
+def complete(user_id, queryset, q, limit=10):
+    """Return up to limit tags or ingredients of the user matching q
+
+    queryset holds the tags or ingredients of the user.
+    """
+    query = normalize_name(q)
+    if not query:
+        return []
+    trie = _get_trie(user_id, queryset)
+    if trie is not None:
+        return trie.complete(query, limit)
+    # Too many names to keep in memory: use the prefix index
+    return list(
+        _ranked(queryset.filter(normalized_name__startswith=query)).values(*FIELDS)[
+            :limit
+        ]
+    )
@@ -0,0 +1,226 @@
+import asyncio
+import json
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.renderers import BaseRenderer
+
+
+class Event:
+    """A change notification for one of the user objects"""
+
+    def __init__(self, id, user_id, data):
+        self.id = id
+        self.user_id = user_id
+        self.data = data
+
+    def encode(self):
+        """Return the event in the text/event-stream wire format"""
+        return f"id: {self.id}\nevent: change\ndata: {json.dumps(self.data)}\n\n"
+
+
+def _initial_id():
+    # Start from the clock so an id counter evicted from the cache never
+    # hands out the ids of events still cached (see versions.py)
+    return time.time_ns() // 1000
+
+
+class EventBroker:
+    """Pub/sub of the change events through the cache, shared by the workers
+
+    Each user has an id counter (cache.incr, so the ids are ordered across
+    the workers) and every event is cached under its id for
+    RECEITA_EVENTS_TTL_SECONDS, so a stream on any worker resumes from a
+    Last-Event-ID with the last `backlog` events. Streams poll the counter
+    every RECEITA_EVENTS_POLL_SECONDS; the ones of the publishing worker
+    are woken up right away.
+    """
+
+    def __init__(self, backlog=100, prefix="receita:events"):
+        self.backlog = backlog
+        self.prefix = prefix
+        self._condition = threading.Condition()
+
+    def _last_key(self, user_id):
+        return f"{self.prefix}:{user_id}"
+
+    def _event_key(self, user_id, event_id):
+        return f"{self.prefix}:{user_id}:{event_id}"
+
+    def _next_id(self, user_id):
+        key = self._last_key(user_id)
+        cache.add(key, _initial_id(), timeout=None)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # Evicted between add() and incr()
+            event_id = _initial_id()
+            cache.set(key, event_id, timeout=None)
+            return event_id
+
+    def publish(self, user_id, data):
+        """Store an event for the user and wake up the waiting streams"""
+        event = Event(self._next_id(user_id), user_id, data)
+        cache.set(
+            self._event_key(user_id, event.id),
+            data,
+            settings.RECEITA_EVENTS_TTL_SECONDS,
+        )
+        with self._condition:
+            self._condition.notify_all()
+        return event
+
+    def newest(self, user_id):
+        """Return the id of the last event published for the user"""
+        return cache.get(self._last_key(user_id), 0)
+
+    def events_since(self, user_id, last_id=0):
+        """Return the retained events of the user newer than last_id
+
+        The events stop at the first missing one: an id is taken before
+        its event is cached, so it may still be on its way.
+        """
+        newest = self.newest(user_id)
+        first = max(last_id, newest - self.backlog) + 1
+        keys = {self._event_key(user_id, i): i for i in range(first, newest + 1)}
+        found = cache.get_many(keys) if keys else {}
+        events = []
+        for key, event_id in keys.items():
+            if key in found:
+                events.append(Event(event_id, user_id, found[key]))
+            elif events or last_id:
+                break
+        return events
+
+    def is_stale(self, user_id, last_id):
+        """Return True if the events after last_id can't be replayed
+
+        They were dropped from the backlog or expired, or last_id comes
+        from before the counter was reset (evicted or a flushed cache).
+        """
+        if not last_id:
+            return False
+        newest = self.newest(user_id)
+        if last_id > newest or newest - last_id > self.backlog:
+            return True
+        return last_id < newest and self._event_key(user_id, last_id + 1) not in cache
+
+    def wait(self, timeout):
+        """Sleep for timeout, or until an event is published by this worker"""
+        with self._condition:
+            self._condition.wait(timeout)
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Renderer negotiating text/event-stream responses"""
+
+    media_type = "text/event-stream"
+    format = "event-stream"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render error payloads; streams are written by the view itself"""
+        if isinstance(data, bytes):
+            return data
+        return json.dumps(data).encode(self.charset)
+
+
+def last_event_id(request):
+    """Return the Last-Event-ID sent by a reconnecting client"""
+    last_id = request.META.get("HTTP_LAST_EVENT_ID") or request.GET.get("last_event_id")
+    try:
+        return max(int(last_id), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class EventStream:
+    """One open stream: the last event sent, the heartbeats and the deadline
+
+    The stream closes after RECEITA_EVENTS_MAX_STREAM_SECONDS so workers
+    are recycled; clients reconnect sending the Last-Event-ID they saw.
+    """
+
+    def __init__(self, user_id, last_id=0):
+        self.user_id = user_id
+        self.last_id = last_id
+        self.heartbeat = settings.RECEITA_EVENTS_HEARTBEAT_SECONDS
+        now = time.monotonic()
+        self.deadline = now + settings.RECEITA_EVENTS_MAX_STREAM_SECONDS
+        self.next_heartbeat = now + self.heartbeat
+
+    def open(self):
+        """Return the first chunks: the retry interval and maybe a reset"""
+        chunks = [f"retry: {settings.RECEITA_EVENTS_RETRY_MILLISECONDS}\n\n"]
+        stale = broker.is_stale(self.user_id, self.last_id)
+        if stale:
+            # Tell the client it missed events and should refetch everything
+            chunks.append("event: reset\ndata: {}\n\n")
+        if stale or not self.last_id:
+            self.last_id = broker.newest(self.user_id)
+        return chunks
+
+    def poll(self):
+        """Return the chunks to send now ([] for none), None once closed"""
+        now = time.monotonic()
+        if now >= self.deadline:
+            return None
+        events = broker.events_since(self.user_id, self.last_id)
+        if events:
+            self.last_id = events[-1].id
+            self.next_heartbeat = now + self.heartbeat
+            return [event.encode() for event in events]
+        if now >= self.next_heartbeat:
+            self.next_heartbeat = now + self.heartbeat
+            return [": heartbeat\n\n"]
+        return []
+
+    def timeout(self):
+        """Return the seconds to wait before polling again"""
+        now = time.monotonic()
+        return max(
+            0,
+            min(
+                settings.RECEITA_EVENTS_POLL_SECONDS,
+                self.next_heartbeat - now,
+                self.deadline - now,
+            ),
+        )
+
+
+def stream_events(user_id, last_id=0):
+    """Yield the user events as server-sent events, with heartbeats"""
+    stream = EventStream(user_id, last_id)
+    yield from stream.open()
+    while True:
+        chunks = stream.poll()
+        if chunks is None:
+            return
+        yield from chunks
+        if not chunks:
+            broker.wait(stream.timeout())
+
+
+async def stream_events_async(user_id, last_id=0):
+    """stream_events for the event loop (see receita.receita.async_views)
+
+    The cache is read in the thread pool, the waits are asyncio sleeps:
+    an open stream holds no thread.
+    """
+    stream = EventStream(user_id, last_id)
+    for chunk in await sync_to_async(stream.open, thread_sensitive=False)():
+        yield chunk
+    while True:
+        chunks = await sync_to_async(stream.poll, thread_sensitive=False)()
+        if chunks is None:
+            return
+        for chunk in chunks:
+            yield chunk
+        if not chunks:
+            await asyncio.sleep(stream.timeout())
+
+
+broker = EventBroker(backlog=settings.RECEITA_EVENTS_BACKLOG)
@@ -0,0 +1,164 @@
+"""Meal plans under a budget and a time limit
+
+Picking N receitas whose price and time_minutes fit the limits is a
+bounded knapsack with a cardinality constraint. Prices are scaled to
+integer buckets (cents, or coarser when the budget is large, always
+rounding up so a plan never exceeds the real budget) and a dynamic
+program over (meals, price bucket) keeps the minimum total time.
+
+Receitas dominated by enough cheaper and quicker ones are pruned before
+the DP, and solved plans are cached by the user data version.
+"""
+import hashlib
+import heapq
+import math
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from receita.core.models import Receita
+from receita.receita import versions
+
+OBJECTIVES = ("price", "time")
+
+# Sentinel total time of unreachable (meals, price) states
+UNREACHABLE = np.iinfo(np.int64).max // 4
+
+
+def _candidates(user_id, budget_cents, max_minutes, tags=None, ingredients=None):
+    """Return the (id, price in cents, minutes) of receitas that fit alone"""
+    queryset = Receita.objects.filter(
+        user_id=user_id,
+        price__lte=Decimal(budget_cents) / 100,
+        time_minutes__lte=max_minutes,
+    )
+    if tags:
+        queryset = queryset.filter(tags__id__in=tags)
+    if ingredients:
+        queryset = queryset.filter(ingredients__id__in=ingredients)
+    return [
+        (receita_id, int(round(price * 100)), minutes)
+        for receita_id, price, minutes in queryset.values_list(
+            "id", "price", "time_minutes"
+        ).distinct()
+    ]
+
+
+def _prune(candidates, needed):
+    """Drop receitas that `needed` cheaper and quicker receitas dominate
+
+    A plan using a dominated receita can always swap it for one of the
+    dominating receitas it does not use yet, without getting worse.
+    """
+    kept = []
+    # Max heap (negated) with the smallest times seen so far
+    quickest = []
+    for candidate in sorted(candidates, key=lambda c: (c[1], c[2], c[0])):
+        minutes = candidate[2]
+        if len(quickest) == needed and -quickest[0] <= minutes:
+            continue
+        kept.append(candidate)
+        if len(quickest) < needed:
+            heapq.heappush(quickest, -minutes)
+        else:
+            heapq.heappushpop(quickest, -minutes)
+    return kept
+
+
+def _items(candidates, repeat):
+    """Split up to `repeat` copies of each receita into binary chunks"""
+    for receita_id, price, minutes in candidates:
+        size, left = 1, repeat
+        while left:
+            size = min(size, left)
+            yield receita_id, size, price, minutes
+            left -= size
+            size *= 2
+
+
+def solve(candidates, meals, budget_cents, max_minutes, objective="price", repeat=1):
+    """Return the receita ids of the best plan, or None when none fits
+
+    The ids of receitas used more than once are repeated.
+    """
+    candidates = _prune(candidates, math.ceil(meals / repeat))
+    if len(candidates) * repeat < meals:
+        return None
+    step = max(1, math.ceil(budget_cents / settings.RECEITA_MEAL_PLAN_PRICE_BUCKETS))
+    capacity = budget_cents // step
+
+    # best[k, c]: minimum total time of k meals costing c price buckets
+    best = np.full((meals + 1, capacity + 1), UNREACHABLE, dtype=np.int64)
+    best[0, 0] = 0
+    items, taken = [], []
+    for receita_id, size, price, minutes in _items(candidates, repeat):
+        weight = math.ceil(price * size / step)
+        if size > meals or weight > capacity:
+            continue
+        source = best[: meals + 1 - size, : capacity + 1 - weight]
+        target = best[size:, weight:]
+        candidate = source + minutes * size
+        take = candidate < target
+        target[take] = candidate[take]
+        items.append((receita_id, size, weight))
+        taken.append(take)
+
+    totals = best[meals]
+    feasible = np.flatnonzero(totals <= max_minutes)
+    if not len(feasible):
+        return None
+    if objective == "time":
+        bucket = int(feasible[np.argmin(totals[feasible])])
+    else:
+        bucket = int(feasible[0])
+
+    plan, count = [], meals
+    for (receita_id, size, weight), take in zip(reversed(items), reversed(taken)):
+        if count >= size and bucket >= weight and take[count - size, bucket - weight]:
+            plan.extend([receita_id] * size)
+            count -= size
+            bucket -= weight
+    return sorted(plan)
+
+
+def _cache_key(user_id, params):
+    digest = hashlib.md5(repr(sorted(params.items())).encode()).hexdigest()
+    return f"receita:meal-plan:{user_id}:{versions.get_version(user_id)}:{digest}"
+
+
+def meal_plan(
+    user_id,
+    meals,
+    budget,
+    max_minutes,
+    objective="price",
+    repeat=1,
+    tags=None,
+    ingredients=None,
+):
+    """Return the receita ids of the best meal plan of the user, or None
+
+    objective "price" returns the cheapest plan within max_minutes and
+    "time" the quickest plan within the budget.
+    """
+    budget_cents = int(budget * 100)
+    params = {
+        "meals": meals,
+        "budget": budget_cents,
+        "max_minutes": max_minutes,
+        "objective": objective,
+        "repeat": repeat,
+        "tags": sorted(tags or ()),
+        "ingredients": sorted(ingredients or ()),
+    }
+    key = _cache_key(user_id, params)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached or None
+    candidates = _candidates(user_id, budget_cents, max_minutes, tags, ingredients)
+    plan = solve(candidates, meals, budget_cents, max_minutes, objective, repeat)
+    # An empty list caches "no plan fits"
+    cache.set(key, plan or [], settings.RECEITA_MEAL_PLAN_CACHE_SECONDS)
+    return plan
@@ -1,6 +1,11 @@
+from django.conf import settings
+from django.db import models, transaction
 from rest_framework import serializers
 
-from receita.core.models import Ingredient, Receita, Tag
+from receita.core.models import Ingredient, Receita, Tag, UploadSession
+from receita.receita.planner import OBJECTIVES
+from receita.receita.similarity import METRICS
+from receita.utils import messagepack
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -12,6 +17,13 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_field = ("id",)
 
 
+class TagCountSerializer(TagSerializer):
+    """Serializer for tag objects with their receita count"""
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ("receita_count",)
+
+
 class IngredientSerializer(serializers.ModelSerializer):
     """Serializer for ingredient objects"""
 
@@ -21,9 +33,21 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ("id",)
 
 
+class IngredientCountSerializer(IngredientSerializer):
+    """Serializer for ingredient objects with their receita count"""
+
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ("receita_count",)
+
+
 class ReceitaSerializer(serializers.ModelSerializer):
     """Serializer a receita"""
 
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.DecimalField: messagepack.DecimalField,
+    }
+
     ingredients = serializers.PrimaryKeyRelatedField(
         many=True, queryset=Ingredient.objects.all()
     )
@@ -42,6 +66,16 @@ class ReceitaSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ("id",)
 
+    def create(self, validated_data):
+        """Create the receita and its tags and ingredients atomically"""
+        with transaction.atomic(savepoint=False):
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        """Update the receita and its tags and ingredients atomically"""
+        with transaction.atomic(savepoint=False):
+            return super().update(instance, validated_data)
+
 
 class ReceitaDetailSerializer(ReceitaSerializer):
     """Serializer a receita detail"""
@@ -57,3 +91,210 @@ class ReceitaImageSerializer(serializers.ModelSerializer):
         model = Receita
         fields = ("id", "image")
         read_only_fields = ("id",)
+
+
+class UploadSessionCreateSerializer(serializers.Serializer):
+    """Serializer starting a resumable image upload"""
+
+    filename = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+
+    def validate_size(self, value):
+        if value > settings.RECEITA_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"Ensure the image is at most {settings.RECEITA_UPLOAD_MAX_SIZE} bytes."
+            )
+        return value
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """Serializer for the resumable image uploads"""
+
+    class Meta:
+        model = UploadSession
+        fields = ("id", "filename", "size", "offset", "created_at")
+        read_only_fields = fields
+
+
+class SimilarReceitaQuerySerializer(serializers.Serializer):
+    """Serializer for the similar receitas query parameters"""
+
+    k = serializers.IntegerField(min_value=1, max_value=100, default=10)
+    metric = serializers.ChoiceField(choices=METRICS, default="cosine")
+
+
+class SimilarReceitaSerializer(serializers.Serializer):
+    """Serializer for a receita and its similarity score"""
+
+    score = serializers.FloatField()
+    receita = ReceitaSerializer()
+
+
+class ShoppingListQuerySerializer(serializers.Serializer):
+    """Serializer for the shopping list query parameters"""
+
+    ids = serializers.CharField(help_text="Comma separated receita IDs")
+
+    def validate_ids(self, value):
+        return _parse_limited_ids(value)
+
+
+class ShoppingListIngredientSerializer(serializers.Serializer):
+    """Serializer for an ingredient of the shopping list"""
+
+    id = serializers.IntegerField(source="ingredient_id")
+    name = serializers.CharField()
+    count = serializers.IntegerField()
+
+
+class ShoppingListSerializer(serializers.Serializer):
+    """Serializer for the ingredients and totals of many receitas"""
+
+    receitas = serializers.ListField(child=serializers.IntegerField())
+    missing = serializers.ListField(child=serializers.IntegerField())
+    ingredients = ShoppingListIngredientSerializer(many=True)
+    price = messagepack.DecimalField(max_digits=12, decimal_places=2)
+    time_minutes = serializers.IntegerField()
+
+
+def _parse_ids(value):
+    """Convert a comma separated list of IDs to a list of integers"""
+    ids = []
+    for str_id in value.split(","):
+        str_id = str_id.strip()
+        # isdigit() alone accepts digits int() refuses ("²") and no sign
+        if not (str_id.isascii() and str_id.isdigit()) or int(str_id) == 0:
+            raise serializers.ValidationError("A comma separated list of IDs")
+        ids.append(int(str_id))
+    return ids
+
+
+def _parse_limited_ids(value):
+    """Parse IDs fetched together, once each and at most RECEITA_MULTI_GET_MAX_IDS"""
+    ids = list(dict.fromkeys(_parse_ids(value)))
+    if len(ids) > settings.RECEITA_MULTI_GET_MAX_IDS:
+        raise serializers.ValidationError(
+            f"At most {settings.RECEITA_MULTI_GET_MAX_IDS} IDs are allowed"
+        )
+    return ids
+
+
+class MultiGetQuerySerializer(serializers.Serializer):
+    """Serializer for the ids query parameter of the list endpoints"""
+
+    ids = serializers.CharField(
+        required=False,
+        help_text="Comma separated IDs: return only these objects, in this order",
+    )
+
+    def validate_ids(self, value):
+        return _parse_limited_ids(value)
+
+
+class ReceitaAttrFilterSerializer(MultiGetQuerySerializer):
+    """Serializer for the tag and ingredient list query parameters"""
+
+    assigned_only = serializers.BooleanField(
+        default=False, help_text="Only the ones used by a receita"
+    )
+    unused_only = serializers.BooleanField(
+        default=False, help_text="Only the ones no receita uses"
+    )
+    with_counts = serializers.BooleanField(
+        default=False, help_text="Include the receita counts"
+    )
+
+    def validate(self, attrs):
+        if attrs["assigned_only"] and attrs["unused_only"]:
+            raise serializers.ValidationError(
+                "assigned_only and unused_only can't both be set."
+            )
+        return attrs
+
+
+class ReceitaFilterSerializer(MultiGetQuerySerializer):
+    """Serializer for the receita list query parameters"""
+
+    tags = serializers.CharField(required=False, help_text="Comma separated tag IDs")
+    ingredients = serializers.CharField(
+        required=False, help_text="Comma separated ingredient IDs"
+    )
+
+    def validate_tags(self, value):
+        return _parse_ids(value)
+
+    def validate_ingredients(self, value):
+        return _parse_ids(value)
+
+
+class MealPlanQuerySerializer(serializers.Serializer):
+    """Serializer for the meal plan query parameters"""
+
+    meals = serializers.IntegerField(
+        min_value=1, max_value=settings.RECEITA_MEAL_PLAN_MAX_MEALS
+    )
+    budget = serializers.DecimalField(max_digits=9, decimal_places=2, min_value=0)
+    max_minutes = serializers.IntegerField(min_value=0)
+    objective = serializers.ChoiceField(choices=OBJECTIVES, default="price")
+    repeat = serializers.IntegerField(min_value=1, max_value=7, default=1)
+    tags = serializers.CharField(required=False, help_text="Comma separated tag IDs")
+    ingredients = serializers.CharField(
+        required=False, help_text="Comma separated ingredient IDs"
+    )
+
+    def validate_tags(self, value):
+        return _parse_ids(value)
+
+    def validate_ingredients(self, value):
+        return _parse_ids(value)
+
+
+class MealPlanSerializer(serializers.Serializer):
+    """Serializer for the receitas and totals of a meal plan"""
+
+    receitas = ReceitaSerializer(many=True)
+    price = messagepack.DecimalField(max_digits=12, decimal_places=2)
+    time_minutes = serializers.IntegerField()
+
+
+class AutocompleteQuerySerializer(serializers.Serializer):
+    """Serializer for the autocomplete query parameters"""
+
+    q = serializers.CharField(max_length=255)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=settings.RECEITA_AUTOCOMPLETE_MAX_RESULTS, default=10
+    )
+
+
+class FacetSerializer(serializers.Serializer):
+    """Serializer for the receita count of a tag or ingredient"""
+
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    receita_count = serializers.IntegerField()
+
+
+class PriceBucketSerializer(serializers.Serializer):
+    """Serializer for a bucket of the price histogram"""
+
+    start = messagepack.DecimalField(max_digits=12, decimal_places=2)
+    end = messagepack.DecimalField(max_digits=12, decimal_places=2)
+    count = serializers.IntegerField()
+
+
+class TimeBucketSerializer(serializers.Serializer):
+    """Serializer for a bucket of the time histogram"""
+
+    start = serializers.IntegerField()
+    end = serializers.IntegerField()
+    count = serializers.IntegerField()
+
+
+class ReceitaStatsSerializer(serializers.Serializer):
+    """Serializer for the receita statistics of a user"""
+
+    receitas = serializers.IntegerField()
+    tags = FacetSerializer(many=True)
+    ingredients = FacetSerializer(many=True)
+    price_histogram = PriceBucketSerializer(many=True)
+    time_histogram = TimeBucketSerializer(many=True)
@@ -0,0 +1,146 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from receita.core import counters
+from receita.core.models import Ingredient, Receita, Tag
+from receita.receita import similarity, versions
+from receita.receita.events import broker
+
+MODEL_NAMES = {Receita: "receita", Tag: "tag", Ingredient: "ingredient"}
+
+
+def publish_change(instance, action, model=None, pk=None, receita_ids=()):
+    """Publish a change once the current transaction commits
+
+    The change is streamed to the user event feed and bumps the version
+    of the user data; receita_ids are the receitas whose tags or
+    ingredients may have changed (None when it can be any of them).
+    """
+    data = {
+        "model": model or MODEL_NAMES[type(instance)],
+        "id": pk or instance.pk,
+        "action": action,
+    }
+    user_id = instance.user_id
+
+    def notify():
+        broker.publish(user_id, data)
+        version = versions.bump_version(user_id)
+        similarity.record_change(user_id, version, receita_ids)
+
+    transaction.on_commit(notify)
+
+
+def soft_deleted(instance, update_fields):
+    """Whether a save soft deleted a receita (see receita.core.deletion)"""
+    return (
+        update_fields is not None
+        and "deleted_at" in update_fields
+        and instance.deleted_at is not None
+    )
+
+
+@receiver(post_save, sender=Receita)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def object_saved(sender, instance, created, update_fields, **kwargs):
+    """Notify that a user object was created, updated or soft deleted"""
+    receita_ids = [instance.pk] if sender is Receita else ()
+    if created:
+        action = "created"
+    elif sender is Receita and soft_deleted(instance, update_fields):
+        action = "deleted"
+    else:
+        action = "updated"
+    publish_change(instance, action, receita_ids=receita_ids)
+
+
+@receiver(post_delete, sender=Receita)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def object_deleted(sender, instance, **kwargs):
+    """Notify that a user object was deleted"""
+    if sender is Receita and instance.deleted_at is not None:
+        # Notified when soft deleted
+        return
+    # Deleting a tag or ingredient removes it from receitas without m2m signals
+    receita_ids = [instance.pk] if sender is Receita else None
+    publish_change(instance, "deleted", receita_ids=receita_ids)
+
+
+@receiver(m2m_changed, sender=Receita.tags.through)
+@receiver(m2m_changed, sender=Receita.ingredients.through)
+def receita_relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Notify that the tags or ingredients of a receita changed"""
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        publish_change(instance, "updated", receita_ids=[instance.pk])
+    elif action == "post_clear":
+        # tag.receita_set.clear() doesn't tell which receitas changed
+        publish_change(instance, "updated", receita_ids=None)
+    else:
+        # tag.receita_set.add(...) changes the receitas on the other side
+        for pk in pk_set:
+            publish_change(
+                instance, "updated", model="receita", pk=pk, receita_ids=[pk]
+            )
+
+
+@receiver(post_save, sender=Receita)
+def count_receita_created(sender, instance, created, **kwargs):
+    """Increment the receita counter of the user"""
+    if created:
+        counters.adjust(get_user_model(), [instance.user_id], 1)
+
+
+@receiver(pre_delete, sender=Receita)
+def count_receita_deleted(sender, instance, **kwargs):
+    """Decrement the counters of the user and of the receita attributes"""
+    if instance.deleted_at is not None:
+        # Counted when soft deleted (or going away with its user)
+        return
+    # The receita <-> attribute rows are deleted without m2m signals
+    counters.adjust(get_user_model(), [instance.user_id], -1)
+    counters.remove_receita_relations([instance.pk])
+
+
+@receiver(post_save, sender=Receita)
+def count_receita_soft_deleted(sender, instance, update_fields, **kwargs):
+    """Decrement the counters of a soft deleted receita and detach it
+
+    The receita is hidden from then on, so it loses its tags and
+    ingredients right away instead of when it is purged.
+    """
+    if not soft_deleted(instance, update_fields):
+        return
+    counters.adjust(get_user_model(), [instance.user_id], -1)
+    counters.remove_receita_relations([instance.pk])
+    for through, _ in counters.RELATIONS.values():
+        through.objects.filter(receita_id=instance.pk).delete()
+
+
+@receiver(m2m_changed, sender=Receita.tags.through)
+@receiver(m2m_changed, sender=Receita.ingredients.through)
+def count_receita_relations(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """Keep the receita counters of tags and ingredients up to date"""
+    attr_model = type(instance) if reverse else model
+    _, column = counters.RELATIONS[attr_model]
+    if action == "post_add":
+        # pk_set only holds the rows actually added
+        if reverse:
+            counters.adjust(attr_model, [instance.pk], len(pk_set))
+        else:
+            counters.adjust(attr_model, pk_set, 1)
+    elif action in ("pre_remove", "pre_clear"):
+        # Count the existing rows before they are deleted
+        this, other = (column, "receita_id") if reverse else ("receita_id", column)
+        rows = sender.objects.filter(**{this: instance.pk})
+        if action == "pre_remove":
+            rows = rows.filter(**{f"{other}__in": pk_set})
+        if reverse:
+            counters.adjust(attr_model, [instance.pk], -rows.count())
+        else:
+            counters.adjust(attr_model, list(rows.values_list(column, flat=True)), -1)
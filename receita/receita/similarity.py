@@ -0,0 +1,182 @@
+"""Receita similarity over shared ingredients and tags
+
+Each user gets a sparse receita x feature matrix (ingredients and tags,
+weighted by RECEITA_SIMILARITY_WEIGHTS) kept in a per-process LRU cache.
+Writes made by this process patch only the changed receitas; changes
+made by other workers are detected through the user data version.
+"""
+import collections
+import threading
+
+import numpy as np
+from django.conf import settings
+from scipy import sparse
+
+from receita.core.models import Receita
+from receita.receita import versions
+
+METRICS = ("cosine", "jaccard")
+
+# Feature keys encode the kind in the lowest bit: ingredient ids are even
+INGREDIENT, TAG = 0, 1
+
+
+def _feature_pairs(**filters):
+    """Return an (n, 2) array of (receita id, feature key) rows"""
+    through = {
+        INGREDIENT: Receita.ingredients.through.objects.values_list(
+            "receita_id", "ingredient_id"
+        ),
+        TAG: Receita.tags.through.objects.values_list("receita_id", "tag_id"),
+    }
+    pairs = []
+    for kind, queryset in through.items():
+        rows = np.array(list(queryset.filter(**filters)), dtype=np.int64)
+        if len(rows):
+            rows[:, 1] = rows[:, 1] * 2 + kind
+            pairs.append(rows)
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.concatenate(pairs)
+
+
+class SimilarityIndex:
+    """Sparse feature matrix of the receitas of one user"""
+
+    def __init__(self, user_id, version):
+        self.user_id = user_id
+        self.version = version
+        # Versions produced by writes of this process and the receitas they
+        # changed (None when the whole index must be rebuilt)
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.receita_ids = np.array(
+            sorted(
+                Receita.objects.filter(user_id=user_id).values_list("id", flat=True)
+            ),
+            dtype=np.int64,
+        )
+        self.pairs = _feature_pairs(receita__user_id=user_id)
+        self._build()
+
+    def update(self, receita_ids):
+        """Reload the features of the given receitas only"""
+        changed = np.array(sorted(receita_ids), dtype=np.int64)
+        existing = Receita.objects.filter(
+            user_id=self.user_id, id__in=receita_ids
+        ).values_list("id", flat=True)
+        self.receita_ids = np.union1d(
+            self.receita_ids[~np.isin(self.receita_ids, changed)],
+            np.array(list(existing), dtype=np.int64),
+        )
+        self.pairs = np.concatenate(
+            [
+                self.pairs[~np.isin(self.pairs[:, 0], changed)],
+                _feature_pairs(receita_id__in=receita_ids),
+            ]
+        )
+        self._build()
+
+    def _build(self):
+        """Build the binary CSR matrix and the per-receita weights"""
+        weights = settings.RECEITA_SIMILARITY_WEIGHTS
+        # The receitas and their features are read by separate queries: a
+        # receita created (or deleted) in between has features but no row
+        self.pairs = self.pairs[np.isin(self.pairs[:, 0], self.receita_ids)]
+        features, columns = np.unique(self.pairs[:, 1], return_inverse=True)
+        self.weights = np.where(
+            features % 2 == TAG, weights["tags"], weights["ingredients"]
+        ).astype(np.float64)
+        rows = np.searchsorted(self.receita_ids, self.pairs[:, 0])
+        self.matrix = sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, columns.ravel())),
+            shape=(len(self.receita_ids), len(features)),
+        )
+        self.weight_sums = self.matrix @ self.weights
+        self.norms = np.sqrt(self.matrix @ self.weights**2)
+
+    def similar(self, receita_id, k=10, metric="cosine"):
+        """Return the k most similar receitas as (id, score) pairs"""
+        index = np.searchsorted(self.receita_ids, receita_id)
+        if index >= len(self.receita_ids) or self.receita_ids[index] != receita_id:
+            return []
+        query = self.matrix[index].toarray().ravel()
+        if metric == "jaccard":
+            shared = self.matrix @ (self.weights * query)
+            union = self.weight_sums + self.weight_sums[index] - shared
+            scores = np.divide(
+                shared, union, out=np.zeros_like(shared), where=union > 0
+            )
+        else:
+            dot = self.matrix @ (self.weights**2 * query)
+            norms = self.norms * self.norms[index]
+            scores = np.divide(dot, norms, out=np.zeros_like(dot), where=norms > 0)
+        scores[index] = 0
+        k = min(k, len(scores))
+        if not k:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            (int(self.receita_ids[i]), float(scores[i])) for i in top if scores[i] > 0
+        ]
+
+
+_indexes = collections.OrderedDict()
+_lock = threading.Lock()
+
+
+def get_index(user_id):
+    """Return the up to date similarity index of the user"""
+    version = versions.get_version(user_id)
+    with _lock:
+        index = _indexes.get(user_id)
+        if index is not None:
+            _indexes.move_to_end(user_id)
+    if index is None or version < index.version:
+        index = SimilarityIndex(user_id, version)
+    elif version != index.version:
+        with index.lock:
+            missed = range(index.version + 1, version + 1)
+            changes = [index.pending.get(v) for v in missed[: len(index.pending) + 1]]
+            if len(changes) < len(missed) or any(c is None for c in changes):
+                # Changed by another worker (or a deletion): start over
+                index = SimilarityIndex(user_id, version)
+            else:
+                index.update(set().union(*changes))
+                index.version = version
+                index.pending.clear()
+    with _lock:
+        _indexes[user_id] = index
+        while len(_indexes) > settings.RECEITA_SIMILARITY_CACHE_USERS:
+            _indexes.popitem(last=False)
+    return index
+
+
+def record_change(user_id, version, receita_ids):
+    """Record receitas changed by this process for an incremental update
+
+    receita_ids is None when the change can affect any receita (a deleted
+    tag or ingredient), which makes the next query rebuild the index.
+    """
+    with _lock:
+        index = _indexes.get(user_id)
+    if index is not None:
+        with index.lock:
+            if version > index.version:
+                index.pending[version] = (
+                    None if receita_ids is None else set(receita_ids)
+                )
+
+
+def clear():
+    """Drop every cached index"""
+    with _lock:
+        _indexes.clear()
+
+
+def similar_receitas(user_id, receita_id, k=10, metric="cosine"):
+    """Return the k receitas of the user most similar to receita_id"""
+    index = get_index(user_id)
+    with index.lock:
+        return index.similar(receita_id, k, metric)
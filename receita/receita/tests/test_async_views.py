@@ -0,0 +1,130 @@
+import json
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TransactionTestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from receita.core.models import Receita, Tag
+from receita.receita import async_views
+from receita.receita.serializers import ReceitaDetailSerializer, ReceitaSerializer
+from receita.user import async_views as user_async_views
+from receita.utils import messagepack
+
+MSGPACK = "application/msgpack"
+
+
+def sample_receita(user, **params):
+    """Create and return a sample receita"""
+    defaults = {"title": "Sample receita", "time_minutes": 10, "price": 5.00}
+    defaults.update(params)
+    return Receita.objects.create(user=user, **defaults)
+
+
+class AsyncViewsTests(TransactionTestCase):
+    """Test the async read views used in ASGI mode"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = get_user_model().objects.create_user(
+            "test@italocarv.com", "testpass", name="Test"
+        )
+        self.token = Token.objects.create(user=self.user)
+
+    def get(self, view, path="/", accept="application/json", **kwargs):
+        request = self.factory.get(
+            path, HTTP_AUTHORIZATION=f"Token {self.token.key}", HTTP_ACCEPT=accept
+        )
+        return async_to_sync(view)(request, **kwargs)
+
+    def test_auth_required(self):
+        """Test that a token is required"""
+        request = self.factory.get("/")
+        res = async_to_sync(async_views.receita_list)(request)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res["WWW-Authenticate"], "Token")
+
+    def test_msgpack(self):
+        """Test that the responses are negotiated as in the sync views"""
+        receita = sample_receita(user=self.user, price=Decimal("12.35"))
+
+        res = self.get(async_views.receita_list, accept=MSGPACK)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], MSGPACK)
+        data = messagepack.unpackb(res.content)
+        self.assertEqual(data["results"][0]["price"], Decimal("12.35"))
+
+        res = self.get(async_views.receita_detail, accept=MSGPACK, pk=receita.id)
+        self.assertEqual(messagepack.unpackb(res.content)["id"], receita.id)
+
+        res = self.get(user_async_views.manage_user, accept=MSGPACK)
+        self.assertEqual(messagepack.unpackb(res.content)["email"], self.user.email)
+
+    def test_not_acceptable(self):
+        """Test that an Accept no renderer matches is refused"""
+        for view in (async_views.receita_list, user_async_views.manage_user):
+            res = self.get(view, accept="application/xml")
+
+            self.assertEqual(res.status_code, status.HTTP_406_NOT_ACCEPTABLE)
+
+    def test_list_receitas(self):
+        """Test listing the user receitas with pagination"""
+        user2 = get_user_model().objects.create_user("test2@italocarv.com", "pass")
+        sample_receita(user=user2)
+        sample_receita(user=self.user)
+        sample_receita(user=self.user)
+
+        res = self.get(async_views.receita_list)
+
+        receitas = Receita.objects.filter(user=self.user).order_by("-id")
+        serializer = ReceitaSerializer(receitas, many=True)
+        data = json.loads(res.content)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(data["count"], 2)
+        self.assertEqual(data["results"], json.loads(json.dumps(serializer.data)))
+
+    def test_list_receitas_by_ids(self):
+        """Test the multi-get of receitas"""
+        receita1 = sample_receita(user=self.user)
+        receita2 = sample_receita(user=self.user)
+
+        res = self.get(async_views.receita_list, f"/?ids={receita2.id},{receita1.id},0")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.get(async_views.receita_list, f"/?ids={receita2.id},{receita1.id}")
+        data = json.loads(res.content)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r["id"] for r in data["results"]], [receita2.id, receita1.id])
+        self.assertEqual(data["missing"], [])
+
+    def test_retrieve_receita(self):
+        """Test retrieving a receita detail"""
+        receita = sample_receita(user=self.user)
+        receita.tags.add(Tag.objects.create(user=self.user, name="Vegano"))
+
+        res = self.get(async_views.receita_detail, pk=receita.id)
+
+        serializer = ReceitaDetailSerializer(receita)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            json.loads(res.content), json.loads(json.dumps(serializer.data))
+        )
+
+    def test_retrieve_receita_other_user(self):
+        """Test that receitas of other users are not found"""
+        user2 = get_user_model().objects.create_user("test2@italocarv.com", "pass")
+        receita = sample_receita(user=user2)
+
+        res = self.get(async_views.receita_detail, pk=receita.id)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_retrieve_me(self):
+        """Test retrieving the authenticated user"""
+        res = self.get(user_async_views.manage_user)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            json.loads(res.content), {"email": self.user.email, "name": "Test"}
+        )
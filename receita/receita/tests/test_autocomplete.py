@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from receita.core.models import Ingredient, Receita, Tag
+from receita.receita import autocomplete, versions
+
+INGREDIENTS_AUTOCOMPLETE_URL = reverse("receita:ingredient-autocomplete")
+TAGS_AUTOCOMPLETE_URL = reverse("receita:tag-autocomplete")
+
+
+class AutocompleteApiTests(TestCase):
+    """Test the tag and ingredient autocomplete endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        autocomplete.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@italocarv.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.ingredients = {
+            name: Ingredient.objects.create(user=self.user, name=name)
+            for name in ("Feijão", "Feijão preto", "Farinha", "Sal", "Pimenta")
+        }
+        receita = Receita.objects.create(
+            user=self.user, title="Feijoada", time_minutes=120, price=30
+        )
+        receita.ingredients.add(
+            self.ingredients["Feijão preto"], self.ingredients["Sal"]
+        )
+
+    def names(self, url, q, **params):
+        res = self.client.get(url, {"q": q, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [match["name"] for match in res.data]
+
+    def test_prefix_ranked_by_usage(self):
+        """Test that prefix matches are ranked by receita count"""
+        self.assertEqual(
+            self.names(INGREDIENTS_AUTOCOMPLETE_URL, "FEIJAO"),
+            ["Feijão preto", "Feijão"],
+        )
+        self.assertEqual(
+            self.names(INGREDIENTS_AUTOCOMPLETE_URL, "f", limit=1), ["Feijão preto"]
+        )
+
+    def test_word_prefix(self):
+        """Test matching the start of any word"""
+        self.assertEqual(
+            self.names(INGREDIENTS_AUTOCOMPLETE_URL, "pre"), ["Feijão preto"]
+        )
+
+    def test_fuzzy_fallback(self):
+        """Test that misspelled queries fall back to close names"""
+        self.assertEqual(
+            self.names(INGREDIENTS_AUTOCOMPLETE_URL, "pimnta"), ["Pimenta"]
+        )
+
+    def test_limited_to_user(self):
+        """Test that names of other users never match"""
+        user2 = get_user_model().objects.create_user("test2@italocarv.com", "pass")
+        Tag.objects.create(user=user2, name="Vegano")
+        Tag.objects.create(user=self.user, name="Vegetariano")
+
+        self.assertEqual(self.names(TAGS_AUTOCOMPLETE_URL, "veg"), ["Vegetariano"])
+
+    def test_cache_invalidated(self):
+        """Test that the cached trie is rebuilt when the user data changes"""
+        self.names(INGREDIENTS_AUTOCOMPLETE_URL, "s")
+        Ingredient.objects.create(user=self.user, name="Salsinha")
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names(INGREDIENTS_AUTOCOMPLETE_URL, "s"), ["Sal"])
+
+        versions.bump_version(self.user.id)
+        self.assertEqual(
+            self.names(INGREDIENTS_AUTOCOMPLETE_URL, "s"), ["Sal", "Salsinha"]
+        )
+
+    @override_settings(RECEITA_AUTOCOMPLETE_TRIE_MAX_NAMES=2)
+    def test_database_prefix_query(self):
+        """Test that users with many names are served by the database"""
+        self.assertEqual(
+            self.names(INGREDIENTS_AUTOCOMPLETE_URL, "feijao"),
+            ["Feijão preto", "Feijão"],
+        )
+
+    def test_query_required(self):
+        """Test that the query parameter is required"""
+        res = self.client.get(INGREDIENTS_AUTOCOMPLETE_URL)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
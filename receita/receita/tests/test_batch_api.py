@@ -0,0 +1,240 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from receita.core.db import routing
+from receita.core.db.routers import ReplicaRouter
+from receita.core.models import Ingredient, Receita, Tag
+from receita.user.views import ManageUserView
+
+BATCH_URL = reverse("batch")
+TAGS_PATH = reverse("receita:tag-list")
+INGREDIENTS_PATH = reverse("receita:ingredient-list")
+RECEITAS_PATH = reverse("receita:receita-list")
+
+
+def receita_body(**params):
+    body = {
+        "title": "Pudim",
+        "time_minutes": 60,
+        "price": "7.10",
+        "tags": [],
+        "ingredients": [],
+    }
+    body.update(params)
+    return body
+
+
+class PublicBatchApiTests(TestCase):
+    """Test the unauthenticated batch requests"""
+
+    def test_login_required(self):
+        """Test that authentication is required for the batch"""
+        res = APIClient().post(
+            BATCH_URL,
+            {"requests": [{"method": "GET", "path": TAGS_PATH}]},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateBatchApiTests(TestCase):
+    """Test the batch requests"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@italocarv.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+
+    def batch(self, *requests):
+        return self.client.post(BATCH_URL, {"requests": requests}, format="json")
+
+    def test_create_with_references(self):
+        """Test creating a receita with the tag and ingredient created before"""
+        res = self.batch(
+            {
+                "name": "doce",
+                "method": "POST",
+                "path": TAGS_PATH,
+                "body": {"name": "Doce"},
+            },
+            {
+                "name": "leite",
+                "method": "POST",
+                "path": INGREDIENTS_PATH,
+                "body": {"name": "Leite"},
+            },
+            {
+                "name": "pudim",
+                "method": "POST",
+                "path": RECEITAS_PATH,
+                "body": receita_body(tags=["$doce.id"], ingredients=["$leite.id"]),
+            },
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        responses = res.json()["responses"]
+        self.assertEqual([r["status"] for r in responses], [201, 201, 201])
+        self.assertEqual([r["name"] for r in responses], ["doce", "leite", "pudim"])
+        receita = Receita.objects.get(user=self.user)
+        self.assertEqual(responses[2]["body"]["id"], receita.id)
+        self.assertEqual(list(receita.tags.values_list("name", flat=True)), ["Doce"])
+        self.assertEqual(
+            list(receita.ingredients.values_list("name", flat=True)), ["Leite"]
+        )
+
+    def test_reference_in_path(self):
+        """Test reading and updating an object created earlier in the batch"""
+        res = self.batch(
+            {
+                "name": "pudim",
+                "method": "POST",
+                "path": RECEITAS_PATH,
+                "body": receita_body(),
+            },
+            {
+                "method": "PATCH",
+                "path": RECEITAS_PATH + "$pudim.id/",
+                "body": {"title": "Pudim de leite"},
+            },
+            {"method": "GET", "path": RECEITAS_PATH + "$pudim.id/"},
+            {"method": "GET", "path": reverse("user:me")},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        responses = res.json()["responses"]
+        self.assertEqual(responses[2]["status"], status.HTTP_200_OK)
+        self.assertEqual(responses[2]["body"]["title"], "Pudim de leite")
+        self.assertEqual(responses[3]["body"]["email"], self.user.email)
+
+    @override_settings(DATABASE_REPLICAS=["replica1"])
+    def test_reads_primary(self):
+        """Test that the sub-requests never read the replicas"""
+        reads = []
+
+        def db_for_read(router, model, **hints):
+            reads.append(routing.replica_reads_enabled())
+            return "default"
+
+        # As when the pin expired or the cache is down
+        with patch.object(routing, "is_pinned", return_value=False), patch.object(
+            ReplicaRouter, "db_for_read", db_for_read
+        ):
+            res = self.batch(
+                {
+                    "name": "doce",
+                    "method": "POST",
+                    "path": TAGS_PATH,
+                    "body": {"name": "Doce"},
+                },
+                {"method": "GET", "path": TAGS_PATH + "?ids=$doce.id"},
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(reads)
+        self.assertFalse(any(reads))
+
+    def test_failure_rolls_back(self):
+        """Test that a failed sub-request rolls the whole batch back"""
+        res = self.batch(
+            {"method": "POST", "path": TAGS_PATH, "body": {"name": "Doce"}},
+            {"method": "POST", "path": RECEITAS_PATH, "body": {"title": ""}},
+            {"method": "POST", "path": TAGS_PATH, "body": {"name": "Salgado"}},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        responses = res.json()["responses"]
+        self.assertEqual([r["status"] for r in responses], [201, 400])
+        self.assertIn("title", responses[1]["body"])
+        self.assertFalse(Tag.objects.exists())
+
+    def test_unknown_reference(self):
+        """Test that referencing a missing response fails the batch"""
+        res = self.batch(
+            {"method": "POST", "path": TAGS_PATH, "body": {"name": "Doce"}},
+            {
+                "method": "POST",
+                "path": RECEITAS_PATH,
+                "body": receita_body(tags=["$doce.id"]),
+            },
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            res.json()["responses"][1]["body"]["detail"], "Unknown reference $doce.id."
+        )
+        self.assertFalse(Tag.objects.exists())
+
+    def test_paths_outside_the_api(self):
+        """Test that only the batchable receita and user views can be called"""
+        for path, status_code in (
+            ("/api/nowhere/", status.HTTP_404_NOT_FOUND),
+            (BATCH_URL, status.HTTP_400_BAD_REQUEST),
+            (reverse("receita:events"), status.HTTP_400_BAD_REQUEST),
+            (reverse("user:token"), status.HTTP_400_BAD_REQUEST),
+            (reverse("user:create"), status.HTTP_400_BAD_REQUEST),
+        ):
+            res = self.batch({"method": "GET", "path": path})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(res.json()["responses"][0]["status"], status_code)
+
+    def test_compression_follows_the_views(self):
+        """Test that a batch calling an uncompressed view isn't compressed"""
+        for index in range(50):
+            Tag.objects.create(user=self.user, name=f"Tag {index}")
+        requests = [
+            {"method": "GET", "path": TAGS_PATH + "?limit=50"},
+            {"method": "GET", "path": reverse("user:me")},
+        ]
+        res = self.client.post(
+            BATCH_URL,
+            {"requests": requests},
+            format="json",
+            HTTP_ACCEPT_ENCODING="gzip",
+        )
+        self.assertEqual(res["Content-Encoding"], "gzip")
+
+        with patch.object(ManageUserView, "compress_response", False, create=True):
+            res = self.client.post(
+                BATCH_URL,
+                {"requests": requests},
+                format="json",
+                HTTP_ACCEPT_ENCODING="gzip",
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(res.has_header("Content-Encoding"))
+
+    @override_settings(RECEITA_BATCH_MAX_REQUESTS=2)
+    def test_invalid_batch(self):
+        """Test the validation of the batch itself"""
+        tags = {"method": "GET", "path": TAGS_PATH}
+        for requests in (
+            [],
+            [tags] * 3,
+            [{**tags, "name": "tags"}, {**tags, "name": "tags"}],
+            [{**tags, "method": "HEAD"}],
+        ):
+            res = self.batch(*requests)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertNotIn("responses", res.json())
+
+    def test_user_scoped(self):
+        """Test that the sub-requests run as the batch user"""
+        other = get_user_model().objects.create_user("other@italocarv.com", "pass")
+        Ingredient.objects.create(user=other, name="Sal")
+        Ingredient.objects.create(user=self.user, name="Leite")
+
+        res = self.batch({"method": "GET", "path": INGREDIENTS_PATH})
+
+        body = res.json()["responses"][0]["body"]
+        self.assertEqual([i["name"] for i in body["results"]], ["Leite"])
@@ -0,0 +1,249 @@
+import asyncio
+import json
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from receita.core.models import Receita, Tag
+from receita.receita.async_views import event_stream_app
+from receita.receita.events import EventBroker, broker
+
+EVENTS_URL = reverse("receita:events")
+
+
+def parse_event(chunk):
+    """Return the fields of a text/event-stream chunk"""
+    fields = dict(
+        line.split(": ", 1) for line in chunk.decode().splitlines() if ": " in line
+    )
+    if "data" in fields:
+        fields["data"] = json.loads(fields["data"])
+    return fields
+
+
+class EventBrokerTests(TestCase):
+    """Test the event broker shared by the workers through the cache"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_events_limited_to_user(self):
+        """Test that events are only delivered to their user"""
+        events = EventBroker()
+        events.publish(1, {"id": 1})
+        events.publish(2, {"id": 2})
+
+        self.assertEqual([e.data for e in events.events_since(1)], [{"id": 1}])
+
+    def test_events_since_last_id(self):
+        """Test that only events after the last seen id are returned"""
+        events = EventBroker()
+        first = events.publish(1, {"id": 1})
+        events.publish(1, {"id": 2})
+
+        self.assertEqual(
+            [e.data for e in events.events_since(1, first.id)], [{"id": 2}]
+        )
+
+    def test_events_shared_by_workers(self):
+        """Test that an event published by a worker reaches the others"""
+        worker1, worker2 = EventBroker(), EventBroker()
+        first = worker1.publish(1, {"id": 1})
+        second = worker2.publish(1, {"id": 2})
+
+        self.assertGreater(second.id, first.id)
+        self.assertEqual(
+            [e.data for e in worker2.events_since(1, first.id)], [{"id": 2}]
+        )
+        self.assertEqual(
+            [e.data for e in worker1.events_since(1, first.id)], [{"id": 2}]
+        )
+
+    def test_stale_last_id(self):
+        """Test detecting events dropped from the backlog"""
+        events = EventBroker(backlog=2)
+        first = events.publish(1, {"id": 1})
+        for i in range(3):
+            events.publish(1, {"id": i})
+
+        self.assertTrue(events.is_stale(1, first.id))
+        self.assertFalse(events.is_stale(1, events.newest(1) - 1))
+        self.assertFalse(events.is_stale(1, 0))
+
+    def test_stale_last_id_from_before_reset(self):
+        """Test that an id newer than the counter (flushed cache) is stale"""
+        events = EventBroker()
+        last = events.publish(1, {"id": 1})
+        cache.clear()
+        events.publish(1, {"id": 2})
+
+        self.assertTrue(events.is_stale(1, last.id + 1000))
+        self.assertTrue(events.is_stale(1, events.newest(1) + 1))
+
+    def test_expired_events_stale(self):
+        """Test that a last_id whose next events expired is stale"""
+        events = EventBroker()
+        first = events.publish(1, {"id": 1})
+        second = events.publish(1, {"id": 2})
+        cache.delete(events._event_key(1, second.id))
+
+        self.assertTrue(events.is_stale(1, first.id))
+
+
+class PublicEventsApiTests(TestCase):
+    """Test unauthenticated event stream access"""
+
+    def test_auth_required(self):
+        """Test that authentication is required"""
+        res = APIClient().get(EVENTS_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateEventsApiTests(TransactionTestCase):
+    """Test the event stream of the authenticated user"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@italocarv.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_stream_receita_changes(self):
+        """Test that saved receitas are streamed to the user"""
+        last = broker.publish(self.user.id, {"model": "ping"})
+        receita = Receita.objects.create(
+            user=self.user, title="Cuscuz", time_minutes=10, price=3.00
+        )
+        receita.tags.add(Tag.objects.create(user=self.user, name="Nordeste"))
+
+        res = self.client.get(EVENTS_URL, HTTP_LAST_EVENT_ID=str(last.id))
+        stream = iter(res.streaming_content)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "text/event-stream")
+        self.assertTrue(next(stream).startswith(b"retry:"))
+        events = [parse_event(next(stream))["data"] for _ in range(3)]
+        self.assertEqual(
+            events,
+            [
+                {"model": "receita", "id": receita.id, "action": "created"},
+                {"model": "tag", "id": receita.tags.get().id, "action": "created"},
+                {"model": "receita", "id": receita.id, "action": "updated"},
+            ],
+        )
+
+    def test_stream_heartbeat(self):
+        """Test that an idle stream sends heartbeats"""
+        last = broker.publish(self.user.id, {"model": "ping"})
+        with self.settings(RECEITA_EVENTS_HEARTBEAT_SECONDS=0.01):
+            res = self.client.get(EVENTS_URL, {"last_event_id": last.id})
+            stream = iter(res.streaming_content)
+            next(stream)
+
+            self.assertEqual(next(stream), b": heartbeat\n\n")
+
+    def test_stream_reset(self):
+        """Test that a Last-Event-ID the broker can't replay gets a reset"""
+        last = broker.publish(self.user.id, {"model": "ping"})
+
+        res = self.client.get(EVENTS_URL, HTTP_LAST_EVENT_ID=str(last.id + 10))
+        stream = iter(res.streaming_content)
+        next(stream)
+
+        self.assertEqual(next(stream), b"event: reset\ndata: {}\n\n")
+        Tag.objects.create(user=self.user, name="Nordeste")
+        self.assertEqual(parse_event(next(stream))["data"]["model"], "tag")
+
+
+class EventStreamAppTests(TransactionTestCase):
+    """Test the event stream served on the event loop in ASGI mode"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "test@italocarv.com", "testpass"
+        )
+        self.token = Token.objects.create(user=self.user)
+
+    def stream(self, headers):
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": EVENTS_URL,
+            "query_string": b"",
+            "headers": headers,
+        }
+        messages = []
+
+        async def receive():
+            await asyncio.sleep(60)
+
+        async def send(message):
+            messages.append(message)
+
+        async_to_sync(event_stream_app)(scope, receive, send)
+        return messages
+
+    def test_auth_required(self):
+        """Test that a token is required"""
+        messages = self.stream([])
+
+        self.assertEqual(messages[0]["status"], status.HTTP_401_UNAUTHORIZED)
+
+    def test_stream(self):
+        """Test streaming the events until the stream deadline"""
+        last = broker.publish(self.user.id, {"model": "ping"})
+        broker.publish(self.user.id, {"model": "pong"})
+
+        with self.settings(RECEITA_EVENTS_MAX_STREAM_SECONDS=0.2):
+            messages = self.stream(
+                [
+                    (b"authorization", f"Token {self.token.key}".encode()),
+                    (b"last-event-id", str(last.id).encode()),
+                ]
+            )
+
+        self.assertEqual(messages[0]["status"], status.HTTP_200_OK)
+        self.assertIn((b"content-type", b"text/event-stream"), messages[0]["headers"])
+        self.assertTrue(messages[1]["body"].startswith(b"retry:"))
+        self.assertEqual(parse_event(messages[2]["body"])["data"], {"model": "pong"})
+        self.assertEqual(messages[-1], {"type": "http.response.body"})
+
+    @override_settings(
+        CORS_ALLOWED_ORIGINS=["https://app.example.com"],
+        RECEITA_EVENTS_MAX_STREAM_SECONDS=0,
+    )
+    def test_headers_match_wsgi_view(self):
+        """Test that the stream gets the CORS and security headers"""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        res = client.get(EVENTS_URL, HTTP_ORIGIN="https://app.example.com")
+        res.close()
+
+        messages = self.stream(
+            [
+                (b"authorization", f"Token {self.token.key}".encode()),
+                (b"origin", b"https://app.example.com"),
+            ]
+        )
+
+        headers = {
+            name.decode(): value.decode() for name, value in messages[0]["headers"]
+        }
+        self.assertEqual(
+            headers["access-control-allow-origin"], "https://app.example.com"
+        )
+        for name in (
+            "Access-Control-Allow-Origin",
+            "X-Content-Type-Options",
+            "Referrer-Policy",
+            "Content-Type",
+            "Cache-Control",
+        ):
+            self.assertEqual(headers.get(name.lower()), res.get(name), name)
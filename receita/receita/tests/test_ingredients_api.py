@@ -53,6 +53,20 @@ class PrivateIngredientsApiTests(TestCase):
         self.assertEqual(len(res.data["results"]), 1)
         self.assertEqual(res.data["results"][0]["name"], ingredient.name)
 
+    def test_retrieve_ingredients_by_ids(self):
+        """Test that only the user ingredients are retrieved by ID"""
+        user2 = get_user_model().objects.create_user("test2@italocarv.com", "testpass")
+        other = Ingredient.objects.create(user=user2, name="Açai")
+        ingredient = Ingredient.objects.create(user=self.user, name="Cupuaçu")
+
+        res = self.client.get(INGREDIENTS_URL, {"ids": f"{other.id},{ingredient.id}"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data["results"], [{"id": ingredient.id, "name": "Cupuaçu"}]
+        )
+        self.assertEqual(res.data["missing"], [other.id])
+
     def test_create_ingredient_successful(self):
         """Test create a new ingredient"""
         payload = {"name": "Repolho"}
@@ -100,3 +114,18 @@ class PrivateIngredientsApiTests(TestCase):
 
         res = self.client.get(INGREDIENTS_URL, {"assigned_only": 1})
         self.assertEqual(len(res.data["results"]), 1)
+
+    def test_retrieve_ingredients_unused_with_counts(self):
+        """Test listing unused ingredients with their receita counts"""
+        Ingredient.objects.create(user=self.user, name="Maçãs")
+        used = Ingredient.objects.create(user=self.user, name="Peru")
+        Receita.objects.create(
+            title="Peru assado", time_minutes=60, price=40.00, user=self.user
+        ).ingredients.add(used)
+
+        res = self.client.get(INGREDIENTS_URL, {"unused_only": 1, "with_counts": 1})
+
+        self.assertEqual(
+            [(i["name"], i["receita_count"]) for i in res.data["results"]],
+            [("Maçãs", 0)],
+        )
@@ -0,0 +1,183 @@
+import itertools
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from receita.core.models import Receita, Tag
+from receita.receita import planner, versions
+
+MEAL_PLAN_URL = reverse("receita:receita-meal-plan")
+
+
+def sample_receita(user, **params):
+    """Create and return a sample receita"""
+    defaults = {"title": "Sample receita", "time_minutes": 10, "price": 5.00}
+    defaults.update(params)
+    return Receita.objects.create(user=user, **defaults)
+
+
+def brute_force(candidates, meals, budget, max_minutes, key):
+    """Return the best plan by trying every combination"""
+    plans = [
+        plan
+        for plan in itertools.combinations(candidates, meals)
+        if sum(c[1] for c in plan) <= budget and sum(c[2] for c in plan) <= max_minutes
+    ]
+    return min((key(plan) for plan in plans), default=None)
+
+
+class SolveTests(TestCase):
+    """Test the meal plan dynamic program"""
+
+    candidates = [
+        (1, 1200, 40),
+        (2, 800, 15),
+        (3, 1500, 10),
+        (4, 500, 60),
+        (5, 950, 25),
+        (6, 700, 35),
+        (7, 2100, 5),
+    ]
+
+    def test_matches_brute_force(self):
+        """Test that the cheapest and quickest plans are optimal"""
+        for meals, budget, max_minutes in [
+            (3, 3000, 90),
+            (2, 2000, 40),
+            (4, 5000, 120),
+        ]:
+            cheapest = planner.solve(self.candidates, meals, budget, max_minutes)
+            quickest = planner.solve(
+                self.candidates, meals, budget, max_minutes, objective="time"
+            )
+            by_id = {c[0]: c for c in self.candidates}
+
+            self.assertEqual(
+                sum(by_id[i][1] for i in cheapest),
+                brute_force(
+                    self.candidates,
+                    meals,
+                    budget,
+                    max_minutes,
+                    lambda p: sum(c[1] for c in p),
+                ),
+            )
+            self.assertEqual(
+                sum(by_id[i][2] for i in quickest),
+                brute_force(
+                    self.candidates,
+                    meals,
+                    budget,
+                    max_minutes,
+                    lambda p: sum(c[2] for c in p),
+                ),
+            )
+
+    def test_no_plan(self):
+        """Test that impossible limits return None"""
+        self.assertIsNone(planner.solve(self.candidates, 3, 1000, 500))
+        self.assertIsNone(planner.solve(self.candidates, 8, 100000, 500))
+
+    def test_repeat(self):
+        """Test that receitas can be repeated up to the limit"""
+        plan = planner.solve(self.candidates, 3, 1500, 200, repeat=3)
+        self.assertEqual(plan, [4, 4, 4])
+
+    @override_settings(RECEITA_MEAL_PLAN_PRICE_BUCKETS=10)
+    def test_coarse_prices_within_budget(self):
+        """Test that rounded prices never exceed the budget"""
+        plan = planner.solve(self.candidates, 3, 3000, 200)
+        by_id = {c[0]: c for c in self.candidates}
+        self.assertLessEqual(sum(by_id[i][1] for i in plan), 3000)
+
+    def test_prune_dominated(self):
+        """Test that receitas dominated by enough others are dropped"""
+        kept = planner._prune(self.candidates, 1)
+        self.assertEqual([c[0] for c in kept], [4, 6, 2, 3, 7])
+
+
+class MealPlanApiTests(TestCase):
+    """Test the meal plan endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@italocarv.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_meal_plan(self):
+        """Test the cheapest plan within the time limit"""
+        cheap_slow = sample_receita(self.user, price=3, time_minutes=90)
+        mid = sample_receita(self.user, price=6, time_minutes=20)
+        quick = sample_receita(self.user, price=9, time_minutes=10)
+        sample_receita(self.user, price=20, time_minutes=5)
+
+        res = self.client.get(
+            MEAL_PLAN_URL, {"meals": 2, "budget": "15.00", "max_minutes": 60}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(r["id"] for r in res.data["receitas"]), [mid.id, quick.id]
+        )
+        self.assertEqual(Decimal(res.data["price"]), Decimal("15.00"))
+        self.assertEqual(res.data["time_minutes"], 30)
+        self.assertNotIn(cheap_slow.id, [r["id"] for r in res.data["receitas"]])
+
+    def test_meal_plan_tags(self):
+        """Test that only receitas with the given tags are planned"""
+        tag = Tag.objects.create(user=self.user, name="Vegano")
+        tagged = sample_receita(self.user, price=8)
+        tagged.tags.add(tag)
+        sample_receita(self.user, price=1)
+
+        res = self.client.get(
+            MEAL_PLAN_URL,
+            {"meals": 1, "budget": 10, "max_minutes": 60, "tags": f"{tag.id}"},
+        )
+
+        self.assertEqual([r["id"] for r in res.data["receitas"]], [tagged.id])
+
+    def test_meal_plan_other_user(self):
+        """Test that receitas of other users are never planned"""
+        user2 = get_user_model().objects.create_user("test2@italocarv.com", "pass")
+        sample_receita(user2)
+
+        res = self.client.get(
+            MEAL_PLAN_URL, {"meals": 1, "budget": 10, "max_minutes": 60}
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_params(self):
+        """Test that invalid parameters are rejected"""
+        res = self.client.get(
+            MEAL_PLAN_URL, {"meals": 0, "budget": 10, "max_minutes": 60}
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(
+            MEAL_PLAN_URL,
+            {"meals": 1, "budget": 10, "max_minutes": 60, "tags": "a,b"},
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_plan_cache_invalidated(self):
+        """Test that a change of the user data invalidates cached plans"""
+        sample_receita(self.user, price=8)
+        params = {"meals": 1, "budget": 10, "max_minutes": 60}
+        self.client.get(MEAL_PLAN_URL, params)
+
+        cheaper = sample_receita(self.user, price=2)
+        res = self.client.get(MEAL_PLAN_URL, params)
+        self.assertNotEqual(res.data["receitas"][0]["id"], cheaper.id)
+
+        versions.bump_version(self.user.id)
+        res = self.client.get(MEAL_PLAN_URL, params)
+        self.assertEqual(res.data["receitas"][0]["id"], cheaper.id)
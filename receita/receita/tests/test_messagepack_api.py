@@ -0,0 +1,140 @@
+from decimal import Decimal
+
+import msgpack
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from receita.core.models import Receita, Tag
+from receita.utils import messagepack
+
+RECEITAS_URL = reverse("receita:receita-list")
+TAGS_URL = reverse("receita:tag-list")
+TOKEN_URL = reverse("user:token")
+SHOPPING_LIST_URL = reverse("receita:receita-shopping-list")
+STATS_URL = reverse("receita:stats")
+MSGPACK = "application/msgpack"
+
+
+class MessagePackApiTests(TestCase):
+    """Test the MessagePack content negotiation"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@italocarv.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name="Doce")
+
+    def post(self, url, data):
+        return self.client.post(
+            url,
+            messagepack.packb(data),
+            content_type=MSGPACK,
+            HTTP_ACCEPT=MSGPACK,
+        )
+
+    def test_list_msgpack(self):
+        """Test that the responses are rendered in MessagePack on request"""
+        receita = Receita.objects.create(
+            user=self.user, title="Bolo", time_minutes=40, price=Decimal("12.35")
+        )
+        receita.tags.add(self.tag)
+
+        res = self.client.get(RECEITAS_URL, HTTP_ACCEPT=MSGPACK)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], MSGPACK)
+        data = messagepack.unpackb(res.content)
+        self.assertEqual(data["count"], 1)
+        self.assertEqual(data["results"][0]["price"], Decimal("12.35"))
+        self.assertEqual(data["results"][0]["tags"], [self.tag.id])
+
+    def test_action_decimals(self):
+        """Test that the custom actions send decimals as in the lists"""
+        receitas = [
+            Receita.objects.create(
+                user=self.user, title=title, time_minutes=40, price=price
+            )
+            for title, price in (("Bolo", Decimal("12.35")), ("Pão", Decimal("3.10")))
+        ]
+        ids = ",".join(str(receita.id) for receita in receitas)
+
+        res = self.client.get(SHOPPING_LIST_URL, {"ids": ids}, HTTP_ACCEPT=MSGPACK)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(messagepack.unpackb(res.content)["price"], Decimal("15.45"))
+
+        res = self.client.get(STATS_URL, HTTP_ACCEPT=MSGPACK)
+
+        histogram = messagepack.unpackb(res.content)["price_histogram"]
+        self.assertIsInstance(histogram[0]["start"], Decimal)
+
+    def test_json_unchanged(self):
+        """Test that JSON stays the default, with decimals as strings"""
+        Receita.objects.create(
+            user=self.user, title="Bolo", time_minutes=40, price=Decimal("12.35")
+        )
+
+        res = self.client.get(RECEITAS_URL)
+
+        self.assertEqual(res["Content-Type"], "application/json")
+        self.assertEqual(res.json()["results"][0]["price"], "12.35")
+
+    def test_create_msgpack(self):
+        """Test creating a receita from a MessagePack body"""
+        res = self.post(
+            RECEITAS_URL,
+            {
+                "title": "Pudim",
+                "time_minutes": 60,
+                "price": Decimal("7.10"),
+                "tags": [self.tag.id],
+                "ingredients": [],
+            },
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        receita = Receita.objects.get(title="Pudim")
+        self.assertEqual(receita.price, Decimal("7.10"))
+        self.assertEqual(messagepack.unpackb(res.content)["id"], receita.id)
+
+    def test_create_tag_msgpack(self):
+        """Test that the tag and user views accept MessagePack too"""
+        res = self.post(TAGS_URL, {"name": "Salgado"})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.client.force_authenticate(None)
+        res = self.post(
+            TOKEN_URL, {"email": "test@italocarv.com", "password": "testpass"}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("token", messagepack.unpackb(res.content))
+
+    def test_invalid_msgpack(self):
+        """Test that a malformed body is a bad request"""
+        res = self.client.post(
+            TAGS_URL, b"\xc1", content_type=MSGPACK, HTTP_ACCEPT=MSGPACK
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_decimal(self):
+        """Test that a malformed or non-finite decimal is a bad request"""
+        for value in (b"abc", b"NaN", b"-Infinity"):
+            body = msgpack.packb(
+                {
+                    "title": "Bolo",
+                    "time_minutes": 40,
+                    "price": msgpack.ExtType(messagepack.DECIMAL_EXT_TYPE, value),
+                }
+            )
+            res = self.client.post(
+                RECEITAS_URL, body, content_type=MSGPACK, HTTP_ACCEPT=MSGPACK
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertFalse(Receita.objects.exists())
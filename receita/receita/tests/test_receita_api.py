@@ -2,7 +2,9 @@ import os
 import tempfile
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from PIL import Image
 from rest_framework import status
@@ -12,6 +14,7 @@ from receita.core.models import Ingredient, Receita, Tag
 from receita.receita.serializers import ReceitaDetailSerializer, ReceitaSerializer
 
 RECEITAS_URL = reverse("receita:receita-list")
+SHOPPING_LIST_URL = reverse("receita:receita-shopping-list")
 
 
 def image_upload_url(receita_id):
@@ -90,6 +93,26 @@ class PrivateReceitaApiTests(TestCase):
         self.assertEqual(len(res.data["results"]), 1)
         self.assertEqual(res.data["results"], serializer.data)
 
+    def test_delete_receita(self):
+        """Test that a deleted receita is hidden and its counters updated"""
+        receita = sample_receita(user=self.user)
+        tag = sample_tag(user=self.user)
+        receita.tags.add(tag)
+
+        res = self.client.delete(detail_url(receita.id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get(RECEITAS_URL).data["results"], [])
+        self.assertEqual(
+            self.client.get(detail_url(receita.id)).status_code,
+            status.HTTP_404_NOT_FOUND,
+        )
+        self.assertTrue(Receita.all_objects.filter(id=receita.id).exists())
+        tag.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual((tag.receita_count, self.user.receita_count), (0, 0))
+        self.assertFalse(Receita.tags.through.objects.exists())
+
     def test_view_receita_detail(self):
         """Test viewing a receita detail"""
         receita = sample_receita(user=self.user)
@@ -186,6 +209,43 @@ class PrivateReceitaApiTests(TestCase):
         self.assertEqual(len(tags), 0)
 
 
+class ReceitaTransactionTests(TestCase):
+    """Test that only the writes run in a transaction"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@italocarv.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_not_atomic(self):
+        """Test that listing receitas doesn't open a transaction"""
+        sample_receita(user=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECEITAS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(any("SAVEPOINT" in q["sql"] for q in queries))
+
+    def test_create_atomic(self):
+        """Test that creating a receita with tags is atomic"""
+        tag = sample_tag(user=self.user)
+        payload = {
+            "title": "Baião de dois",
+            "tags": [tag.id],
+            "time_minutes": 40,
+            "price": 15.00,
+        }
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(RECEITAS_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        savepoints = [q["sql"] for q in queries if "SAVEPOINT" in q["sql"]]
+        # One savepoint created and released, nested in the test transaction
+        self.assertEqual(len(savepoints), 2)
+
+
 class ReceitaImageUploadTests(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -259,3 +319,136 @@ class ReceitaImageUploadTests(TestCase):
         self.assertIn(serializer1.data, res.data["results"])
         self.assertIn(serializer2.data, res.data["results"])
         self.assertNotIn(serializer3.data, res.data["results"])
+
+    def test_filter_receitas_by_tags_and_ingredients(self):
+        """Test that the tags and ingredients filters are combined"""
+        tag = sample_tag(user=self.user, name="Vegano")
+        ingredient = sample_ingredient(user=self.user, name="Tofu")
+        receita1 = sample_receita(user=self.user, title="Tofu grelhado")
+        receita1.tags.add(tag)
+        receita1.ingredients.add(ingredient)
+        sample_receita(user=self.user, title="Salada").tags.add(tag)
+        sample_receita(user=self.user, title="Yakisoba").ingredients.add(ingredient)
+
+        res = self.client.get(
+            RECEITAS_URL, {"tags": tag.id, "ingredients": ingredient.id}
+        )
+
+        self.assertEqual(res.data["results"], [ReceitaSerializer(receita1).data])
+
+    def test_filter_receitas_distinct(self):
+        """Test that a receita with many of the tags is listed once"""
+        tag1 = sample_tag(user=self.user, name="Vegano")
+        tag2 = sample_tag(user=self.user, name="Brasil")
+        sample_receita(user=self.user).tags.add(tag1, tag2)
+
+        res = self.client.get(RECEITAS_URL, {"tags": f"{tag1.id},{tag2.id}"})
+
+        self.assertEqual(res.data["count"], 1)
+
+    def test_filter_receitas_invalid_ids(self):
+        """Test that malformed ID lists are a bad request"""
+        for ids in ("1,a", "1,,2", "-1", "0", "²"):
+            res = self.client.get(RECEITAS_URL, {"tags": ids})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("tags", res.data)
+
+    def test_multi_get(self):
+        """Test retrieving receitas by ID, in the requested order"""
+        user2 = get_user_model().objects.create_user("test2@italocarv.com", "pass")
+        other = sample_receita(user=user2)
+        receita1 = sample_receita(user=self.user, title="Feijoada")
+        receita2 = sample_receita(user=self.user, title="Moqueca")
+        receita1.tags.add(sample_tag(user=self.user))
+        receita2.ingredients.add(sample_ingredient(user=self.user))
+        ids = [receita1.id, other.id, receita2.id, receita1.id, 9999]
+
+        # The receitas, then their tags and ingredients
+        with self.assertNumQueries(3):
+            res = self.client.get(RECEITAS_URL, {"ids": ",".join(map(str, ids))})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data["results"],
+            ReceitaSerializer([receita1, receita2], many=True).data,
+        )
+        self.assertEqual(res.data["missing"], [other.id, 9999])
+
+    def test_multi_get_limit(self):
+        """Test that the number of IDs is capped"""
+        ids = ",".join(str(pk) for pk in range(1, 102))
+
+        with self.settings(RECEITA_MULTI_GET_MAX_IDS=100):
+            res = self.client.get(RECEITAS_URL, {"ids": ids})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("ids", res.data)
+
+
+class ShoppingListTests(TestCase):
+    """Test the aggregated shopping list of many receitas"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@italocarv.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_shopping_list(self):
+        """Test merging and counting the ingredients of receitas"""
+        arroz = sample_ingredient(user=self.user, name="Arroz")
+        feijao = sample_ingredient(user=self.user, name="Feijão")
+        receita1 = sample_receita(user=self.user, price=10.50, time_minutes=30)
+        receita1.ingredients.add(arroz, feijao)
+        receita2 = sample_receita(user=self.user, price=4.25, time_minutes=15)
+        receita2.ingredients.add(arroz)
+        sample_receita(user=self.user).ingredients.add(feijao)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(
+                SHOPPING_LIST_URL, {"ids": f"{receita1.id},{receita2.id}"}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["receitas"], [receita1.id, receita2.id])
+        self.assertEqual(
+            res.data["ingredients"],
+            [
+                {"id": arroz.id, "name": "Arroz", "count": 2},
+                {"id": feijao.id, "name": "Feijão", "count": 1},
+            ],
+        )
+        self.assertEqual(res.data["price"], "14.75")
+        self.assertEqual(res.data["time_minutes"], 45)
+
+    def test_shopping_list_missing_receitas(self):
+        """Test that receitas of other users are reported missing"""
+        user2 = get_user_model().objects.create_user("other@italocarv.com", "pass")
+        receita = sample_receita(user=user2)
+
+        res = self.client.get(SHOPPING_LIST_URL, {"ids": str(receita.id)})
+
+        self.assertEqual(res.data["receitas"], [])
+        self.assertEqual(res.data["missing"], [receita.id])
+        self.assertEqual(res.data["price"], "0.00")
+
+    def test_shopping_list_invalid_ids(self):
+        """Test that invalid IDs are rejected"""
+        res = self.client.get(SHOPPING_LIST_URL, {"ids": "1,abc"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_shopping_list_limit(self):
+        """Test that the number of IDs is capped, repeated IDs counted once"""
+        receita = sample_receita(user=self.user, price=2.00)
+
+        with self.settings(RECEITA_MULTI_GET_MAX_IDS=2):
+            res = self.client.get(
+                SHOPPING_LIST_URL, {"ids": f"{receita.id},{receita.id},{receita.id}"}
+            )
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.data["price"], "2.00")
+
+            res = self.client.get(SHOPPING_LIST_URL, {"ids": "1,2,3"})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,124 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from receita.core.models import Ingredient, Receita, Tag
+from receita.receita import similarity, versions
+
+
+def similar_url(receita_id):
+    """Return the similar receitas URL"""
+    return reverse("receita:receita-similar", args=[receita_id])
+
+
+def sample_receita(user, ingredients=(), tags=(), **params):
+    """Create and return a sample receita with ingredients and tags"""
+    defaults = {"title": "Sample receita", "time_minutes": 10, "price": 5.00}
+    defaults.update(params)
+    receita = Receita.objects.create(user=user, **defaults)
+    receita.ingredients.set(ingredients)
+    receita.tags.set(tags)
+    return receita
+
+
+class SimilarReceitasTests(TestCase):
+    """Test the similar receitas endpoint and index"""
+
+    def setUp(self):
+        cache.clear()
+        similarity.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@italocarv.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.feijao, self.arroz, self.ovo, self.leite = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ("Feijão", "Arroz", "Ovo", "Leite")
+        ]
+        self.nordeste = Tag.objects.create(user=self.user, name="Nordeste")
+        self.receita = sample_receita(
+            self.user, [self.feijao, self.arroz, self.ovo], [self.nordeste]
+        )
+
+    def test_similar_receitas_ranked(self):
+        """Test that receitas sharing more features rank first"""
+        close = sample_receita(self.user, [self.feijao, self.arroz], [self.nordeste])
+        far = sample_receita(self.user, [self.ovo, self.leite])
+        sample_receita(self.user, [self.leite])
+
+        res = self.client.get(similar_url(self.receita.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r["receita"]["id"] for r in res.data], [close.id, far.id])
+        self.assertGreater(res.data[0]["score"], res.data[1]["score"])
+
+    def test_similar_receitas_jaccard(self):
+        """Test the weighted jaccard metric"""
+        other = sample_receita(self.user, [self.feijao, self.leite])
+
+        res = self.client.get(
+            similar_url(self.receita.id), {"metric": "jaccard", "k": 1}
+        )
+
+        # Shared: feijão (1). Union: 3 ingredients + leite + nordeste (0.5)
+        self.assertEqual(res.data[0]["receita"]["id"], other.id)
+        self.assertAlmostEqual(res.data[0]["score"], 1 / 4.5)
+
+    def test_similar_limited_to_user(self):
+        """Test that receitas of other users are never returned"""
+        user2 = get_user_model().objects.create_user("test2@italocarv.com", "pass")
+        sample_receita(user2, [self.feijao, self.arroz, self.ovo])
+
+        res = self.client.get(similar_url(self.receita.id))
+        self.assertEqual(res.data, [])
+
+        other = sample_receita(user2)
+        res = self.client.get(similar_url(other.id))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_metric(self):
+        """Test that an unknown metric is rejected"""
+        res = self.client.get(similar_url(self.receita.id), {"metric": "euclid"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_receita_created_while_loading(self):
+        """Test that features read without their receita are skipped"""
+        feature_pairs = similarity._feature_pairs
+
+        def racing_feature_pairs(**filters):
+            # Created between the receita and the feature queries
+            sample_receita(self.user, [self.feijao, self.arroz])
+            return feature_pairs(**filters)
+
+        with patch.object(similarity, "_feature_pairs", racing_feature_pairs):
+            index = similarity.SimilarityIndex(self.user.id, 0)
+
+        self.assertEqual(list(index.receita_ids), [self.receita.id])
+        self.assertEqual(index.similar(self.receita.id), [])
+
+    def test_incremental_update(self):
+        """Test that local changes patch the cached index"""
+        index = similarity.get_index(self.user.id)
+        new = sample_receita(self.user, [self.feijao])
+        similarity.record_change(
+            self.user.id, versions.bump_version(self.user.id), [new.id]
+        )
+
+        self.assertIs(similarity.get_index(self.user.id), index)
+        self.assertEqual(
+            similarity.similar_receitas(self.user.id, new.id, k=1)[0][0],
+            self.receita.id,
+        )
+
+    def test_unknown_change_rebuilds(self):
+        """Test that changes made by another worker rebuild the index"""
+        index = similarity.get_index(self.user.id)
+        versions.bump_version(self.user.id)
+
+        self.assertIsNot(similarity.get_index(self.user.id), index)
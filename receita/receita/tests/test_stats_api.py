@@ -0,0 +1,148 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from receita.core import counters
+from receita.core.models import Ingredient, Receita, Tag
+
+STATS_URL = reverse("receita:stats")
+
+
+def sample_receita(user, **params):
+    """Create and return a sample receita"""
+    defaults = {"title": "Sample receita", "time_minutes": 10, "price": 5.00}
+    defaults.update(params)
+    return Receita.objects.create(user=user, **defaults)
+
+
+class ReceitaCountersTests(TestCase):
+    """Test the denormalized receita counters"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "test@italocarv.com", "testpass"
+        )
+        self.vegano = Tag.objects.create(user=self.user, name="Vegano")
+        self.doce = Tag.objects.create(user=self.user, name="Doce")
+        self.sal = Ingredient.objects.create(user=self.user, name="Sal")
+
+    def assertCounts(self, receitas, vegano, doce, sal):
+        self.user.refresh_from_db()
+        self.vegano.refresh_from_db()
+        self.doce.refresh_from_db()
+        self.sal.refresh_from_db()
+        self.assertEqual(
+            (
+                self.user.receita_count,
+                self.vegano.receita_count,
+                self.doce.receita_count,
+                self.sal.receita_count,
+            ),
+            (receitas, vegano, doce, sal),
+        )
+
+    def test_counters_follow_changes(self):
+        """Test that adding, removing and clearing update the counters"""
+        receita = sample_receita(self.user)
+        other = sample_receita(self.user)
+        receita.tags.add(self.vegano, self.doce)
+        receita.tags.add(self.vegano)
+        other.tags.add(self.vegano)
+        receita.ingredients.add(self.sal)
+        self.assertCounts(2, 2, 1, 1)
+
+        receita.tags.remove(self.vegano)
+        receita.tags.remove(self.vegano)
+        self.assertCounts(2, 1, 1, 1)
+
+        receita.tags.set([self.vegano])
+        self.assertCounts(2, 2, 0, 1)
+
+        receita.tags.clear()
+        self.assertCounts(2, 1, 0, 1)
+
+    def test_reverse_changes(self):
+        """Test changes made from the tag side of the relation"""
+        receita = sample_receita(self.user)
+        other = sample_receita(self.user)
+        self.vegano.receita_set.add(receita, other)
+        self.assertCounts(2, 2, 0, 0)
+
+        self.vegano.receita_set.remove(other)
+        self.assertCounts(2, 1, 0, 0)
+
+        self.vegano.receita_set.clear()
+        self.assertCounts(2, 0, 0, 0)
+
+    def test_receita_deleted(self):
+        """Test that deleting receitas decrements every counter"""
+        receita = sample_receita(self.user)
+        receita.tags.add(self.vegano)
+        receita.ingredients.add(self.sal)
+        sample_receita(self.user).tags.add(self.vegano)
+
+        receita.delete()
+        self.assertCounts(1, 1, 0, 0)
+
+        Receita.objects.all().delete()
+        self.assertCounts(0, 0, 0, 0)
+
+    def test_rebuild(self):
+        """Test that drifted counters are recomputed"""
+        receita = sample_receita(self.user)
+        receita.tags.add(self.vegano)
+        Tag.objects.update(receita_count=10)
+        get_user_model().objects.update(receita_count=0)
+
+        counters.rebuild()
+        self.assertCounts(1, 1, 0, 0)
+
+
+class ReceitaStatsApiTests(TestCase):
+    """Test the receita statistics endpoint"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@italocarv.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_login_required(self):
+        """Test that authentication is required"""
+        res = APIClient().get(STATS_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_stats(self):
+        """Test the facet counts and histograms"""
+        vegano = Tag.objects.create(user=self.user, name="Vegano")
+        doce = Tag.objects.create(user=self.user, name="Doce")
+        sal = Ingredient.objects.create(user=self.user, name="Sal")
+        sample_receita(self.user, price=5, time_minutes=10).tags.add(vegano, doce)
+        sample_receita(self.user, price=8, time_minutes=20).tags.add(vegano)
+        sample_receita(self.user, price=25.5, time_minutes=50)
+        user2 = get_user_model().objects.create_user("test2@italocarv.com", "pass")
+        sample_receita(user2).tags.add(Tag.objects.create(user=user2, name="Sal"))
+
+        with self.assertNumQueries(5):
+            res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["receitas"], 3)
+        self.assertEqual(
+            [(t["name"], t["receita_count"]) for t in res.data["tags"]],
+            [("Vegano", 2), ("Doce", 1)],
+        )
+        self.assertEqual(
+            res.data["ingredients"], [{"id": sal.id, "name": "Sal", "receita_count": 0}]
+        )
+        self.assertEqual(
+            [(b["start"], b["end"], b["count"]) for b in res.data["price_histogram"]],
+            [("0.00", "10.00", 2), ("20.00", "30.00", 1)],
+        )
+        self.assertEqual(
+            [(b["start"], b["count"]) for b in res.data["time_histogram"]],
+            [(0, 1), (15, 1), (45, 1)],
+        )
@@ -100,3 +100,80 @@ class PrivateTagsApiTests(TestCase):
 
         res = self.client.get(TAGS_URL, {"assigned_only": 1})
         self.assertEqual(len(res.data["results"]), 1)
+
+    def test_retrieve_tags_unused(self):
+        """Test filtering tags by those not assigned to any receita"""
+        tag1 = Tag.objects.create(user=self.user, name="Café da manhã")
+        tag2 = Tag.objects.create(user=self.user, name="Almoço")
+        receita = Receita.objects.create(
+            title="Ovos mexidos", time_minutes=10, price=5.00, user=self.user
+        )
+        receita.tags.add(tag1)
+
+        res = self.client.get(TAGS_URL, {"unused_only": 1})
+
+        self.assertEqual(res.data["results"], [TagSerializer(tag2).data])
+
+    def test_retrieve_tags_with_counts(self):
+        """Test listing tags with their receita counts"""
+        tag = Tag.objects.create(user=self.user, name="Lanche")
+        for title in ("Panquecas", "Mingau"):
+            Receita.objects.create(
+                title=title, time_minutes=5, price=3.00, user=self.user
+            ).tags.add(tag)
+
+        res = self.client.get(TAGS_URL, {"with_counts": 1, "assigned_only": 1})
+
+        self.assertEqual(
+            res.data["results"], [{"id": tag.id, "name": "Lanche", "receita_count": 2}]
+        )
+
+    def test_invalid_filters(self):
+        """Test that invalid or contradictory filters are a bad request"""
+        for params in (
+            {"assigned_only": "x"},
+            {"unused_only": "maybe"},
+            {"with_counts": "2"},
+            {"assigned_only": 1, "unused_only": 1},
+        ):
+            res = self.client.get(TAGS_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_boolean_filters(self):
+        """Test that the filters take the usual boolean spellings"""
+        Tag.objects.create(user=self.user, name="Lanche")
+
+        res = self.client.get(TAGS_URL, {"unused_only": "yes", "with_counts": "true"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"][0]["receita_count"], 0)
+
+    def test_create_tag_existing_name(self):
+        """Test that creating a tag with an existing name returns it"""
+        tag = Tag.objects.create(user=self.user, name="Café da manhã")
+
+        res = self.client.post(TAGS_URL, {"name": " CAFE  da manha"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {"id": tag.id, "name": "Café da manhã"})
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_retrieve_tags_by_ids(self):
+        """Test retrieving tags by ID, in the requested order"""
+        tag1 = Tag.objects.create(user=self.user, name="Vegano")
+        tag2 = Tag.objects.create(user=self.user, name="Sobremesa")
+
+        res = self.client.get(TAGS_URL, {"ids": f"{tag2.id}, {tag1.id}, 9999"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data,
+            {
+                "results": [
+                    {"id": tag2.id, "name": "Sobremesa"},
+                    {"id": tag1.id, "name": "Vegano"},
+                ],
+                "missing": [9999],
+            },
+        )
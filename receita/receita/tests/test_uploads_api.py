@@ -0,0 +1,201 @@
+import base64
+import datetime
+import hashlib
+import io
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from receita.core import uploads
+from receita.core.models import Receita, UploadSession
+
+CHUNK_CONTENT_TYPE = "application/offset+octet-stream"
+
+
+def uploads_url(receita_id):
+    return reverse("receita:receita-uploads", args=[receita_id])
+
+
+def upload_url(receita_id, upload_id):
+    return reverse("receita:receita-upload", args=[receita_id, upload_id])
+
+
+def finalize_url(receita_id, upload_id):
+    return reverse("receita:receita-upload-finalize", args=[receita_id, upload_id])
+
+
+def sample_image():
+    f = io.BytesIO()
+    Image.new("RGB", (50, 50)).save(f, format="JPEG")
+    return f.getvalue()
+
+
+def checksum(data):
+    return "sha256 " + base64.b64encode(hashlib.sha256(data).digest()).decode()
+
+
+@override_settings(RECEITA_UPLOAD_MAX_SIZE=10000)
+class ResumableUploadApiTests(TestCase):
+    """Test the resumable image uploads"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "usertest@italocar.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.receita = Receita.objects.create(
+            user=self.user, title="Bolo", time_minutes=10, price=5
+        )
+        self.image = sample_image()
+
+    def start(self, size=None):
+        res = self.client.post(
+            uploads_url(self.receita.id),
+            {"filename": "bolo.jpg", "size": size or len(self.image)},
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res.data["id"]
+
+    def send(self, upload_id, offset, data, **headers):
+        return self.client.patch(
+            upload_url(self.receita.id, upload_id),
+            data,
+            content_type=CHUNK_CONTENT_TYPE,
+            HTTP_UPLOAD_OFFSET=str(offset),
+            **headers,
+        )
+
+    def test_resumable_upload(self):
+        """Test uploading an image in chunks, resuming after a failure"""
+        upload_id = self.start()
+        half = len(self.image) // 2
+
+        res = self.send(
+            upload_id,
+            0,
+            self.image[:half],
+            HTTP_UPLOAD_CHECKSUM=checksum(self.image[:half]),
+        )
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(res["Upload-Offset"], str(half))
+
+        res = self.client.head(upload_url(self.receita.id, upload_id))
+        self.assertEqual(res["Upload-Offset"], str(half))
+        self.assertEqual(res["Upload-Length"], str(len(self.image)))
+
+        res = self.send(upload_id, half, self.image[half:])
+        self.assertEqual(res["Upload-Offset"], str(len(self.image)))
+        partial = uploads.partial_path(UploadSession.objects.get(pk=upload_id))
+
+        res = self.client.post(finalize_url(self.receita.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.receita.refresh_from_db()
+        self.assertTrue(self.receita.image.name.endswith(".jpg"))
+        with self.receita.image.open() as f:
+            self.assertEqual(f.read(), self.image)
+        self.assertFalse(os.path.exists(partial))
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_offset_conflict(self):
+        """Test that a chunk not starting at the offset is rejected"""
+        upload_id = self.start()
+
+        res = self.send(upload_id, 10, self.image[10:20])
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res["Upload-Offset"], "0")
+
+    def test_checksum_mismatch(self):
+        """Test that a corrupted chunk is not acknowledged"""
+        upload_id = self.start()
+
+        res = self.send(
+            upload_id, 0, self.image[:100], HTTP_UPLOAD_CHECKSUM=checksum(b"other")
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(UploadSession.objects.get(pk=upload_id).offset, 0)
+        res = self.client.head(upload_url(self.receita.id, upload_id))
+        self.assertEqual(res["Upload-Offset"], "0")
+
+    def test_chunk_after_size(self):
+        """Test that the bytes after the declared size are rejected"""
+        upload_id = self.start(size=10)
+
+        res = self.send(upload_id, 0, self.image[:20])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_too_large(self):
+        """Test that uploads over RECEITA_UPLOAD_MAX_SIZE are refused"""
+        res = self.client.post(
+            uploads_url(self.receita.id),
+            {"filename": "bolo.jpg", "size": 10001},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_finalize_incomplete(self):
+        """Test that an incomplete upload can't be finalized"""
+        upload_id = self.start()
+        self.send(upload_id, 0, self.image[:10])
+
+        res = self.client.post(finalize_url(self.receita.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+    def test_finalize_invalid_image(self):
+        """Test that an upload which is not an image is discarded"""
+        upload_id = self.start(size=8)
+        self.send(upload_id, 0, b"notimage")
+
+        res = self.client.post(finalize_url(self.receita.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_upload_other_user_receita(self):
+        """Test that the receitas of other users can't get uploads"""
+        other = get_user_model().objects.create_user("other@italocar.com", "pass")
+        self.client.force_authenticate(other)
+
+        res = self.client.post(
+            uploads_url(self.receita.id),
+            {"filename": "bolo.jpg", "size": 10},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_purge_expired_uploads(self):
+        """Test that the abandoned uploads are purged"""
+        kept = self.start()
+        expired = self.start()
+        UploadSession.objects.filter(pk=expired).update(
+            updated_at=timezone.now() - datetime.timedelta(days=2)
+        )
+
+        call_command("purge_uploads", stdout=StringIO())
+
+        self.assertTrue(UploadSession.objects.filter(pk=kept).exists())
+        self.assertFalse(UploadSession.objects.filter(pk=expired).exists())
+        self.assertEqual(os.listdir(uploads.partial_dir()), [f"{kept}.part"])
@@ -1,7 +1,8 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from receita.receita import views
+from receita.receita import async_views, views
 
 # /api/receita/tags/1/
 router = DefaultRouter()
@@ -11,4 +12,20 @@ router.register("receitas", views.ReceitaViewSet)
 
 app_name = "receita"
 
-urlpatterns = [path("", include(router.urls))]
+urlpatterns = [
+    path("events/", views.ReceitaEventStreamView.as_view(), name="events"),
+    path("stats/", views.ReceitaStatsView.as_view(), name="stats"),
+]
+
+if settings.RECEITA_ASYNC_VIEWS:
+    # ASGI mode: the read-heavy endpoints are served by async views
+    urlpatterns += [
+        path("receitas/", async_views.receita_list, name="receita-list-async"),
+        path(
+            "receitas/<int:pk>/",
+            async_views.receita_detail,
+            name="receita-detail-async",
+        ),
+    ]
+
+urlpatterns += [path("", include(router.urls))]
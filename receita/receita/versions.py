@@ -0,0 +1,39 @@
+import time
+
+from django.core.cache import cache
+
+
+def _key(user_id):
+    return f"receita:user-version:{user_id}"
+
+
+def _initial_version():
+    # Start from the clock so a version evicted from the cache never
+    # comes back with a value an old cache entry was built for.
+    return time.time_ns() // 1000
+
+
+def get_version(user_id):
+    """Return the version of the user data, bumped on every change
+
+    Caches of derived data (similarity index, meal plans...) are keyed by
+    this version, so every worker sees a change made by another one.
+    """
+    key = _key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key, 0)
+    return version
+
+
+def bump_version(user_id):
+    """Increment and return the version of the user data"""
+    key = _key(user_id)
+    cache.add(key, _initial_version(), timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _initial_version()
+        cache.set(key, version, timeout=None)
+        return version
@@ -1,36 +1,147 @@
-from drf_yasg.utils import swagger_auto_schema
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef
+from django.db.models.functions import Floor
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from rest_framework import mixins, status, viewsets
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
-from rest_framework.parsers import MultiPartParser
+from rest_framework.exceptions import ParseError, UnsupportedMediaType, ValidationError
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from receita.core.models import Ingredient, Receita, Tag
-from receita.receita import serializers
+from receita.core import counters, deletion, uploads
+from receita.core.db import routing
+from receita.core.db.mixins import ReplicaReadMixin
+from receita.core.models import Ingredient, Receita, Tag, UploadSession
+from receita.core.normalization import normalize_name
+from receita.receita import autocomplete, planner, serializers, similarity
+from receita.receita.events import EventStreamRenderer, last_event_id, stream_events
+from receita.utils.messagepack import MessagePackParser
+from receita.utils.schema import swagger_auto_schema
+
+
+class MultiGetMixin:
+    """List the objects of ?ids=1,2,3 in one query, in the requested order"""
+
+    @swagger_auto_schema(query_serializer=serializers.MultiGetQuerySerializer)
+    def list(self, request, *args, **kwargs):
+        """List the objects, or with ids the objects with these IDs
+
+        The ids response is not paginated: its results follow the order of
+        ids and missing lists the IDs not found (or not the user's).
+        """
+        if "ids" in request.query_params:
+            return self.multi_get(request)
+        return super().list(request, *args, **kwargs)
+
+    def multi_get(self, request):
+        params = serializers.MultiGetQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        ids = params.validated_data["ids"]
+        found = self.filter_queryset(self.get_queryset()).in_bulk(ids)
+        serializer = self.get_serializer(
+            [found[pk] for pk in ids if pk in found], many=True
+        )
+        return Response(
+            {
+                "results": serializer.data,
+                "missing": [pk for pk in ids if pk not in found],
+            }
+        )
 
 
 class BaseReceitaAttrViewSet(
-    viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMixin
+    MultiGetMixin,
+    ReplicaReadMixin,
+    viewsets.GenericViewSet,
+    mixins.ListModelMixin,
+    mixins.CreateModelMixin,
 ):
     """Base viewset for user owned receita attributes"""
 
     authentication_classes = (TokenAuthentication,)
     permission_classes = (IsAuthenticated,)
 
+    def get_filters(self):
+        """Return the validated list query parameters"""
+        params = serializers.ReceitaAttrFilterSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        return params.validated_data
+
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
-        # not not = bool(), but more faster
-        assigned_only = not not int(self.request.query_params.get("assigned_only", 0))
+        if getattr(self, "swagger_fake_view", False):
+            # queryset just for schema generation metadata
+            return self.queryset.none()
+        filters = self.get_filters()
+        assigned_only = filters["assigned_only"]
 
         queryset = self.queryset
-        if assigned_only:
-            queryset = queryset.filter(receita__isnull=False)
-        return queryset.filter(user=self.request.user).order_by("-name").distinct()
+        if assigned_only or filters["unused_only"]:
+            # EXISTS stops at the first receita instead of joining them all
+            through, column = counters.RELATIONS[queryset.model]
+            used = Exists(through.objects.filter(**{column: OuterRef("pk")}))
+            queryset = queryset.filter(used if assigned_only else ~used)
+        return queryset.filter(user=self.request.user).order_by("-name")
+
+    def get_serializer_class(self):
+        """Include the receita counts when requested"""
+        if getattr(self, "swagger_fake_view", False):
+            return self.serializer_class
+        if self.action == "list" and self.get_filters()["with_counts"]:
+            return self.count_serializer_class
+        return self.serializer_class
+
+    @swagger_auto_schema(query_serializer=serializers.ReceitaAttrFilterSerializer)
+    def list(self, request, *args, **kwargs):
+        """List the objects, filtered by their use, or with ids"""
+        return super().list(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        query_serializer=serializers.AutocompleteQuerySerializer,
+        responses={200: serializers.FacetSerializer(many=True)},
+    )
+    @action(methods=["GET"], detail=False, pagination_class=None)
+    def autocomplete(self, request):
+        """Return the most used objects whose names match the query"""
+        params = serializers.AutocompleteQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        matches = autocomplete.complete(
+            request.user.id,
+            self.queryset.filter(user=request.user),
+            **params.validated_data,
+        )
+        return Response(serializers.FacetSerializer(matches, many=True).data)
 
+    def create(self, request, *args, **kwargs):
+        """Create a new object, or return the existing one with that name"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        created = self.perform_create(serializer)
+        headers = self.get_success_headers(serializer.data)
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+            headers=headers,
+        )
+
+    @transaction.atomic
     def perform_create(self, serializer):
-        """Create a new object"""
-        serializer.save(user=self.request.user)
+        """Get or create the object with the normalized name"""
+        name = serializer.validated_data["name"]
+        serializer.instance, created = self.queryset.model.objects.get_or_create(
+            user=self.request.user,
+            normalized_name=normalize_name(name),
+            defaults={"name": name},
+        )
+        return created
 
 
 class TagViewSet(BaseReceitaAttrViewSet):
@@ -38,6 +149,7 @@ class TagViewSet(BaseReceitaAttrViewSet):
 
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    count_serializer_class = serializers.TagCountSerializer
 
 
 class IngredientViewSet(BaseReceitaAttrViewSet):
@@ -45,53 +157,69 @@ class IngredientViewSet(BaseReceitaAttrViewSet):
 
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    count_serializer_class = serializers.IngredientCountSerializer
 
 
-class ReceitaViewSet(viewsets.ModelViewSet):
+class ReceitaViewSet(MultiGetMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """Manage receita in the database"""
 
-    parser_classes = (MultiPartParser,)
+    # JSON for the batch sub-requests (see receita.core.batch)
+    parser_classes = (MultiPartParser, MessagePackParser, JSONParser)
     serializer_class = serializers.ReceitaSerializer
     queryset = Receita.objects.all().order_by("-id")
     authentication_classes = (TokenAuthentication,)
     permission_classes = (IsAuthenticated,)
 
-    def _params_to_int(self, qs):
-        """Convert a list of string IDs to a list of integers"""
-
-        return [int(str_id) for str_id in qs.split(",")]
-
     def get_queryset(self):
         """Retrieve the receitas for the authenticated user"""
         if getattr(self, "swagger_fake_view", False):
             # queryset just for schema generation metadata
             return self.queryset.none()
-        tags = self.request.query_params.get("tags")
-        ingredients = self.request.query_params.get("ingredients")
-        queryset = self.queryset
+        params = serializers.ReceitaFilterSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        tag_ids = params.validated_data.get("tags")
+        ingredient_ids = params.validated_data.get("ingredients")
+        # The serializers list the tag and ingredient IDs of every receita
+        queryset = self.queryset.prefetch_related("tags", "ingredients")
 
-        if tags:
-            tag_ids = self._params_to_int(tags)
-            queryset = self.queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredient_ids = self._params_to_int(ingredients)
-            queryset = self.queryset.filter(ingredients__id__in=ingredient_ids)
+        if tag_ids:
+            queryset = queryset.filter(tags__id__in=tag_ids)
+        if ingredient_ids:
+            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+        if tag_ids or ingredient_ids:
+            # A receita with many of the tags or ingredients is joined once each
+            queryset = queryset.distinct()
 
         return queryset.filter(user=self.request.user)
 
+    @swagger_auto_schema(query_serializer=serializers.ReceitaFilterSerializer)
+    def list(self, request, *args, **kwargs):
+        """List the receitas, filtered by tags and ingredients, or with ids"""
+        return super().list(request, *args, **kwargs)
+
     def get_serializer_class(self):
         """Return a appropriate serializer class"""
         if self.action == "retrieve":
             return serializers.ReceitaDetailSerializer
 
-        elif self.action == "upload_image":
+        elif self.action in ("upload_image", "finalize_upload"):
             return serializers.ReceitaImageSerializer
         return self.serializer_class
 
+    @transaction.atomic
     def perform_create(self, serializer):
         """Create a new receita"""
         serializer.save(user=self.request.user)
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        """Update a receita"""
+        serializer.save()
+
+    def perform_destroy(self, instance):
+        """Hide the receita now, purge it and its image in the background"""
+        deletion.delete_receita(instance)
+
     @swagger_auto_schema(
         operation_description="Upload file...",
     )
@@ -104,3 +232,266 @@ class ReceitaViewSet(viewsets.ModelViewSet):
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @swagger_auto_schema(
+        request_body=serializers.UploadSessionCreateSerializer,
+        responses={201: serializers.UploadSessionSerializer},
+    )
+    @action(
+        methods=["POST"],
+        detail=True,
+        url_path="uploads",
+        url_name="uploads",
+        parser_classes=(JSONParser,),
+    )
+    def create_upload(self, request, pk=None):
+        """Start a resumable upload of an image (see receita.core.uploads)"""
+        receita = self.get_object()
+        serializer = serializers.UploadSessionCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        session = uploads.create(request.user, receita, **serializer.validated_data)
+        location = reverse("receita:receita-upload", args=[receita.pk, session.pk])
+        return Response(
+            serializers.UploadSessionSerializer(session).data,
+            status=status.HTTP_201_CREATED,
+            headers={"Location": location, "Upload-Offset": "0"},
+        )
+
+    def _upload_session(self, upload_id):
+        # The offset moves on every chunk: never read it from a replica
+        with routing.replica_reads(False):
+            receita = self.get_object()
+            return get_object_or_404(UploadSession, pk=upload_id, receita=receita)
+
+    def _upload_offset(self, request):
+        offset = request.headers.get("Upload-Offset", "")
+        if not offset.isdigit():
+            raise ValidationError({"Upload-Offset": "A byte offset is required."})
+        return int(offset)
+
+    @swagger_auto_schema(methods=["PATCH", "DELETE"], auto_schema=None)
+    @action(
+        methods=["HEAD", "PATCH", "DELETE"],
+        detail=True,
+        url_path=r"uploads/(?P<upload_id>[0-9a-f-]{36})",
+        url_name="upload",
+    )
+    def upload(self, request, pk=None, upload_id=None):
+        """Resume (HEAD), continue (PATCH) or abort (DELETE) an upload
+
+        PATCH sends the chunk starting at Upload-Offset as an
+        application/offset+octet-stream body, with an optional
+        Upload-Checksum: sha256 <base64 digest>.
+        """
+        session = self._upload_session(upload_id)
+        if request.method == "DELETE":
+            uploads.discard(session)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        headers = {"Upload-Length": str(session.size), "Cache-Control": "no-store"}
+        if request.method == "HEAD":
+            headers["Upload-Offset"] = str(session.offset)
+            return Response(status=status.HTTP_200_OK, headers=headers)
+
+        if request.content_type != "application/offset+octet-stream":
+            raise UnsupportedMediaType(request.content_type)
+        length = request.META.get("CONTENT_LENGTH", "")
+        if not length.isdigit():
+            raise ParseError("Content-Length is required.")
+        checksum = request.headers.get("Upload-Checksum")
+        try:
+            offset = uploads.append(
+                session,
+                self._upload_offset(request),
+                request.stream,
+                int(length),
+                uploads.parse_checksum(checksum) if checksum else None,
+            )
+        except uploads.OffsetConflict as exc:
+            headers["Upload-Offset"] = str(exc.offset)
+            return Response({"detail": exc.detail}, exc.status_code, headers=headers)
+        headers["Upload-Offset"] = str(offset)
+        return Response(status=status.HTTP_204_NO_CONTENT, headers=headers)
+
+    @swagger_auto_schema(
+        request_body=None, responses={200: serializers.ReceitaImageSerializer}
+    )
+    @action(
+        methods=["POST"],
+        detail=True,
+        url_path=r"uploads/(?P<upload_id>[0-9a-f-]{36})/finalize",
+        url_name="upload-finalize",
+    )
+    def finalize_upload(self, request, pk=None, upload_id=None):
+        """Attach a complete upload to the receita"""
+        receita = uploads.finalize(self._upload_session(upload_id))
+        return Response(self.get_serializer(receita).data)
+
+    @swagger_auto_schema(
+        query_serializer=serializers.ShoppingListQuerySerializer,
+        responses={200: serializers.ShoppingListSerializer},
+    )
+    @action(methods=["GET"], detail=False, url_path="shopping-list")
+    def shopping_list(self, request):
+        """Return the merged ingredients and totals of many receitas"""
+        params = serializers.ShoppingListQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        ids = set(params.validated_data["ids"])
+        receitas = list(
+            Receita.objects.filter(user=request.user, id__in=ids).values_list(
+                "id", "price", "time_minutes"
+            )
+        )
+        found = sorted(receita_id for receita_id, _, _ in receitas)
+        # One grouped query over the receita <-> ingredient join table
+        ingredients = (
+            Receita.ingredients.through.objects.filter(receita_id__in=found)
+            .values("ingredient_id", name=F("ingredient__name"))
+            .annotate(count=Count("receita_id"))
+            .order_by("name", "ingredient_id")
+        )
+        serializer = serializers.ShoppingListSerializer(
+            {
+                "receitas": found,
+                "missing": sorted(ids.difference(found)),
+                "ingredients": ingredients,
+                "price": sum(price for _, price, _ in receitas),
+                "time_minutes": sum(minutes for _, _, minutes in receitas),
+            },
+            context=self.get_serializer_context(),
+        )
+        return Response(serializer.data)
+
+    @swagger_auto_schema(
+        query_serializer=serializers.MealPlanQuerySerializer,
+        responses={200: serializers.MealPlanSerializer},
+    )
+    @action(methods=["GET"], detail=False, url_path="meal-plan")
+    def meal_plan(self, request):
+        """Return the best N receitas within a budget and a time limit"""
+        params = serializers.MealPlanQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        plan = planner.meal_plan(request.user.id, **params.validated_data)
+        if plan is None:
+            raise ValidationError("No meal plan fits the budget and time limit")
+        receitas = (
+            Receita.objects.filter(user=request.user)
+            .prefetch_related("tags", "ingredients")
+            .in_bulk(plan)
+        )
+        if len(receitas) < len(set(plan)):
+            # Deleted after the plan was cached
+            raise ValidationError("No meal plan fits the budget and time limit")
+        plan = [receitas[receita_id] for receita_id in plan]
+        serializer = serializers.MealPlanSerializer(
+            {
+                "receitas": plan,
+                "price": sum(receita.price for receita in plan),
+                "time_minutes": sum(receita.time_minutes for receita in plan),
+            },
+            context=self.get_serializer_context(),
+        )
+        return Response(serializer.data)
+
+    @swagger_auto_schema(
+        query_serializer=serializers.SimilarReceitaQuerySerializer,
+        responses={200: serializers.SimilarReceitaSerializer(many=True)},
+    )
+    @action(methods=["GET"], detail=True)
+    def similar(self, request, pk=None):
+        """Return the receitas sharing most ingredients and tags with this one"""
+        receita = self.get_object()
+        params = serializers.SimilarReceitaQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        scores = similarity.similar_receitas(
+            request.user.id, receita.id, **params.validated_data
+        )
+        receitas = (
+            Receita.objects.filter(user=request.user)
+            .prefetch_related("tags", "ingredients")
+            .in_bulk([receita_id for receita_id, _ in scores])
+        )
+        serializer = serializers.SimilarReceitaSerializer(
+            [
+                {"score": score, "receita": receitas[receita_id]}
+                for receita_id, score in scores
+                if receita_id in receitas
+            ],
+            many=True,
+            context=self.get_serializer_context(),
+        )
+        return Response(serializer.data)
+
+
+class ReceitaEventStreamView(APIView):
+    """Stream changes of the user receitas, tags and ingredients (SSE)"""
+
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    renderer_classes = (EventStreamRenderer, JSONRenderer)
+
+    @swagger_auto_schema(
+        operation_description="Server-sent events with the user changes",
+    )
+    def get(self, request):
+        """Open the event stream of the authenticated user"""
+        response = StreamingHttpResponse(
+            stream_events(request.user.id, last_event_id(request)),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        # Disable proxy buffering so events are flushed immediately
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+class ReceitaStatsView(ReplicaReadMixin, APIView):
+    """Receita counts per tag and ingredient, and price and time histograms"""
+
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def _facets(self, model, user):
+        return (
+            model.objects.filter(user=user)
+            .order_by("-receita_count", "name")
+            .values("id", "name", "receita_count")
+        )
+
+    def _histogram(self, user, field, width):
+        """Count the receitas of the user in buckets of the given width"""
+        buckets = (
+            Receita.objects.filter(user=user)
+            .values(bucket=Floor(F(field) / width))
+            .annotate(count=Count("id"))
+            .order_by("bucket")
+        )
+        return [
+            {
+                "start": int(row["bucket"]) * width,
+                "end": (int(row["bucket"]) + 1) * width,
+                "count": row["count"],
+            }
+            for row in buckets
+        ]
+
+    @swagger_auto_schema(responses={200: serializers.ReceitaStatsSerializer})
+    def get(self, request):
+        """Return the receita statistics of the authenticated user"""
+        user = request.user
+        serializer = serializers.ReceitaStatsSerializer(
+            {
+                "receitas": get_user_model()
+                .objects.values_list("receita_count", flat=True)
+                .get(pk=user.pk),
+                "tags": self._facets(Tag, user),
+                "ingredients": self._facets(Ingredient, user),
+                "price_histogram": self._histogram(
+                    user, "price", settings.RECEITA_STATS_PRICE_BUCKET
+                ),
+                "time_histogram": self._histogram(
+                    user, "time_minutes", settings.RECEITA_STATS_TIME_BUCKET
+                ),
+            },
+            context={"request": request},
+        )
+        return Response(serializer.data)
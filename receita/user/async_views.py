@@ -0,0 +1,32 @@
+"""Async version of the user ``me`` endpoint, served in ASGI mode"""
+from asgiref.sync import sync_to_async
+from rest_framework.request import Request
+
+from receita.core.db.threads import in_thread
+from receita.user.views import ManageUserView
+from receita.utils.auth import view_response
+
+manage_user_view = ManageUserView.as_view()
+
+
+@in_thread
+def _retrieve_user(request):
+    view = ManageUserView(
+        request=Request(request), args=(), kwargs={}, format_kwarg=None
+    )
+    view.headers = {}
+    return view_response(view, lambda: view.retrieve(view.request))
+
+
+async def manage_user(request):
+    """Retrieve the authenticated user"""
+    if request.method == "GET":
+        return await _retrieve_user(request)
+    return await sync_to_async(manage_user_view)(request)
+
+
+# The sync view is csrf exempt as well (token authentication only)
+manage_user.csrf_exempt = True
+
+# The batch endpoint (receita.core.batch) calls the sync view
+manage_user.sync_view = manage_user_view
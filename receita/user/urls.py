@@ -1,11 +1,17 @@
+from django.conf import settings
 from django.urls import path
 
-from receita.user import views
+from receita.user import async_views, views
 
 app_name = "user"
 
 urlpatterns = [
     path("create/", views.CreateUserView.as_view(), name="create"),
     path("token/", views.CreateTokenView.as_view(), name="token"),
-    path("me/", views.ManageUserView.as_view(), name="me"),
 ]
+
+if settings.RECEITA_ASYNC_VIEWS:
+    # ASGI mode: the authenticated user is served by an async view
+    urlpatterns += [path("me/", async_views.manage_user, name="me")]
+else:
+    urlpatterns += [path("me/", views.ManageUserView.as_view(), name="me")]
@@ -1,7 +1,9 @@
+from django.db import transaction
 from rest_framework import authentication, generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 
+from receita.core import deletion
 from receita.user.serializers import AuthTokenSerializer, UserSerializer
 
 
@@ -9,16 +11,27 @@ class CreateUserView(generics.CreateAPIView):
     """Create a new user in the system"""
 
     serializer_class = UserSerializer
+    batchable = False
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        """Create a new user"""
+        serializer.save()
 
 
 class CreateTokenView(ObtainAuthToken):
     """Create a new auth token for user"""
 
     serializer_class = AuthTokenSerializer
+    # The token must not be guessable from the compressed size (BREACH)
+    compress_response = False
+    # Nor from the size of a compressed batch response (receita.core.batch)
+    batchable = False
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(generics.RetrieveUpdateDestroyAPIView):
     """Manage the authenticated user"""
 
     serializer_class = UserSerializer
@@ -28,3 +41,12 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         """Retrieve and return authetication user"""
         return self.request.user
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        """Update the user, saving the new password in the same transaction"""
+        serializer.save()
+
+    def perform_destroy(self, instance):
+        """Deactivate the user now, purge the account in the background"""
+        deletion.delete_user(instance)
@@ -0,0 +1,48 @@
+from django.http import JsonResponse
+from rest_framework import exceptions, status
+from rest_framework.authentication import TokenAuthentication
+
+
+def token_user(request):
+    """Return the user authenticated by the request token or None
+
+    Used by the plain Django (async) views that don't go through DRF.
+    """
+    try:
+        user_auth = TokenAuthentication().authenticate(request)
+    except exceptions.AuthenticationFailed:
+        return None
+    return user_auth[0] if user_auth else None
+
+
+def unauthorized_response():
+    """Return the 401 response DRF sends for token authentication"""
+    response = JsonResponse(
+        {"detail": exceptions.NotAuthenticated.default_detail},
+        status=status.HTTP_401_UNAUTHORIZED,
+    )
+    response["WWW-Authenticate"] = TokenAuthentication().authenticate_header(None)
+    return response
+
+
+def view_response(view, handler):
+    """Return the rendered response of handler(), run as view.dispatch would
+
+    For the async views, which call the DRF view methods themselves: the
+    Accept header is negotiated (406 when no renderer matches), the user
+    is authenticated by token and the exceptions become the error
+    responses of the view, rendered in the negotiated format.
+    """
+    request = view.request
+    try:
+        negotiated = view.perform_content_negotiation(request)
+        request.accepted_renderer, request.accepted_media_type = negotiated
+        user = token_user(request._request)
+        if user is None:
+            raise exceptions.NotAuthenticated()
+        request.user = user
+        response = handler()
+    except Exception as exc:
+        response = view.handle_exception(exc)
+    view.response = view.finalize_response(request, response)
+    return view.response.render()
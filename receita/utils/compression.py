@@ -0,0 +1,180 @@
+"""Compression of the API responses
+
+WhiteNoise only compresses the static files, while the receita lists,
+with their nested tags and ingredients, shrink several times compressed.
+CompressionMiddleware (in API_MIDDLEWARE, so only for /api/) compresses
+the responses of at least RECEITA_COMPRESSION_MIN_SIZE bytes with the
+encoding the client accepts: brotli and zstd when their modules are
+installed, gzip otherwise, in the RECEITA_COMPRESSION_ENCODINGS order.
+
+Streaming responses are compressed chunk by chunk, each chunk flushed so
+the client gets it right away; event streams are left alone (the events
+must not wait in the compressor, and proxies may buffer them).
+
+The levels of RECEITA_COMPRESSION_LEVELS are overridden per view with a
+compression_levels attribute ({"gzip": 1} trades bytes for CPU time), and
+a view sets compress_response = False for the responses holding secrets
+(see BREACH) -- the compress() decorator sets them on function views.
+"""
+import gzip
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _gzip(data, level):
+    return gzip.compress(data, level, mtime=0)
+
+
+def _gzip_stream(chunks, level):
+    # wbits 31: a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def _brotli(data, level):
+    return brotli.compress(data, quality=level)
+
+
+def _brotli_stream(chunks, level):
+    compressor = brotli.Compressor(quality=level)
+    for chunk in chunks:
+        yield compressor.process(chunk) + compressor.flush()
+    yield compressor.finish()
+
+
+def _zstd(data, level):
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def _zstd_stream(chunks, level):
+    compressor = zstandard.ZstdCompressor(level=level).compressobj()
+    flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(flush_block)
+    yield compressor.flush()
+
+
+# encoding: (compress, compress a stream), for the installed modules
+CODECS = {"gzip": (_gzip, _gzip_stream)}
+if brotli is not None:
+    CODECS["br"] = (_brotli, _brotli_stream)
+if zstandard is not None:
+    CODECS["zstd"] = (_zstd, _zstd_stream)
+
+
+def parse_accept_encoding(header):
+    """Return the {encoding: quality} of an Accept-Encoding header"""
+    accepted = {}
+    for item in header.split(","):
+        encoding, *params = item.strip().split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if encoding:
+            accepted[encoding.strip().lower()] = quality
+    return accepted
+
+
+def negotiate(header, encodings):
+    """Return the encoding of encodings the client prefers, None if none"""
+    accepted = parse_accept_encoding(header)
+    default = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    # Ties go to the first of encodings
+    for encoding in encodings:
+        quality = accepted.get(encoding, default)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(enabled=True, **levels):
+    """Set the compression options of a function view"""
+
+    def decorator(view):
+        view.compress_response = enabled
+        view.compression_levels = levels
+        return view
+
+    return decorator
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress the responses with gzip, brotli or zstd"""
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # DRF views keep their class (and @action options) on the function
+        view = getattr(view_func, "cls", view_func)
+        initkwargs = getattr(view_func, "initkwargs", None) or {}
+        request.compress_response = initkwargs.get(
+            "compress_response", getattr(view, "compress_response", True)
+        )
+        request.compression_levels = initkwargs.get(
+            "compression_levels", getattr(view, "compression_levels", None)
+        )
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding"):
+            return response
+        if response.get("Content-Type", "").startswith("text/event-stream"):
+            return response
+        if not getattr(request, "compress_response", True):
+            return response
+        if not response.streaming and (
+            len(response.content) < settings.RECEITA_COMPRESSION_MIN_SIZE
+        ):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        levels = {
+            **settings.RECEITA_COMPRESSION_LEVELS,
+            **(getattr(request, "compression_levels", None) or {}),
+        }
+        encodings = [
+            encoding
+            for encoding in settings.RECEITA_COMPRESSION_ENCODINGS
+            if encoding in CODECS and levels.get(encoding) is not None
+        ]
+        encoding = negotiate(request.META.get("HTTP_ACCEPT_ENCODING", ""), encodings)
+        if encoding is None:
+            return response
+        compress_data, compress_stream = CODECS[encoding]
+
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content, levels[encoding]
+            )
+            del response["Content-Length"]
+        else:
+            compressed = compress_data(response.content, levels[encoding])
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+
+        # The compressed bytes differ, a strong ETag would be wrong
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,178 @@
+"""Logging handlers"""
+import os
+import queue
+import threading
+import time
+import traceback
+
+from django.core import mail
+from django.utils.log import AdminEmailHandler
+
+_STOP = object()
+
+
+class QueuedAdminEmailHandler(AdminEmailHandler):
+    """AdminEmailHandler delivering the emails from a background thread
+
+    The report is still built in the failing thread (it needs the request),
+    but the SMTP delivery is queued to a worker thread sending through one
+    connection kept open while there is mail to send.
+
+    Errors of the same kind (exception type and line, or log message)
+    within `window` seconds are only mailed once; how many times they
+    repeated is sent in a digest email when the window closes.
+    """
+
+    def __init__(self, *args, window=300, queue_size=1000, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.window = window
+        self.queue_size = queue_size
+        self._pid = None
+        self._start()
+
+    def _start(self):
+        # Also called in forked processes, which don't inherit the thread
+        self._pid = os.getpid()
+        self._queue = queue.Queue(self.queue_size)
+        self._seen = {}
+        self._seen_lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._connection = None
+        self._thread = None
+
+    def _ensure_thread(self):
+        if self._pid != os.getpid():
+            self._start()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="admin-email", daemon=True
+            )
+            self._thread.start()
+
+    def dedup_key(self, record):
+        """Return what identifies the repeats of a record"""
+        if record.exc_info and record.exc_info[0] is not None:
+            exc_type, _, tb = record.exc_info
+            frames = traceback.extract_tb(tb)
+            where = (frames[-1].filename, frames[-1].lineno) if frames else None
+            return (exc_type.__qualname__, where)
+        return (record.name, record.levelno, str(record.msg))
+
+    def emit(self, record):
+        key = self.dedup_key(record)
+        now = time.monotonic()
+        with self._seen_lock:
+            seen = self._seen.get(key)
+            if seen is not None and now - seen[0] < self.window:
+                seen[1] += 1
+                return
+            # [window start, repeats, message]
+            self._seen[key] = [now, 0, record.getMessage()]
+        super().emit(record)
+
+    def send_mail(self, subject, message, *args, **kwargs):
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((subject, message, kwargs.get("html_message")))
+        except queue.Full:
+            # Never block the request: the report is lost
+            pass
+
+    def _closed_windows(self, everything=False):
+        """Return the (message, repeats) of the windows closed since last time"""
+        now = time.monotonic()
+        closed = []
+        with self._seen_lock:
+            for key, (start, repeats, message) in list(self._seen.items()):
+                if everything or now - start >= self.window:
+                    del self._seen[key]
+                    if repeats:
+                        closed.append((message, repeats))
+        return closed
+
+    def _digest(self, closed):
+        lines = [f"{repeats} x {message}" for message, repeats in closed]
+        subject = self.format_subject(
+            f"Digest: {sum(repeats for _, repeats in closed)} repeated errors"
+        )
+        body = (
+            f"These errors repeated within {self.window} seconds of their "
+            "first report:\n\n" + "\n".join(lines)
+        )
+        return subject, body, None
+
+    def _send(self, emails):
+        with self._send_lock:
+            if self._connection is None:
+                self._connection = self.connection()
+            self._connection.open()
+            try:
+                for subject, message, html_message in emails:
+                    mail.mail_admins(
+                        subject,
+                        message,
+                        fail_silently=True,
+                        connection=self._connection,
+                        html_message=html_message,
+                    )
+            finally:
+                # Idle SMTP connections are dropped by the servers
+                self._connection.close()
+
+    def _drain(self):
+        """Return the queued items, marking them done"""
+        items = []
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            self._queue.task_done()
+        return items
+
+    def _run(self):
+        while True:
+            try:
+                items = [self._queue.get(timeout=min(self.window, 5) or 1)]
+            except queue.Empty:
+                items = []
+            # Everything queued meanwhile goes through the same connection
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            emails = [item for item in items if item is not _STOP]
+            closed = self._closed_windows()
+            if closed:
+                emails.append(self._digest(closed))
+            try:
+                if emails:
+                    self._send(emails)
+            finally:
+                # Done once sent, so flush() can wait for it
+                for _ in items:
+                    self._queue.task_done()
+            if _STOP in items:
+                return
+
+    def flush(self, digest=False):
+        """Send the queued emails now, and the pending digests if digest"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+        emails = [item for item in self._drain() if item is not _STOP]
+        closed = self._closed_windows(everything=digest)
+        if closed:
+            emails.append(self._digest(closed))
+        if emails:
+            self._send(emails)
+
+    def close(self):
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=1)
+            except queue.Full:
+                pass
+            self._thread.join(timeout=5)
+        self.flush(digest=True)
+        super().close()
@@ -0,0 +1,128 @@
+"""Path aware middleware
+
+Token authenticated API calls need no session, CSRF, messages, locale or
+static files, so settings.MIDDLEWARE ends with PathMiddlewareDispatcher,
+which runs API_MIDDLEWARE for the paths under API_MIDDLEWARE_PATHS and
+SITE_MIDDLEWARE (the admin and everything else) for the other ones.
+"""
+import asyncio
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+
+
+class MiddlewareChain:
+    """A list of middleware loaded the way Django loads settings.MIDDLEWARE
+
+    handler runs the whole chain (ending with get_response); the hooks of
+    the middleware are kept in the order Django calls them.
+    """
+
+    def __init__(self, middleware, get_response, is_async=False):
+        adapt = BaseHandler().adapt_method_mode
+        self.view_middleware = []
+        self.template_response_middleware = []
+        self.exception_middleware = []
+
+        handler, handler_is_async = get_response, is_async
+        for middleware_path in reversed(middleware):
+            factory = import_string(middleware_path)
+            if not handler_is_async and getattr(factory, "sync_capable", True):
+                middleware_is_async = False
+            else:
+                middleware_is_async = getattr(factory, "async_capable", False)
+            try:
+                adapted_handler = adapt(middleware_is_async, handler, handler_is_async)
+                instance = factory(adapted_handler)
+            except MiddlewareNotUsed:
+                continue
+            if instance is None:
+                raise ImproperlyConfigured(
+                    f"Middleware factory {middleware_path} returned None."
+                )
+
+            if hasattr(instance, "process_view"):
+                self.view_middleware.insert(0, adapt(is_async, instance.process_view))
+            if hasattr(instance, "process_template_response"):
+                self.template_response_middleware.append(
+                    adapt(is_async, instance.process_template_response)
+                )
+            if hasattr(instance, "process_exception"):
+                # Django always handles exceptions synchronously
+                self.exception_middleware.append(
+                    adapt(False, instance.process_exception)
+                )
+            handler = convert_exception_to_response(instance)
+            handler_is_async = middleware_is_async
+        self.handler = adapt(is_async, handler, handler_is_async)
+
+
+class PathMiddlewareDispatcher:
+    """Run API_MIDDLEWARE or SITE_MIDDLEWARE depending on the request path"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Mark the instance as a coroutine function, like MiddlewareMixin
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+            self.process_view = self._process_view_async
+            self.process_template_response = self._process_template_response_async
+        else:
+            self.process_view = self._process_view
+            self.process_template_response = self._process_template_response
+        self.api_paths = tuple(settings.API_MIDDLEWARE_PATHS)
+        self.api_chain = MiddlewareChain(
+            settings.API_MIDDLEWARE, get_response, self.is_async
+        )
+        self.site_chain = MiddlewareChain(
+            settings.SITE_MIDDLEWARE, get_response, self.is_async
+        )
+
+    def chain(self, request):
+        if request.path_info.startswith(self.api_paths):
+            return self.api_chain
+        return self.site_chain
+
+    def __call__(self, request):
+        return self.chain(request).handler(request)
+
+    def _process_view(self, request, view_func, view_args, view_kwargs):
+        for process_view in self.chain(request).view_middleware:
+            response = process_view(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    async def _process_view_async(self, request, view_func, view_args, view_kwargs):
+        for process_view in self.chain(request).view_middleware:
+            response = await process_view(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    def _process_template_response(self, request, response):
+        for process_template_response in self.chain(
+            request
+        ).template_response_middleware:
+            response = process_template_response(request, response)
+        return response
+
+    async def _process_template_response_async(self, request, response):
+        for process_template_response in self.chain(
+            request
+        ).template_response_middleware:
+            response = await process_template_response(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        for process_exception in self.chain(request).exception_middleware:
+            response = process_exception(request, exception)
+            if response is not None:
+                return response
+        return None
@@ -0,0 +1,119 @@
+"""OpenAPI schema generated once per code version
+
+Generating the schema introspects every viewset and serializer, so it is
+done at build time by `manage.py generate_schema` (or on first use when
+the file is missing) and served from memory with an ETag afterwards.
+
+drf_yasg is only imported to generate the schema or render the UI, so
+workers without drf_yasg in INSTALLED_APPS (config.settings.api) never
+pay for it; views use the swagger_auto_schema shim below.
+"""
+import functools
+import hashlib
+import threading
+from pathlib import Path
+
+import rest_framework
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.http import condition
+
+
+def schema_enabled():
+    return "drf_yasg" in settings.INSTALLED_APPS
+
+
+def swagger_auto_schema(**kwargs):
+    """drf_yasg's swagger_auto_schema, a no-op when drf_yasg is not installed"""
+    if not schema_enabled():
+        return lambda view: view
+    from drf_yasg.utils import swagger_auto_schema
+
+    return swagger_auto_schema(**kwargs)
+
+
+def _info():
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title="Receita",
+        default_version="v1",
+        description="Receita is a tool to create good recipes",
+        license=openapi.License(name="MIT License"),
+        contact=openapi.Contact(email="italocarvalhoti@hotmail.com"),
+    )
+
+
+def ui_view():
+    """Return the Swagger UI view"""
+    from drf_yasg.views import get_schema_view
+    from rest_framework import permissions
+
+    schema_view = get_schema_view(
+        _info(),
+        public=True,
+        permission_classes=(permissions.AllowAny,),
+    )
+    return schema_view.with_ui("swagger", cache_timeout=0)
+
+
+@functools.lru_cache(maxsize=None)
+def code_version():
+    """Return a hash of the application code the schema is generated from"""
+    if settings.RECEITA_CODE_VERSION:
+        return settings.RECEITA_CODE_VERSION
+    from drf_yasg import __version__ as drf_yasg_version
+
+    digest = hashlib.sha1(f"{drf_yasg_version}:{rest_framework.VERSION}".encode())
+    root = Path(settings.ROOT_DIR)
+    for directory in (settings.APPS_DIR, root / "config"):
+        for path in sorted(Path(directory).rglob("*.py")):
+            digest.update(str(path.relative_to(root)).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def schema_path(version=None):
+    """Return the path of the schema file of a code version"""
+    return (
+        Path(settings.RECEITA_SCHEMA_DIR) / f"openapi-{version or code_version()}.json"
+    )
+
+
+def generate_schema():
+    """Generate the JSON schema of the API"""
+    from drf_yasg.codecs import OpenAPICodecJson
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    generator = OpenAPISchemaGenerator(_info())
+    schema = generator.get_schema(request=None, public=True)
+    return OpenAPICodecJson(validators=[]).encode(schema)
+
+
+_schemas = {}
+_lock = threading.Lock()
+
+
+def get_schema():
+    """Return the JSON schema of the current code version and its ETag"""
+    version = code_version()
+    cached = _schemas.get(version)
+    if cached is not None:
+        return cached
+    with _lock:
+        if version not in _schemas:
+            path = schema_path(version)
+            content = path.read_bytes() if path.exists() else generate_schema()
+            etag = hashlib.sha1(content).hexdigest()
+            _schemas.clear()
+            _schemas[version] = (content, etag)
+        return _schemas[version]
+
+
+@condition(etag_func=lambda request: get_schema()[1])
+def schema_json(request):
+    """Serve the cached JSON schema, 304 when the client has it already"""
+    response = HttpResponse(get_schema()[0], content_type="application/json")
+    # Cache, but revalidate with the ETag on every use
+    response["Cache-Control"] = "no-cache"
+    return response